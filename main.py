@@ -1,11 +1,14 @@
 import uvicorn
 import os
-import tensorflow as tf
 import logging
 
 logging.getLogger("absl").setLevel(logging.ERROR)
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-tf.get_logger().setLevel('ERROR')
+
+# Serving-only replicas never load TensorFlow, so only configure it where it will run.
+if os.environ.get("SERVING_ONLY", "0") != "1":
+    import tensorflow as tf
+    tf.get_logger().setLevel('ERROR')
 
 if __name__ == "__main__":
     uvicorn.run("src.services.predictAPI.predictAPI:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
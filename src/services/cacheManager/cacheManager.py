@@ -1,34 +1,282 @@
 import redis
 import json
-from typing import Optional
+import struct
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
 import os
 
 redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379")
 
 r = redis.from_url(redis_url)
 
-def save_value(symbol: str, price: float, ttl: int = 43200):
+DEFAULT_TTL = 43200
+
+# Symbols whose prediction or price history changed are published here (comma separated)
+# so replicas can drop their local copies.
+PREDICTION_CHANNEL = "prediction_updates"
+
+# Streamed bars as JSON {symbol: [chart points]}, pushed to subscribed clients by every replica.
+BAR_CHANNEL = "bar_updates"
+
+# Tag byte + float64 price + int64 model version (-1 = unknown) + float64 as-of epoch seconds.
+# Legacy values are JSON-encoded floats and are still readable.
+VALUE_TAG = 1
+VALUE_FORMAT = struct.Struct("<Bdqd")
+
+# Multi-step forecasts: tag byte + int64 model version + float64 as-of, then one float64 per step.
+FORECAST_TAG = 2
+FORECAST_HEADER = struct.Struct("<Bqd")
+
+
+class PredictionValue(NamedTuple):
+    price: float
+    model_version: Optional[int]
+    as_of: Optional[float]
+
+
+class ForecastValue(NamedTuple):
+    prices: List[float]
+    model_version: Optional[int]
+    as_of: float
+
+
+def value_key(symbol: str) -> str:
+    return f"prediction_value:{symbol.upper()}"
+
+
+def forecast_key(symbol: str) -> str:
+    return f"prediction_forecast:{symbol.upper()}"
+
+
+def encode_value(price: float, model_version: Optional[int] = None, as_of: Optional[float] = None) -> bytes:
+    return VALUE_FORMAT.pack(
+        VALUE_TAG, float(price), -1 if model_version is None else int(model_version),
+        time.time() if as_of is None else float(as_of),
+    )
+
+
+def decode_value(raw) -> Optional[PredictionValue]:
+    if raw is None:
+        return None
+    if len(raw) == VALUE_FORMAT.size and raw[0] == VALUE_TAG:
+        _, price, model_version, as_of = VALUE_FORMAT.unpack(raw)
+        return PredictionValue(price, None if model_version < 0 else model_version, as_of)
+    return PredictionValue(float(json.loads(raw)), None, None)
+
+
+def encode_forecast(prices: List[float], model_version: Optional[int] = None, as_of: Optional[float] = None) -> bytes:
+    header = FORECAST_HEADER.pack(FORECAST_TAG, -1 if model_version is None else int(model_version),
+                                  time.time() if as_of is None else float(as_of))
+    return header + struct.pack(f"<{len(prices)}d", *prices)
+
+
+def decode_forecast(raw) -> Optional[ForecastValue]:
+    # Empty, truncated or foreign values are treated as missing, like an unknown tag.
+    if (raw is None or len(raw) < FORECAST_HEADER.size or raw[0] != FORECAST_TAG
+            or (len(raw) - FORECAST_HEADER.size) % 8):
+        return None
+    _, model_version, as_of = FORECAST_HEADER.unpack_from(raw)
+    steps = (len(raw) - FORECAST_HEADER.size) // 8
+    prices = list(struct.unpack_from(f"<{steps}d", raw, FORECAST_HEADER.size))
+    return ForecastValue(prices, None if model_version < 0 else model_version, as_of)
+
+
+def save_value(symbol: str, price: float, ttl: int = DEFAULT_TTL, model_version: Optional[int] = None):
     """
     Save predicted stock price in Redis with expiration time.
     Default TTL = 12 hours (43200 seconds).
     """
-    key = f"prediction_value:{symbol.upper()}"
-    r.set(key, json.dumps(price), ex=ttl)
+    pipe = r.pipeline(transaction=False)
+    pipe.set(value_key(symbol), encode_value(price, model_version), ex=ttl)
+    pipe.publish(PREDICTION_CHANNEL, symbol.upper())
+    pipe.execute()
     print(f"CacheUpdated Updated for {symbol} in Redis (expires in {ttl} seconds).")
 
 
+def save_forecast(symbol: str, prices: List[float], ttl: int = DEFAULT_TTL, model_version: Optional[int] = None):
+    """
+    Saves a multi-step forecast together with its first step as the regular prediction
+    value, in one round trip, so single-value readers keep working.
+    """
+    as_of = time.time()
+    pipe = r.pipeline(transaction=False)
+    pipe.set(value_key(symbol), encode_value(prices[0], model_version, as_of), ex=ttl)
+    pipe.set(forecast_key(symbol), encode_forecast(prices, model_version, as_of), ex=ttl)
+    pipe.publish(PREDICTION_CHANNEL, symbol.upper())
+    pipe.execute()
+    print(f"CacheUpdated Updated {len(prices)}-step forecast for {symbol} in Redis (expires in {ttl} seconds).")
+
+
+def save_forecasts(forecasts: Dict[str, List[float]], ttl: int = DEFAULT_TTL, model_versions: Dict[str, int] = None):
+    """
+    Saves many multi-step forecasts (and their first steps as prediction values) in one
+    pipelined round trip.
+    """
+    if not forecasts:
+        return
+    model_versions = model_versions or {}
+    as_of = time.time()
+    pipe = r.pipeline(transaction=False)
+    for symbol, prices in forecasts.items():
+        pipe.set(value_key(symbol), encode_value(prices[0], model_versions.get(symbol), as_of), ex=ttl)
+        pipe.set(forecast_key(symbol), encode_forecast(prices, model_versions.get(symbol), as_of), ex=ttl)
+    pipe.publish(PREDICTION_CHANNEL, ",".join(symbol.upper() for symbol in forecasts))
+    pipe.execute()
+    print(f"CacheUpdated Updated {len(forecasts)} forecasts in Redis (expires in {ttl} seconds).")
+
+
+def get_forecast(symbol: str) -> Optional[ForecastValue]:
+    return decode_forecast(r.get(forecast_key(symbol)))
+
+
+def publish_updates(symbols: Iterable[str]):
+    """
+    Announces that data served for `symbols` changed (e.g. new bars synced to the
+    database), so every API replica drops its cached copies.
+    """
+    symbols = [symbol.upper() for symbol in symbols]
+    if symbols:
+        r.publish(PREDICTION_CHANNEL, ",".join(symbols))
+
+
+def get_entry(symbol: str) -> Optional[PredictionValue]:
+    """
+    Retrieve the predicted price together with its model version and as-of time.
+    """
+    return decode_value(r.get(value_key(symbol)))
+
+
 def get_value(symbol: str) -> Optional[float]:
     """
     Retrieve predicted stock price from Redis.
     Returns None if not found.
     """
-    key = f"prediction_value:{symbol.upper()}"
-    value = r.get(key)
-    if value is None:
-        return None
-    return float(json.loads(value))
+    entry = get_entry(symbol)
+    return None if entry is None else entry.price
+
+
+def save_values(prices: Dict[str, float], ttl: int = DEFAULT_TTL, model_versions: Dict[str, int] = None):
+    """
+    Saves many predictions in one pipelined round trip.
+
+    Args:
+        prices (dict): Predicted price per symbol.
+        ttl (int): Expiry in seconds, applied to every key.
+        model_versions (dict): Optional model version per symbol.
+    """
+    if not prices:
+        return
+    model_versions = model_versions or {}
+    as_of = time.time()
+    pipe = r.pipeline(transaction=False)
+    for symbol, price in prices.items():
+        pipe.set(value_key(symbol), encode_value(price, model_versions.get(symbol), as_of), ex=ttl)
+    pipe.publish(PREDICTION_CHANNEL, ",".join(symbol.upper() for symbol in prices))
+    pipe.execute()
+    print(f"CacheUpdated Updated {len(prices)} predictions in Redis (expires in {ttl} seconds).")
+
+
+def get_entries(symbols: Iterable[str]) -> Dict[str, Optional[PredictionValue]]:
+    """
+    Retrieves many predictions with a single MGET.
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    raw_values = r.mget([value_key(symbol) for symbol in symbols])
+    return {symbol: decode_value(raw) for symbol, raw in zip(symbols, raw_values)}
+
+
+def get_values(symbols: Iterable[str]) -> Dict[str, Optional[float]]:
+    return {symbol: None if entry is None else entry.price for symbol, entry in get_entries(symbols).items()}
+
+
+_async_client = None
+
+
+def async_client():
+    """
+    Returns the shared asyncio Redis client (redis.asyncio), created on first use.
+    """
+    global _async_client
+    if _async_client is None:
+        import redis.asyncio as aioredis
+        _async_client = aioredis.from_url(redis_url)
+    return _async_client
+
+
+async def get_entry_async(symbol: str) -> Optional[PredictionValue]:
+    return decode_value(await async_client().get(value_key(symbol)))
+
+
+async def get_value_async(symbol: str) -> Optional[float]:
+    entry = await get_entry_async(symbol)
+    return None if entry is None else entry.price
+
+
+async def get_forecast_async(symbol: str) -> Optional[ForecastValue]:
+    return decode_forecast(await async_client().get(forecast_key(symbol)))
+
+
+async def get_entries_async(symbols: Iterable[str]) -> Dict[str, Optional[PredictionValue]]:
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    raw_values = await async_client().mget([value_key(symbol) for symbol in symbols])
+    return {symbol: decode_value(raw) for symbol, raw in zip(symbols, raw_values)}
+
+
+async def get_forecasts_async(symbols: Iterable[str]) -> Dict[str, Optional[ForecastValue]]:
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    raw_values = await async_client().mget([forecast_key(symbol) for symbol in symbols])
+    return {symbol: decode_forecast(raw) for symbol, raw in zip(symbols, raw_values)}
+
+
+async def publish_bars_async(bars: Dict[str, List[dict]]):
+    """
+    Announces newly ingested bars (chart points per symbol) on BAR_CHANNEL.
+    """
+    if bars:
+        await async_client().publish(BAR_CHANNEL, json.dumps({symbol.upper(): points for symbol, points in bars.items()}))
+
+
+async def save_values_async(prices: Dict[str, float], ttl: int = DEFAULT_TTL, model_versions: Dict[str, int] = None):
+    if not prices:
+        return
+    model_versions = model_versions or {}
+    as_of = time.time()
+    async with async_client().pipeline(transaction=False) as pipe:
+        for symbol, price in prices.items():
+            pipe.set(value_key(symbol), encode_value(price, model_versions.get(symbol), as_of), ex=ttl)
+        pipe.publish(PREDICTION_CHANNEL, ",".join(symbol.upper() for symbol in prices))
+        await pipe.execute()
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
 
 if __name__ == "__main__":
     save_value("AAPL", 214.95, ttl=300) # right now: 5 minutes
     price = get_value("AAPL")
-    print(f"Retrieved predicted price for AAPL: {price}")
\ No newline at end of file
+    print(f"Retrieved predicted price for AAPL: {price}")
+
+    symbols = [f"SYM{i}" for i in range(100)]
+    start = time.perf_counter()
+    for symbol in symbols:
+        save_value(symbol, 1.0, ttl=300)
+    for symbol in symbols:
+        get_value(symbol)
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_values({symbol: 1.0 for symbol in symbols}, ttl=300, model_versions={symbol: 1 for symbol in symbols})
+    get_values(symbols)
+    batched = time.perf_counter() - start
+    print(f"100 writes + reads: {one_by_one * 1000:.1f} ms one by one, {batched * 1000:.1f} ms pipelined")
+    print(f"Encoded value: {VALUE_FORMAT.size} bytes, entry {get_entry('SYM0')}")
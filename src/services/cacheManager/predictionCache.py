@@ -0,0 +1,205 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+from .cacheManager import PREDICTION_CHANNEL, PredictionValue, async_client, decode_value, r, value_key
+
+
+class TwoTierPredictionCache:
+    """
+    In-process TTL/LRU layer in front of the Redis prediction values.
+
+    Each replica keeps recently read entries locally. A local entry expires at the
+    earlier of its Redis expiry and `local_ttl`, and is dropped as soon as a writer
+    publishes the symbol on PREDICTION_CHANNEL. The local layer is only used while the
+    subscriber is connected; without it every read goes to Redis, and the layer is
+    emptied whenever the subscription drops, since updates may have been missed.
+    """
+    def __init__(self, client=None, max_entries: int = None, local_ttl: float = None):
+        """
+        Args:
+            client: Synchronous Redis client (defaults to the cacheManager client).
+            max_entries (int): Local LRU capacity (env PREDICTION_CACHE_MAX_ENTRIES, default 1024).
+            local_ttl (float): Upper bound in seconds on a local entry's lifetime
+                (env PREDICTION_CACHE_LOCAL_TTL, default 300).
+        """
+        self.client = client or r
+        self.max_entries = max_entries or int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", 1024))
+        self.local_ttl = local_ttl if local_ttl is not None else float(os.environ.get("PREDICTION_CACHE_LOCAL_TTL", 300))
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._subscribed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        self.invalidations = 0
+
+    def add_listener(self, callback: Callable[[List[str]], None]):
+        """
+        Registers `callback(symbols)` to run whenever symbols are invalidated by a publish.
+        """
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="prediction-cache-subscriber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _listen(self):
+        while not self._stop.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(PREDICTION_CHANNEL)
+                self._subscribed.set()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        data = message["data"]
+                        self.invalidate((data.decode() if isinstance(data, bytes) else data).split(","))
+            except Exception as e:
+                print(f"ERROR: Prediction cache subscription lost: {e}")
+            finally:
+                self._subscribed.clear()
+                self.clear()
+                pubsub.close()
+            self._stop.wait(1.0)
+
+    def invalidate(self, symbols: Iterable[str]):
+        symbols = [symbol.upper() for symbol in symbols if symbol]
+        with self._lock:
+            self._generation += 1
+            for symbol in symbols:
+                self._entries.pop(symbol, None)
+            self.invalidations += len(symbols)
+        for callback in self._listeners:
+            try:
+                callback(symbols)
+            except Exception as e:
+                print(f"ERROR: Prediction cache listener failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _local(self, symbol: str):
+        """
+        Returns (found, entry, generation) from the local layer and counts the hit or miss.
+        """
+        if not self._subscribed.is_set():
+            with self._lock:
+                self.misses += 1
+            return False, None, None
+        with self._lock:
+            cached = self._entries.get(symbol)
+            if cached is not None and cached[1] > time.monotonic():
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return True, cached[0], None
+            if cached is not None:
+                del self._entries[symbol]
+            self.misses += 1
+            return False, None, self._generation
+
+    def _store(self, symbol: str, entry: Optional[PredictionValue], pttl: int, generation: Optional[int], elapsed: float):
+        with self._lock:
+            self.redis_calls += 1
+            self.redis_seconds += elapsed
+            # Skip if an invalidation arrived while Redis was being read.
+            if generation is None or generation != self._generation or entry is None:
+                return
+            lifetime = self.local_ttl if pttl is None or pttl < 0 else min(self.local_ttl, pttl / 1000)
+            self._entries[symbol] = (entry, time.monotonic() + lifetime)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_entry(self, symbol: str) -> Optional[PredictionValue]:
+        symbol = symbol.upper()
+        found, entry, generation = self._local(symbol)
+        if found:
+            return entry
+
+        start = time.perf_counter()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(value_key(symbol))
+        pipe.pttl(value_key(symbol))
+        raw, pttl = pipe.execute()
+        entry = decode_value(raw)
+        self._store(symbol, entry, pttl, generation, time.perf_counter() - start)
+        return entry
+
+    async def get_entry_async(self, symbol: str) -> Optional[PredictionValue]:
+        symbol = symbol.upper()
+        found, entry, generation = self._local(symbol)
+        if found:
+            return entry
+
+        start = time.perf_counter()
+        async with async_client().pipeline(transaction=False) as pipe:
+            pipe.get(value_key(symbol))
+            pipe.pttl(value_key(symbol))
+            raw, pttl = await pipe.execute()
+        entry = decode_value(raw)
+        self._store(symbol, entry, pttl, generation, time.perf_counter() - start)
+        return entry
+
+    def get_value(self, symbol: str) -> Optional[float]:
+        entry = self.get_entry(symbol)
+        return None if entry is None else entry.price
+
+    async def get_value_async(self, symbol: str) -> Optional[float]:
+        entry = await self.get_entry_async(symbol)
+        return None if entry is None else entry.price
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "subscribed": self._subscribed.is_set(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "redis_calls": self.redis_calls,
+                "redis_avg_ms": self.redis_seconds / self.redis_calls * 1000 if self.redis_calls else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+prediction_cache = TwoTierPredictionCache()
+
+if __name__ == "__main__":
+    from .cacheManager import save_value
+
+    prediction_cache.start()
+    prediction_cache._subscribed.wait(5)
+    save_value("AAPL", 214.95, ttl=300)
+    time.sleep(0.1)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        prediction_cache.get_value("AAPL")
+    print(f"1000 reads in {(time.perf_counter() - start) * 1000:.1f} ms: {prediction_cache.stats()}")
+
+    save_value("AAPL", 215.10, ttl=300)
+    time.sleep(0.1)
+    print(f"After publish: {prediction_cache.get_value('AAPL')} {prediction_cache.stats()}")
+    prediction_cache.stop()
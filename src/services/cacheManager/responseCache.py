@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    created: float
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """
+    Weak comparison of `etag` against an If-None-Match header (RFC 9110): the header is
+    `*` or a comma-separated list of quoted tags, each optionally prefixed with W/.
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in candidates)
+
+
+class ResponseCache:
+    """
+    In-process read-through cache of serialized response bodies.
+
+    Concurrent misses for the same key share one load (single-flight), and every key
+    carries a generation counter: `invalidate` bumps it, so a load that started before
+    the invalidation is served to its waiters but never stored. Invalidation is
+    thread-safe because the scheduler jobs run on their own thread and event loop.
+    """
+    def __init__(self, ttl: float = None):
+        """
+        Args:
+            ttl (float): Safety expiry in seconds on top of explicit invalidation
+                (env RESPONSE_CACHE_TTL, default 900).
+        """
+        self.ttl = ttl if ttl is not None else float(os.environ.get("RESPONSE_CACHE_TTL", 900))
+        self._entries: Dict[str, CachedResponse] = {}
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def serialize(payload) -> CachedResponse:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        return CachedResponse(body, etag, time.monotonic())
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                entry = None
+            return entry
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable]) -> Optional[CachedResponse]:
+        """
+        Returns the cached response for `key`, or awaits `loader()` once for all
+        concurrent callers. A loader result of None (e.g. not found) is not cached.
+        The load runs in its own task, so a caller that is cancelled (e.g. its client
+        disconnected) stops waiting without cancelling the load for the others.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(key, loader))
+            # Mark retrieved so an exception nobody else awaited isn't logged as unhandled.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable]) -> Optional[CachedResponse]:
+        with self._lock:
+            generation = self._generations.get(key, 0)
+        try:
+            payload = await loader()
+            entry = None if payload is None else self.serialize(payload)
+            if entry is not None:
+                with self._lock:
+                    if self._generations.get(key, 0) == generation:
+                        self._entries[key] = entry
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: str = None):
+        """
+        Drops `key` (or every key) and makes in-flight loads for it non-cacheable.
+        """
+        with self._lock:
+            keys = list(self._generations.keys() | self._entries.keys()) if key is None else [key]
+            for k in keys:
+                self._generations[k] = self._generations.get(k, 0) + 1
+                self._entries.pop(k, None)
+
+    def clear(self):
+        self.invalidate()
+
+
+stock_response_cache = ResponseCache()
+
+if __name__ == "__main__":
+    async def main():
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"symbol": "AAPL", "prediction": 214.95}
+
+        cache = ResponseCache()
+        results = await asyncio.gather(*[cache.get_or_load("AAPL", loader) for _ in range(100)])
+        print(f"100 concurrent cold requests -> {calls} load(s), etag {results[0].etag}")
+        cache.invalidate("AAPL")
+        await cache.get_or_load("AAPL", loader)
+        print(f"After invalidation -> {calls} load(s)")
+
+    asyncio.run(main())
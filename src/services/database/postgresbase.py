@@ -1,17 +1,90 @@
+import io
+import asyncio
+import threading
 import pandas as pd
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import (
+    create_engine, text, MetaData, Table, Column, Index, String, Date, Float, PrimaryKeyConstraint,
+)
 import os
 
+PRICES_TABLE = "prices"
+
+# Price store / scraper column -> normalized prices table column
+PRICE_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
+metadata = MetaData()
+
+_engines = {}
+_engines_lock = threading.Lock()
+_prices_ready = set()
+
+
+def get_engine(url: str):
+    """
+    Returns the application-lifetime engine (and its connection pool) for `url`,
+    creating it on first use.
+
+    Pool sizing comes from DB_POOL_SIZE (default 10), DB_MAX_OVERFLOW (default 20),
+    DB_POOL_TIMEOUT (seconds, default 30) and DB_POOL_RECYCLE (seconds, default 1800).
+    """
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            options = {"pool_pre_ping": True}
+            if not url.startswith("sqlite"):
+                options.update(
+                    pool_size=int(os.environ.get("DB_POOL_SIZE", 10)),
+                    max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+                    pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                    pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+                )
+            engine = create_engine(url, **options)
+            _engines[url] = engine
+        return engine
+
+
+def dispose_engines():
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _prices_ready.clear()
+
+
+prices_table = Table(
+    PRICES_TABLE, metadata,
+    Column("market", String(8), nullable=False),
+    Column("symbol", String(16), nullable=False),
+    Column("date", Date, nullable=False),
+    *[Column(name, Float) for name in PRICE_COLUMNS.values()],
+    PrimaryKeyConstraint("market", "symbol", "date", name="prices_pkey"),
+    Index("ix_prices_symbol_date", "symbol", "date"),
+)
+
+
 class PostgresDB:
-    def __init__(self):
+    def __init__(self, url: str = None):
+        """
+        Args:
+            url (str): SQLAlchemy URL overriding the DB_* environment settings (env DATABASE_URL),
+                e.g. a SQLite stand-in for local runs.
+        """
         self.user = os.environ.get("DB_USER", "postgres")
         self.password = os.environ.get("DB_PASSWORD")
         self.host = os.environ.get("DB_HOST", "localhost")
         self.port = os.environ.get("DB_PORT", 5432)
         self.db_name = os.environ.get("DB_NAME", "stockdb")
+        self.url = url or os.environ.get("DATABASE_URL")
 
-        if self.password is None:
+        if self.url is None and self.password is None:
             print("ERROR: DB_PASSWORD environment variable not set.")
             self.engine = None
         else:
@@ -19,24 +92,29 @@ class PostgresDB:
 
     def _db_connect(self):
         try:
-            engine = create_engine(
-                f"postgresql+psycopg2://{self.user}:{self.password}@{self.host}:{self.port}/{self.db_name}"
+            return get_engine(
+                self.url or f"postgresql+psycopg2://{self.user}:{self.password}@{self.host}:{self.port}/{self.db_name}"
             )
-            return engine
         except Exception as e:
             print(f"ERROR: Unable to connect to the database: {e}")
             return None
 
-    def fetch_data(self, query: str) -> pd.DataFrame:
+    def fetch_data(self, query: str, params: dict = None) -> pd.DataFrame:
         if self.engine is None:
             return pd.DataFrame()
         try:
             with self.engine.connect() as connection:
-                return pd.read_sql(query, connection)
+                return pd.read_sql(text(query), connection, params=params)
         except Exception as e:
             print(f"ERROR: An error occurred while fetching data: {e}")
             return pd.DataFrame()
 
+    async def fetch_data_async(self, query: str, params: dict = None) -> pd.DataFrame:
+        """
+        Runs `fetch_data` in a worker thread so async handlers don't block the event loop.
+        """
+        return await asyncio.to_thread(self.fetch_data, query, params)
+
     def save_data(self, dataframe: pd.DataFrame, table_name: str, if_exists="replace"):
         if self.engine is None:
             return
@@ -47,18 +125,126 @@ class PostgresDB:
         except Exception as e:
             print(f"ERROR: An error occurred while saving data: {e}")
 
+    def ensure_prices_table(self):
+        if self.engine in _prices_ready:
+            return
+        # Pipeline stages sync symbols from several threads; only one creates the table.
+        with _engines_lock:
+            if self.engine not in _prices_ready:
+                metadata.create_all(self.engine, tables=[prices_table])
+                _prices_ready.add(self.engine)
+
+    @staticmethod
+    def _normalize_prices(market: str, symbol: str, dataframe: pd.DataFrame) -> pd.DataFrame:
+        rows = pd.DataFrame({
+            "market": market.upper(),
+            "symbol": symbol.upper(),
+            "date": pd.to_datetime(dataframe["Date"]).dt.date,
+        })
+        for source, target in PRICE_COLUMNS.items():
+            rows[target] = pd.to_numeric(dataframe[source], errors="coerce") if source in dataframe.columns else None
+        return rows
+
+    def _last_synced_date(self, connection, market: str, symbol: str):
+        return connection.execute(
+            text(f"SELECT MAX(date) FROM {PRICES_TABLE} WHERE market = :market AND symbol = :symbol"),
+            {"market": market.upper(), "symbol": symbol.upper()},
+        ).scalar()
+
+    def sync_prices(self, market: str, symbol: str, dataframe: pd.DataFrame, overlap_days: int = 5,
+                    raise_errors: bool = False) -> int:
+        """
+        Incrementally upserts one symbol into the normalized prices table.
+
+        Only rows dated within `overlap_days` of the last synced bar (or later) are sent,
+        and existing rows are rewritten only when a value actually changed. Errors are
+        logged and reported as 0 rows unless `raise_errors` is set.
+
+        Returns:
+            int: Number of rows sent to the database.
+        """
+        if self.engine is None:
+            return 0
+        try:
+            self.ensure_prices_table()
+            rows = self._normalize_prices(market, symbol, dataframe)
+            with self.engine.begin() as connection:
+                last_date = self._last_synced_date(connection, market, symbol)
+                if last_date is not None:
+                    last_date = pd.Timestamp(last_date).date()
+                    rows = rows[rows["date"] >= last_date - pd.Timedelta(days=overlap_days)]
+                if rows.empty:
+                    return 0
+
+                if connection.dialect.name == "postgresql":
+                    self._copy_upsert(connection, rows)
+                else:
+                    self._executemany_upsert(connection, rows)
+            print(f"Synced {len(rows)} rows for {market}:{symbol} into '{PRICES_TABLE}'")
+            return len(rows)
+        except Exception as e:
+            print(f"ERROR: An error occurred while syncing prices for {symbol}: {e}")
+            if raise_errors:
+                raise
+            return 0
+
+    @staticmethod
+    def _copy_upsert(connection, rows: pd.DataFrame):
+        """
+        COPY the rows into a temporary table, then merge them with ON CONFLICT.
+        """
+        columns = list(rows.columns)
+        value_columns = list(PRICE_COLUMNS.values())
+        buffer = io.StringIO()
+        rows.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        connection.execute(text(
+            f"CREATE TEMP TABLE prices_stage (LIKE {PRICES_TABLE} INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(f"COPY prices_stage ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in value_columns)
+        current = ", ".join(f"{PRICES_TABLE}.{col}" for col in value_columns)
+        incoming = ", ".join(f"EXCLUDED.{col}" for col in value_columns)
+        connection.execute(text(
+            f"INSERT INTO {PRICES_TABLE} ({', '.join(columns)}) "
+            f"SELECT {', '.join(columns)} FROM prices_stage "
+            f"ON CONFLICT (market, symbol, date) DO UPDATE SET {updates} "
+            f"WHERE ({current}) IS DISTINCT FROM ({incoming})"
+        ))
+
+    @staticmethod
+    def _executemany_upsert(connection, rows: pd.DataFrame):
+        """
+        Portable fallback (e.g. SQLite) using INSERT ... ON CONFLICT with executemany.
+        """
+        columns = list(rows.columns)
+        value_columns = list(PRICE_COLUMNS.values())
+        updates = ", ".join(f"{col} = excluded.{col}" for col in value_columns)
+        changed = " OR ".join(f"{PRICES_TABLE}.{col} IS NOT excluded.{col}" for col in value_columns)
+        records = rows.astype(object).where(rows.notna(), None).to_dict("records")
+        connection.execute(text(
+            f"INSERT INTO {PRICES_TABLE} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + col for col in columns)}) "
+            f"ON CONFLICT (market, symbol, date) DO UPDATE SET {updates} WHERE {changed}"
+        ), records)
+
 
 if __name__ == "__main__":
     db = PostgresDB()
-    
+
     csvData = Path(__file__).resolve().parents[3] / "assets" / "dataPrice" / "dataPriceAMZN.csv"
 
     if csvData.exists():
         df = pd.read_csv(csvData)
-        db.save_data(df, "dataPriceAMZN")
+        db.sync_prices("NAS", "AMZN", df)
 
-        result = db.fetch_data('SELECT * FROM "dataPriceAMZN" LIMIT 5;')
+        result = db.fetch_data(
+            f"SELECT * FROM {PRICES_TABLE} WHERE symbol = :symbol ORDER BY date DESC LIMIT 5;", {"symbol": "AMZN"}
+        )
         print(result)
         print(type(result))
     else:
-        print(f"CSV file not found at {csvData}")
\ No newline at end of file
+        print(f"CSV file not found at {csvData}")
@@ -0,0 +1,176 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+
+@dataclass
+class Recipient:
+    reply_to: str
+    reply_from: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class OutboundMessage:
+    recipient: Recipient
+    body: str
+
+
+class PredictionJobQueue:
+    """
+    Bounded queue of WhatsApp prediction requests served by a fixed worker pool.
+
+    Requests for a (market, symbol) that is already queued or being computed join that
+    job instead of creating a new one, so a burst for one symbol runs one prediction.
+    When `max_pending` distinct jobs are waiting, `submit` refuses new work and the
+    caller can answer immediately. Replies are handed to a sender thread that drains
+    them in batches and sends each batch concurrently through the shared client.
+    """
+    def __init__(self, resolve: Callable[[str, str], str], client, workers: int = None, max_pending: int = None,
+                 send_batch_size: int = None, send_concurrency: int = None):
+        """
+        Args:
+            resolve (callable): resolve(market, symbol) -> reply text. Runs on a worker thread.
+            client: Twilio-compatible client (`client.messages.create(from_=, to=, body=)`).
+            workers (int): Prediction worker threads (env WHATSAPP_WORKERS, default 4).
+            max_pending (int): Distinct jobs allowed to wait (env WHATSAPP_MAX_PENDING, default 500).
+            send_batch_size (int): Replies drained per send batch (env WHATSAPP_SEND_BATCH, default 20).
+            send_concurrency (int): Concurrent sends within a batch (env WHATSAPP_SEND_CONCURRENCY, default 4).
+        """
+        self.resolve = resolve
+        self.client = client
+        self.workers = workers or int(os.environ.get("WHATSAPP_WORKERS", 4))
+        self.max_pending = max_pending or int(os.environ.get("WHATSAPP_MAX_PENDING", 500))
+        self.send_batch_size = send_batch_size or int(os.environ.get("WHATSAPP_SEND_BATCH", 20))
+        self.send_concurrency = send_concurrency or int(os.environ.get("WHATSAPP_SEND_CONCURRENCY", 4))
+
+        self._jobs = queue.Queue(maxsize=self.max_pending)
+        self._outbound = queue.Queue()
+        self._recipients: Dict[Tuple[str, str], List[Recipient]] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+
+        self.accepted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed_sends = 0
+        self.batches = 0
+        self._latencies = deque(maxlen=1000)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._work, name=f"whatsapp-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._send, name="whatsapp-sender", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10):
+        """
+        Stops accepting work and lets the threads finish what is already queued.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, market: str, symbol: str, reply_to: str, reply_from: str) -> bool:
+        """
+        Queues a prediction reply. Returns False when the queue is full.
+        """
+        key = (market.upper(), symbol.upper())
+        recipient = Recipient(reply_to, reply_from)
+        with self._lock:
+            if self._stop.is_set():
+                self.rejected += 1
+                return False
+            waiting = self._recipients.get(key)
+            if waiting is not None:
+                waiting.append(recipient)
+                self.deduplicated += 1
+                return True
+            try:
+                self._jobs.put_nowait(key)
+            except queue.Full:
+                self.rejected += 1
+                return False
+            self._recipients[key] = [recipient]
+            self.accepted += 1
+            return True
+
+    def _work(self):
+        while not (self._stop.is_set() and self._jobs.empty()):
+            try:
+                key = self._jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                body = self.resolve(*key)
+            except Exception as e:
+                body = f"Error processing {key[1]}: {e}"
+            # Recipients that joined while the job ran get this result too.
+            with self._lock:
+                recipients = self._recipients.pop(key, [])
+            for recipient in recipients:
+                self._outbound.put(OutboundMessage(recipient, body))
+
+    def _deliver(self, message: OutboundMessage):
+        try:
+            self.client.messages.create(from_=message.recipient.reply_from, to=message.recipient.reply_to,
+                                        body=message.body)
+            ok = True
+        except Exception as e:
+            print(f"ERROR: Could not send WhatsApp reply to {message.recipient.reply_to}: {e}")
+            ok = False
+        with self._lock:
+            self.completed += 1
+            self.failed_sends += 0 if ok else 1
+            self._latencies.append(time.monotonic() - message.recipient.enqueued_at)
+
+    def _send(self):
+        with ThreadPoolExecutor(max_workers=self.send_concurrency) as executor:
+            while True:
+                workers_done = self._stop.is_set() and not any(
+                    t.is_alive() for t in self._threads if t is not threading.current_thread()
+                )
+                try:
+                    batch = [self._outbound.get(timeout=0.5)]
+                except queue.Empty:
+                    if workers_done:
+                        return
+                    continue
+                while len(batch) < self.send_batch_size:
+                    try:
+                        batch.append(self._outbound.get_nowait())
+                    except queue.Empty:
+                        break
+                list(executor.map(self._deliver, batch))
+                with self._lock:
+                    self.batches += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "queued_jobs": self._jobs.qsize(),
+                "waiting_recipients": sum(len(r) for r in self._recipients.values()),
+                "outbound": self._outbound.qsize(),
+                "accepted": self.accepted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed_sends": self.failed_sends,
+                "send_batches": self.batches,
+                "latency_p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                "latency_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+            }
+
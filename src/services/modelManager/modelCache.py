@@ -1,35 +1,158 @@
 import os
+import json
 import warnings
+from typing import NamedTuple, Optional
 
-import tensorflow as tf
 from pathlib import Path
 import tempfile
 import redis
-from keras.models import load_model
 
-tf.get_logger().setLevel('ERROR')
+from . import modelSerializer
+
 warnings.filterwarnings('ignore', category=FutureWarning)
 
+
+def load_model(path):
+    """
+    keras.models.load_model with TensorFlow imported on first use, so importing this
+    module (e.g. in a serving-only API process) does not load the ML runtime.
+    """
+    import tensorflow as tf
+    from keras.models import load_model as keras_load_model
+
+    tf.get_logger().setLevel('ERROR')
+    return keras_load_model(path)
+
+class PublishedModel(NamedTuple):
+    version: Optional[int]
+    blob: bytes
+    metadata: Optional[dict]
+
+
 class RedisModelHandler:
-    def __init__(self):
+    def __init__(self, compress=None, chunk_size=None):
         redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379")
 
         self.redis = redis.from_url(redis_url)
+        self.compress = compress if compress is not None else os.environ.get("MODEL_COMPRESS", "0") == "1"
+        self.chunk_size = chunk_size if chunk_size is not None else int(os.environ.get("MODEL_CHUNK_BYTES", 8 * 1024 * 1024))
 
-    def set_model(self, model, key="keras_model"):
-        fd, path = tempfile.mkstemp(suffix=".h5")
-        os.close(fd)
-        try:
-            model.save(path)
-            with open(path, "rb") as f:
-                self.redis.set(key, f.read())
-        finally:
-            os.remove(path)
+    @staticmethod
+    def version_key(key):
+        return f"model_version:{key}"
 
-    def get_model(self, key="keras_model"):
+    @staticmethod
+    def metadata_key(key):
+        return f"model_meta:{key}"
+
+    @staticmethod
+    def chunk_key(key, index):
+        return f"{key}:chunk:{index}"
+
+    def set_model(self, model, key="keras_model", metadata=None):
+        """
+        Serializes the model in memory and stores it together with a version bump in a
+        single transaction, so in-process registries know when to reload. Blobs larger
+        than `chunk_size` are split across chunk keys behind a small manifest.
+        `metadata` (a JSON-serializable dict, e.g. scaler state) is published alongside.
+        Chunk keys left over from an earlier, larger model are deleted in the same
+        transaction.
+        """
+        blob = modelSerializer.dumps(model, compress=self.compress)
+        chunk_count = 0
+
+        pipe = self.redis.pipeline()
+        if self.chunk_size and len(blob) > self.chunk_size:
+            chunks = modelSerializer.split_chunks(blob, self.chunk_size)
+            chunk_count = len(chunks)
+            for index, chunk in enumerate(chunks):
+                pipe.set(self.chunk_key(key, index), bytes(chunk))
+            pipe.set(key, modelSerializer.chunk_manifest(chunk_count, len(blob)))
+        else:
+            pipe.set(key, blob)
+        stale = self.stale_chunk_keys(key, chunk_count)
+        if stale:
+            pipe.delete(*stale)
+        if metadata is not None:
+            pipe.set(self.metadata_key(key), json.dumps(metadata))
+        else:
+            pipe.delete(self.metadata_key(key))
+        pipe.incr(self.version_key(key))
+        pipe.execute()
+
+    def stale_chunk_keys(self, key, keep):
+        """
+        Existing chunk keys of `key` with an index of `keep` or higher.
+        """
+        prefix = self.chunk_key(key, "")
+        stale = []
+        for chunk_key in self.redis.scan_iter(match=f"{prefix}*", count=1000):
+            index = chunk_key.decode()[len(prefix):]
+            if index.isdigit() and int(index) >= keep:
+                stale.append(chunk_key)
+        return stale
+
+    def get_version(self, key="keras_model"):
+        """
+        Returns the published version of a model, or None if it was never published.
+        """
+        version = self.redis.get(self.version_key(key))
+        return None if version is None else int(version)
+
+    def get_metadata(self, key="keras_model"):
+        """
+        Returns the metadata published with a model, or None.
+        """
+        data = self.redis.get(self.metadata_key(key))
+        return None if data is None else json.loads(data)
+
+    def get_blob(self, key="keras_model"):
         data = self.redis.get(key)
         if not data:
             raise ValueError(f"No model found in Redis with key '{key}'")
+
+        manifest = modelSerializer.parse_chunk_manifest(data)
+        if manifest is not None:
+            chunks = self.redis.mget([self.chunk_key(key, i) for i in range(manifest["count"])])
+            if any(chunk is None for chunk in chunks):
+                raise ValueError(f"Incomplete chunked model in Redis with key '{key}'")
+            data = b"".join(chunks)
+        return data
+
+    def get_published(self, key="keras_model", retries=3) -> PublishedModel:
+        """
+        Reads a model's version, blob and metadata as one consistent snapshot: they are
+        fetched in a single MGET, and chunks only count if the manifest and version are
+        unchanged when the chunks are read (set_model writes all of them in one
+        transaction), otherwise the read is retried.
+
+        Raises:
+            ValueError: If no model is stored under `key`, or it kept changing.
+        """
+        for _ in range(retries):
+            version, data, metadata = self.redis.mget([self.version_key(key), key, self.metadata_key(key)])
+            if not data:
+                raise ValueError(f"No model found in Redis with key '{key}'")
+
+            manifest = modelSerializer.parse_chunk_manifest(data)
+            if manifest is not None:
+                current = self.redis.mget([self.version_key(key), key] +
+                                          [self.chunk_key(key, i) for i in range(manifest["count"])])
+                if current[:2] != [version, data] or any(chunk is None for chunk in current[2:]):
+                    continue
+                data = b"".join(current[2:])
+            return PublishedModel(None if version is None else int(version), data,
+                                  None if metadata is None else json.loads(metadata))
+        raise ValueError(f"Model in Redis with key '{key}' changed while it was being read")
+
+    def model_from_blob(self, data):
+        """
+        Builds a Keras model from a stored blob (in-memory format or legacy HDF5).
+        """
+        if modelSerializer.is_serialized_model(data):
+            return modelSerializer.loads(data)
+
+        # Legacy HDF5 blobs written before the in-memory format.
         fd, path = tempfile.mkstemp(suffix=".h5")
         os.close(fd)
         try:
@@ -39,6 +162,9 @@ class RedisModelHandler:
         finally:
             os.remove(path)
 
+    def get_model(self, key="keras_model"):
+        return self.model_from_blob(self.get_blob(key))
+
 if __name__ == "__main__":
     PROJECT_ROOT = Path(__file__).resolve().parents[3]
     model_file_path = PROJECT_ROOT / "assets" / "models" / "NPS_NABIL.h5"
@@ -48,4 +174,4 @@ if __name__ == "__main__":
     model = load_model(model_file_path)
     handler.set_model(model, "NPS_NABIL")
 
-    # model_from_redis = handler.get_model("LSTMModel")
\ No newline at end of file
+    # model_from_redis = handler.get_model("LSTMModel")
@@ -0,0 +1,189 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .modelCache import RedisModelHandler
+
+
+@dataclass
+class _RegistryEntry:
+    model: Any
+    version: Optional[int]
+    nbytes: int
+    checked_at: float
+    metadata: Optional[dict] = None
+
+
+def estimate_model_bytes(model) -> int:
+    """
+    Estimates the resident size of a model from its weight buffers.
+    """
+    try:
+        return int(sum(w.nbytes for w in model.get_weights()))
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """
+    Process-level registry of deserialized Keras models.
+
+    Models are loaded from Redis once and kept in memory. Each lookup compares the
+    cached version with the lightweight `model_version:{key}` counter published by
+    `RedisModelHandler.set_model`, and reloads only when it changed. A reload builds a
+    new model from one consistent snapshot of version, weights and metadata and then
+    swaps the entry, so callers still predicting with the old model are unaffected.
+    The registry is
+    a bounded LRU: entries are evicted when either the model count or the estimated
+    weight memory exceeds its limit.
+
+    With the "numpy" backend, models are served by `usemodel.liteModel.LiteModel`, so
+    inference never imports TensorFlow; architectures it does not support fall back
+    to Keras.
+    """
+    def __init__(self, handler: Optional[RedisModelHandler] = None, max_models: Optional[int] = None,
+                 max_bytes: Optional[int] = None, check_interval: Optional[float] = None,
+                 backend: Optional[str] = None, quantize: Optional[str] = None):
+        """
+        Args:
+            handler (RedisModelHandler): Source of model blobs and versions. Created lazily if omitted.
+            max_models (int): Maximum number of resident models (env MODEL_REGISTRY_MAX_MODELS, default 32).
+            max_bytes (int): Maximum estimated weight memory in bytes (env MODEL_REGISTRY_MAX_BYTES, default 512 MB).
+            check_interval (float): Seconds during which a cached model is served without re-checking
+                its version (env MODEL_REGISTRY_CHECK_INTERVAL, default 0, i.e. check on every lookup).
+            backend (str): "keras" or "numpy" (env INFERENCE_BACKEND, default keras).
+            quantize (str): Weight storage of the numpy backend, "float16" or "int8"
+                (env INFERENCE_QUANTIZE, default none, i.e. float32).
+        """
+        self._handler = handler
+        self.max_models = max_models if max_models is not None else int(os.environ.get("MODEL_REGISTRY_MAX_MODELS", 32))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("MODEL_REGISTRY_MAX_BYTES", 512 * 1024 * 1024))
+        self.check_interval = check_interval if check_interval is not None else float(os.environ.get("MODEL_REGISTRY_CHECK_INTERVAL", 0))
+        self.backend = backend or os.environ.get("INFERENCE_BACKEND", "keras")
+        self.quantize = quantize or os.environ.get("INFERENCE_QUANTIZE") or None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def handler(self) -> RedisModelHandler:
+        if self._handler is None:
+            self._handler = RedisModelHandler()
+        return self._handler
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key: str) -> Optional[_RegistryEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def get_model(self, key: str):
+        """
+        Returns the resident model for `key`, loading it from Redis on first use or
+        when a newer version has been published.
+
+        Raises:
+            ValueError: If no model is stored in Redis under `key`.
+        """
+        entry = self._lookup(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            self.hits += 1
+            return entry.model
+
+        # One loader per key; concurrent callers for the same key wait for it.
+        with self._key_lock(key):
+            entry = self._lookup(key)
+            version = self.handler.get_version(key)
+            if entry is not None and entry.version == version:
+                entry.checked_at = time.monotonic()
+                self.hits += 1
+                return entry.model
+
+            published = self.handler.get_published(key)
+            if self.backend == "numpy":
+                model = self._load_lite(key, published.blob)
+            else:
+                model = self.handler.model_from_blob(published.blob)
+            self.loads += 1
+            self._store(key, _RegistryEntry(model, published.version, estimate_model_bytes(model), time.monotonic(),
+                                            published.metadata))
+            return model
+
+    def _load_lite(self, key: str, blob: bytes):
+        from ..usemodel.liteModel import LiteModel, UnsupportedModelError
+
+        try:
+            return LiteModel.from_blob(blob, self.quantize)
+        except UnsupportedModelError as e:
+            print(f"ModelRegistry: '{key}' falls back to Keras ({e}).")
+            return self.handler.model_from_blob(blob)
+
+    def _store(self, key: str, entry: _RegistryEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_models or self.resident_bytes() > self.max_bytes
+            ):
+                evicted, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                print(f"ModelRegistry evicted '{evicted}'.")
+
+    def version(self, key: str) -> Optional[int]:
+        """
+        Version of the resident model for `key` (None if not resident or unversioned).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.version
+
+    def metadata(self, key: str) -> Optional[dict]:
+        """
+        Metadata published with the resident model for `key` (call `get_model` first).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.metadata
+
+    def resident_bytes(self) -> int:
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": list(self._entries.keys()),
+                "resident_bytes": self.resident_bytes(),
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "backend": self.backend,
+            }
+
+
+model_registry = ModelRegistry()
+
+if __name__ == "__main__":
+    model = model_registry.get_model("NPS_NABIL")
+    model = model_registry.get_model("NPS_NABIL")
+    print(model_registry.stats())
@@ -0,0 +1,165 @@
+import json
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"RTAIMDL1"
+CHUNK_MAGIC = b"RTAICHK1"
+_HEADER = struct.Struct("<I")
+
+
+def dumps(model, compress: bool = False, level: int = 1) -> bytes:
+    """
+    Serializes a model fully in memory: architecture JSON plus every weight as a
+    raw contiguous NumPy buffer, optionally zlib-compressed.
+
+    Layout: MAGIC | uint32 metadata length | metadata JSON | weight payload
+    """
+    weights = [np.ascontiguousarray(w) for w in model.get_weights()]
+    payload = b"".join(w.tobytes() for w in weights)
+    if compress:
+        payload = zlib.compress(payload, level)
+
+    meta = json.dumps({
+        "architecture": model.to_json(),
+        "compression": "zlib" if compress else None,
+        "weights": [{"dtype": w.dtype.str, "shape": list(w.shape)} for w in weights],
+    }).encode("utf-8")
+
+    return b"".join([MAGIC, _HEADER.pack(len(meta)), meta, payload])
+
+
+def is_serialized_model(blob: bytes) -> bool:
+    return blob[:len(MAGIC)] == MAGIC
+
+
+def _parse(blob: bytes):
+    if not is_serialized_model(blob):
+        raise ValueError("Blob is not a serialized RetainAI model.")
+    view = memoryview(blob)
+    start = len(MAGIC) + _HEADER.size
+    (meta_len,) = _HEADER.unpack(view[len(MAGIC):start])
+    meta = json.loads(bytes(view[start:start + meta_len]))
+
+    payload = view[start + meta_len:]
+    if meta["compression"] == "zlib":
+        payload = zlib.decompress(payload)
+
+    weights, offset = [], 0
+    for spec in meta["weights"]:
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        # np.frombuffer returns views over the payload; nothing is copied until set_weights.
+        weights.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(spec["shape"]))
+        offset += count * dtype.itemsize
+    return meta, weights
+
+
+def loads(blob: bytes):
+    """
+    Rebuilds a model from `dumps` output without touching the filesystem.
+    """
+    meta, weights = _parse(blob)
+    # Imported on first use so processes that never deserialize a model skip TensorFlow.
+    from keras.models import model_from_json
+
+    model = model_from_json(meta["architecture"])
+    model.set_weights(weights)
+    return model
+
+
+def load_weights_into(model, blob: bytes):
+    """
+    Copies the weights of a serialized model into an already-built model of the same
+    architecture, reusing its graph instead of re-creating it.
+
+    Raises:
+        ValueError: If the weight shapes do not match the target model.
+    """
+    _, weights = _parse(blob)
+    expected = [tuple(w.shape) for w in model.weights]
+    if expected != [w.shape for w in weights]:
+        raise ValueError("Serialized weights do not match the target model architecture.")
+    model.set_weights(weights)
+    return model
+
+
+def read(blob: bytes):
+    """
+    Returns the architecture config and the weight arrays of a serialized model
+    without building it, so no ML runtime is needed (see usemodel.liteModel).
+    """
+    meta, weights = _parse(blob)
+    return json.loads(meta["architecture"]), weights
+
+
+def split_chunks(blob: bytes, chunk_size: int) -> list:
+    view = memoryview(blob)
+    return [view[i:i + chunk_size] for i in range(0, len(blob), chunk_size)]
+
+
+def chunk_manifest(count: int, total_bytes: int) -> bytes:
+    return CHUNK_MAGIC + json.dumps({"count": count, "bytes": total_bytes}).encode("utf-8")
+
+
+def parse_chunk_manifest(blob: bytes):
+    """
+    Returns the manifest dict if `blob` points to chunked storage, otherwise None.
+    """
+    if blob[:len(CHUNK_MAGIC)] != CHUNK_MAGIC:
+        return None
+    return json.loads(blob[len(CHUNK_MAGIC):])
+
+
+if __name__ == "__main__":
+    import os
+    import time
+    import tempfile
+    from keras.models import Sequential, load_model
+    from keras.layers import LSTM, Dense, Input
+
+    model = Sequential([Input(shape=(15, 1)), LSTM(20), Dense(1)])
+    model.compile(optimizer="adam", loss="mean_squared_error")
+    runs = 20
+
+    def h5_dump(m):
+        fd, path = tempfile.mkstemp(suffix=".h5")
+        os.close(fd)
+        try:
+            m.save(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def h5_load(blob):
+        fd, path = tempfile.mkstemp(suffix=".h5")
+        os.close(fd)
+        try:
+            with open(path, "wb") as f:
+                f.write(blob)
+            return load_model(path)
+        finally:
+            os.remove(path)
+
+    candidates = {
+        "h5 tempfile": (h5_dump, h5_load),
+        "raw": (dumps, loads),
+        "raw+zlib": (lambda m: dumps(m, compress=True), loads),
+        "raw in-place": (dumps, lambda b: load_weights_into(model, b)),
+    }
+
+    print(f"{'format':<14}{'bytes':>10}{'dump ms':>10}{'load ms':>10}")
+    for name, (dump, load) in candidates.items():
+        start = time.perf_counter()
+        for _ in range(runs):
+            blob = dump(model)
+        dump_ms = (time.perf_counter() - start) / runs * 1000
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            load(blob)
+        load_ms = (time.perf_counter() - start) / runs * 1000
+
+        print(f"{name:<14}{len(blob):>10}{dump_ms:>10.2f}{load_ms:>10.2f}")
@@ -0,0 +1,192 @@
+"""
+Concurrent load test for the HTTP API.
+
+    python -m src.services.predictAPI.loadtest http://localhost:8000/stocks/AAPL --concurrency 50 --requests 2000
+
+Run it once against a server built from the previous revision and once against the
+current one to compare requests per second. `--db` instead compares the /stocks data
+path in-process (engine per request + row iteration vs. pooled engine + vectorized
+conversion) against the database configured through DATABASE_URL / DB_*.
+
+`--stream N` opens N simulated /stream subscribers (server-sent events) against the
+server at the given URL, writes predictions for a test symbol to the Redis at
+REDIS_URL, as a training cycle would, and reports how many subscribers received each
+update and how long after the write. Raise the open file limit (ulimit -n) first for
+thousands of subscribers.
+"""
+import json
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def _report(name: str, latencies: list, statuses: Counter, elapsed: float):
+    latencies = sorted(latencies)
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"{name}: {len(latencies) / elapsed:.1f} req/s over {len(latencies)} requests "
+          f"(p50 {quantile(0.50):.1f} ms, p95 {quantile(0.95):.1f} ms, p99 {quantile(0.99):.1f} ms, "
+          f"mean {statistics.mean(latencies) * 1000:.1f} ms) statuses={dict(statuses)}")
+
+
+def run_load(name: str, call, total: int, concurrency: int):
+    """
+    Calls `call()` `total` times from `concurrency` threads and prints throughput and latency.
+    `call` returns a status label.
+    """
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+
+    def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                status = call()
+            except Exception as e:
+                status = type(e).__name__
+            duration = time.perf_counter() - start
+            with lock:
+                latencies.append(duration)
+                statuses[status] += 1
+
+    shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, shares))
+    _report(name, latencies, statuses, time.perf_counter() - start)
+
+
+def http_load(url: str, total: int, concurrency: int):
+    local = threading.local()
+
+    def call():
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session.get(url, timeout=30).status_code
+
+    run_load(url, call, total, concurrency)
+
+
+def db_path_load(symbol: str, total: int, concurrency: int):
+    import pandas as pd
+    from sqlalchemy import create_engine, text
+
+    from ..database.postgresbase import PostgresDB
+    from .predictAPI import STOCK_CHART_QUERY, build_chart_data
+
+    pooled = PostgresDB()
+    if pooled.engine is None:
+        raise SystemExit("No database configured.")
+    url = pooled.engine.url.render_as_string(hide_password=False)
+
+    def before():
+        # Previous behaviour: fresh engine/pool per request and row-by-row conversion.
+        engine = create_engine(url)
+        try:
+            with engine.connect() as connection:
+                df = pd.read_sql(text(STOCK_CHART_QUERY), connection, params={"symbol": symbol})
+        finally:
+            engine.dispose()
+        df = df.sort_values(by="Date", ascending=True).reset_index(drop=True)
+        [{"timestamp": row["Date"], "high": float(row["High"]), "low": float(row["Low"]),
+          "close": float(row["Close"]), "volume": int(row["Volume"])} for _, row in df.iterrows()]
+        return "ok"
+
+    def after():
+        build_chart_data(pooled.fetch_data(STOCK_CHART_QUERY, {"symbol": symbol}))
+        return "ok"
+
+    run_load("before", before, total, concurrency)
+    run_load("after", after, total, concurrency)
+
+
+async def _stream_load(url: str, symbol: str, subscribers: int, updates: int, interval: float):
+    from ..cacheManager.cacheManager import save_value
+
+    parts = urllib.parse.urlsplit(url)
+    # HTTP/1.0 keeps the event stream unchunked, so it can be read line by line.
+    request = (f"GET /stream?symbols={symbol} HTTP/1.0\r\nHost: {parts.netloc}\r\n"
+               f"Accept: text/event-stream\r\n\r\n").encode()
+    statuses, latencies, received = Counter(), [], Counter()
+    connecting = asyncio.Semaphore(200)
+    all_connected = asyncio.Event()
+    start = time.time()
+
+    async def subscriber():
+        try:
+            async with connecting:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                writer.write(request)
+                await writer.drain()
+                status = (await reader.readline()).split()[1].decode()
+        except Exception as e:
+            status = type(e).__name__
+        statuses[status] += 1
+        if sum(statuses.values()) == subscribers:
+            all_connected.set()
+        if status != "200":
+            return
+        try:
+            async for line in reader:
+                if line.startswith(b"data: ") and b'"prediction"' in line:
+                    payload = json.loads(line[6:])
+                    # Skip the snapshot sent on connect
+                    if payload["as_of"] >= start:
+                        latencies.append(time.time() - payload["as_of"])
+                        received[payload["prediction"]] += 1
+        finally:
+            writer.close()
+
+    clients = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    await all_connected.wait()
+    print(f"{statuses['200']} of {subscribers} subscribers connected: {dict(statuses)}")
+
+    for update in range(updates):
+        await asyncio.to_thread(save_value, symbol, float(update), ttl=300)
+        await asyncio.sleep(interval)
+    await asyncio.sleep(2.0)
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+
+    if not latencies:
+        print("No updates received.")
+        return
+    latencies.sort()
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    per_update = [received[float(update)] for update in range(updates)]
+    print(f"{len(latencies)} of {updates * statuses['200']} updates delivered "
+          f"(min {min(per_update)}, max {max(per_update)} subscribers per update), write-to-client latency "
+          f"p50 {quantile(0.50):.1f} ms, p95 {quantile(0.95):.1f} ms, p99 {quantile(0.99):.1f} ms")
+
+
+def stream_load(url: str, symbol: str, subscribers: int, updates: int, interval: float):
+    asyncio.run(_stream_load(url, symbol, subscribers, updates, interval))
+    stats_url = urllib.parse.urljoin(url, "/stream/stats")
+    print(f"Server: {requests.get(stats_url, timeout=30).json()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url", nargs="?", default="http://localhost:8000/stocks/AAPL")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db", metavar="SYMBOL", help="compare the /stocks data path in-process for SYMBOL")
+    parser.add_argument("--stream", metavar="SUBSCRIBERS", type=int, help="simulate SUBSCRIBERS /stream clients")
+    parser.add_argument("--symbol", default="LOADTEST", help="symbol whose predictions --stream writes")
+    parser.add_argument("--updates", type=int, default=20, help="predictions written by --stream")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between --stream updates")
+    args = parser.parse_args()
+
+    if args.stream:
+        stream_load(args.url, args.symbol.upper(), args.stream, args.updates, args.interval)
+    elif args.db:
+        db_path_load(args.db.upper(), args.requests, args.concurrency)
+    else:
+        http_load(args.url, args.requests, args.concurrency)
@@ -1,32 +1,34 @@
 import re
 import asyncio
-from pathlib import Path
+from dataclasses import asdict
+from typing import List, Optional
 from xml.sax.saxutils import escape
 
 import os
 import pandas as pd
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, Form, Response, Request, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Form, Header, Response, Request
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from twilio.rest import Client
 from telegram import Update
 from telegram.ext import ContextTypes
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
 
-from ..usemodel.predictprice import ModelPredictor
-from ..trainmodel.model import ModelFineTuning
-from ..webscrapper.nps_priceScrappy import scrape_and_save
-from ..webscrapper.nas_priceScrappy import StockDataService
-from ..cacheManager.cacheManager import save_value, get_value
-from ..modelManager.modelCache import RedisModelHandler
-from ..database.postgresbase import PostgresDB
-
-from keras.models import load_model
+from ..usemodel.predictprice import PredictionRequest, GlobalForecaster, micro_batcher, GLOBAL_MODEL, GLOBAL_MODEL_KEY
+from ..cacheManager.cacheManager import (save_value, save_values, get_forecast_async, publish_bars_async,
+                                         close_async_client)
+from ..cacheManager.predictionCache import prediction_cache
+from ..cacheManager.responseCache import stock_response_cache, etag_matches
+from ..modelManager.modelRegistry import model_registry
+from ..database.postgresbase import PostgresDB, PRICES_TABLE, dispose_engines
+from ..priceStore.priceStore import price_store
+from ..messaging.whatsappQueue import PredictionJobQueue
+from ..streaming.barIngestor import BarIngestor, IngestResult, predict_window
+from ..streaming.broadcaster import update_broadcaster
 
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -55,183 +57,23 @@ account_sid = os.getenv("TWILIO_ACCOUNT_SID")
 auth_token = os.getenv("TWILIO_AUTH_TOKEN")
 
 client = Client(account_sid, auth_token)
-PROJECT_ROOT = Path(__file__).resolve().parents[3]
-
-training_data_path = PROJECT_ROOT / "assets" / "dataPrice"
-pre_trained_model_path = PROJECT_ROOT / "assets" / "models"
-
 scheduler = BackgroundScheduler()
-train_lock = asyncio.Lock()
-cache_predictions_lock = asyncio.Lock()
-cache_model_lock = asyncio.Lock()
-cache_priceData_lock = asyncio.Lock()
-delete_files_lock = asyncio.Lock()
-
-NAS = ["NVDA","MSFT","AAPL","AMZN","TSLA"]
-NPS = ["GBIME","NABIL","CIT","EBL","HIDCL"]
-
-async def train_model_periodically():
-    """
-    Asynchronously fine-tunes a separate prediction model for each stock.
-    It iterates through NAS and NPS lists, training each model with its
-    corresponding data file. A lock prevents concurrent training runs.
-    """
-    async with train_lock:
-        
-        # Combine all stocks into a dictionary to associate them with their market
-        all_stocks = {"NAS": NAS, "NPS": NPS}
-
-        for market, stock_list in all_stocks.items():
-            for stock_symbol in stock_list:
-                try:
-                    stock_data_path = training_data_path / f"dataPrice{stock_symbol}.csv"
-                    stock_model_path = pre_trained_model_path / f"{market}_{stock_symbol}.h5"
-
-                    # Check if the data file exists before proceeding
-                    if not stock_data_path.exists():
-                        print(f"WARNING: Data file not found for {stock_symbol} at {stock_data_path}. Skipping training.")
-                        continue
-
-                    # Instantiate the fine-tuning class with specific paths for stock
-                    fine_tuning_model = ModelFineTuning(stock_data_path, stock_model_path)
-                    fine_tuning_model.data_frame_training()
-                    fine_tuning_model.load_pre_trained_model()
-                    fine_tuning_model.fine_tune()
-
-                except Exception as e:
-                    print(f"ERROR: An error occurred while training model for {stock_symbol}: {e}")
-
-async def cache_predictions():
-    """
-    Asynchronously caches the predicted stock prices in Redis.
-    It retrieves the predictions for each stock and saves them with a TTL.
-    """
-    async with cache_predictions_lock:
-        redis_handler = RedisModelHandler()	
-        all_stocks = {"NAS": NAS, "NPS": NPS}
+stock_db = PostgresDB()
 
-        for market, stock_list in all_stocks.items():
-            for stock_symbol in stock_list:
-                try:
-                    stock_data_path = training_data_path / f"dataPrice{stock_symbol}.csv"
-                    # stock_model_path = pre_trained_model_path / f"{market}_{stock_symbol}.h5"
+# Serving-only replicas answer purely from the prediction snapshots in Redis that the
+# training/inference worker writes; they run no scheduler and never import TensorFlow
+# unless SERVING_FALLBACK_INFERENCE=1 allows predicting a missing snapshot in process.
+SERVING_ONLY = os.getenv("SERVING_ONLY", "0") == "1"
+FALLBACK_INFERENCE = not SERVING_ONLY or os.getenv("SERVING_FALLBACK_INFERENCE", "0") == "1"
 
-                    if not stock_data_path.exists():
-                        print(f"WARNING: Data file not found for {stock_symbol} at {stock_data_path}. Skipping caching.")
-                        continue
+# With EMBEDDED_SCHEDULER=0 the background jobs run only in the standalone worker
+# (worker.py); embedded or not, each cycle runs on a single node via the job lease.
+EMBEDDED_SCHEDULER = not SERVING_ONLY and os.getenv("EMBEDDED_SCHEDULER", "1") == "1"
 
-                    # Fetch model from Redis
-                    model_key = f"{market}_{stock_symbol}"	
-                    model = redis_handler.get_model(model_key)	
-
-                    # Get prediction using the cached model	
-                    model_predictor = ModelPredictor(stock_data_path, model=model)	
-                    prediction = float(model_predictor._generate_prediction())
-
-                    save_value(stock_symbol, prediction)
-
-                except Exception as e:
-                    print(f"ERROR: An error occurred while caching prediction for {stock_symbol}: {e}")
-
-async def cacheModel():
-    """
-    Asynchronously caches all pre-trained models in Redis.
-    It loads each model from the specified directory and saves it with its filename as the key.
-    """
-    async with cache_model_lock:
-        PROJECT_ROOT = Path(__file__).resolve().parents[3]
-        model_file_path = PROJECT_ROOT / "assets" / "models"
-
-        redis_handler = RedisModelHandler()
-
-        for model_file in model_file_path.glob("*.h5"):
-            model = load_model(model_file)
-            redis_handler.set_model(model, model_file.stem)
-
-async def cachePriceData():
-    """
-    Asynchronously caches all price data CSV files into the PostgreSQL database.
-    It reads each CSV file in the specified directory and saves it to the database.
-    """
-    async with cache_priceData_lock:
-        PROJECT_ROOT = Path(__file__).resolve().parents[3]
-        priceData_file_path = PROJECT_ROOT / "assets" / "dataPrice"
-
-        postgres_handler = PostgresDB()
-
-        for priceData_file in priceData_file_path.glob("*.csv"):
-            dataframe = pd.read_csv(priceData_file)
-            table_name = priceData_file.stem
-            
-            await asyncio.to_thread(postgres_handler.save_data, dataframe, table_name)
-
-async def delete_files():
-    """
-    Deletes all files from both dataPrice (CSV) and models (H5).
-    """
-    async with delete_files_lock:
-        data_path = PROJECT_ROOT / "assets" / "dataPrice"
-        model_path = PROJECT_ROOT / "assets" / "models"
-
-        for file in data_path.glob("*.csv"):
-            try:
-                file.unlink()
-                print(f"Deleted data file: {file}")
-            except Exception as e:
-                print(f"ERROR: Could not delete data file {file}: {e}")
-
-        for file in model_path.glob("*.h5"):
-            try:
-                file.unlink()
-                print(f"Deleted model file: {file}")
-            except Exception as e:
-                print(f"ERROR: Could not delete model file {file}: {e}")
-
-def train_model_job():
-    """Wrapper to run training first, then caching predictions."""
-    async def run_all():
-        await train_model_periodically()
-        await cacheModel()
-        await cache_predictions()
-        await cachePriceData()
-        await delete_files()
-
-    asyncio.run(run_all())
-
-def scrape_all_stocks_job():
-    """
-    Scrapes data for all stocks in NAS and NPS lists and saves it to CSV files.
-    This job is designed to replace old files with new data on each run.
-    """
-    for stock_symbol in NAS:
-        try:
-            stock_service = StockDataService(stock_symbol)
-            stock_service.save_to_csv()
-        except Exception as e:
-            print(f"Error scraping data for NAS stock {stock_symbol}: {e}")
-
-    for stock_symbol in NPS:
-        try:
-            scrape_and_save(stock_symbol)
-            print(f"Successfully scraped and saved data for {stock_symbol}")
-        except Exception as e:
-            print(f"Error scraping data for NPS stock {stock_symbol}: {e}")
-
-scheduler.add_job(
-    train_model_job,
-    # CronTrigger(day_of_week='mon', hour=11, minute=0, second=0),
-    IntervalTrigger(minutes=2),
-    id='monday_training',
-    replace_existing=True
-)
+MARKETS = ("NPS", "NAS")
 
-scheduler.add_job(
-    scrape_all_stocks_job,
-    # CronTrigger(day_of_week='fri', hour=11, minute=0, second=0),
-    IntervalTrigger(minutes=1),
-    id='friday_scraping',
-    replace_existing=True
-)
+# When set, POST /bars requires this value in the X-Ingest-Token header.
+INGEST_TOKEN = os.getenv("INGEST_TOKEN")
 
 @app.on_event("startup")
 async def startup_event():
@@ -240,7 +82,24 @@ async def startup_event():
     The scheduler will immediately run any pending jobs (like the scraping job)
     and then continue based on their defined triggers.
     """
+    # Published prediction updates also drop the cached /stocks payloads on every replica
+    prediction_cache.add_listener(lambda symbols: [invalidate_stock(s) for s in symbols])
+    # ...and are pushed to the clients streaming those symbols
+    prediction_cache.add_listener(update_broadcaster.notify)
+    update_broadcaster.start()
+    prediction_cache.start()
+    whatsapp_jobs.start()
+
+    if not EMBEDDED_SCHEDULER:
+        print("Application startup: scheduler disabled, jobs run in the worker.")
+        return
+
+    # Imported here: the job module builds the model handler, training executor and
+    # content manifest, which serving-only replicas never need.
+    from ..worker.jobs import schedule_jobs
+
     print("Application startup: Starting scheduler...")
+    schedule_jobs(scheduler)
     scheduler.start()
     print("Scheduler started.")
 
@@ -250,9 +109,31 @@ async def shutdown_event():
     Shuts down the scheduler gracefully on application shutdown.
     """
     print("Application shutdown: Stopping scheduler...")
-    scheduler.shutdown()
+    if scheduler.running:
+        scheduler.shutdown()
+    whatsapp_jobs.stop()
+    prediction_cache.stop()
+    await update_broadcaster.stop()
+    dispose_engines()
+    await close_async_client()
     print("Scheduler stopped.")
 
+SNAPSHOT_MISSING = "Prediction for {symbol} is not available yet. Please try again after the next training cycle."
+
+def predict_with_global_model(market_symbol: str, stock_symbol: str) -> float:
+    """
+    Next close of one symbol from the shared multi-symbol model (GLOBAL_MODEL=1).
+
+    Raises:
+        ValueError: If the shared model is not cached or was not trained on the symbol.
+    """
+    model = model_registry.get_model(GLOBAL_MODEL_KEY)
+    forecaster = GlobalForecaster(model, model_registry.metadata(GLOBAL_MODEL_KEY))
+    forecasts = forecaster.forecast_store(price_store, [(market_symbol, stock_symbol)])
+    if not forecasts:
+        raise ValueError(f"{market_symbol}_{stock_symbol} is not covered by the global model")
+    return forecasts[f"{market_symbol}_{stock_symbol}"][0]
+
 async def predict(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if len(context.args) != 2:
         await update.message.reply_text("Usage: /predict <MARKET_SYMBOL> <STOCK_SYMBOL>")
@@ -261,21 +142,30 @@ async def predict(update: Update, context: ContextTypes.DEFAULT_TYPE):
     market_symbol = context.args[0].upper()
     stock_symbol = context.args[1].upper()
 
-    if market_symbol not in ["NPS", "NAS"]:
+    if market_symbol not in MARKETS:
         await update.message.reply_text("Invalid market. Please use NPS or NAS.")
         return
 
     try:
-        redis_handler = RedisModelHandler()
-        
-        model_key = f"{market_symbol}_{stock_symbol}"
-        model = redis_handler.get_model(model_key)
-        
-        stock_data_path = training_data_path / f"dataPrice{stock_symbol}.csv"
-        model_predictor = ModelPredictor(data_path=stock_data_path, model=model)
-        
-        prediction = model_predictor._generate_prediction()
-        reply = f"Prediction for {stock_symbol}: {float(prediction):.2f}"
+        prediction = await prediction_cache.get_value_async(stock_symbol) if SERVING_ONLY else None
+
+        if prediction is None and not FALLBACK_INFERENCE:
+            reply = SNAPSHOT_MISSING.format(symbol=stock_symbol)
+        elif prediction is None and GLOBAL_MODEL:
+            prediction = await asyncio.to_thread(predict_with_global_model, market_symbol, stock_symbol)
+            reply = f"Prediction for {stock_symbol}: {prediction:.2f}"
+        elif prediction is None:
+            model_key = f"{market_symbol}_{stock_symbol}"
+            # Loading the model and reading the price window both block; keep them off the bot's loop.
+            model = await asyncio.to_thread(model_registry.get_model, model_key)
+
+            request = await asyncio.to_thread(PredictionRequest.from_store, price_store, market_symbol,
+                                              stock_symbol, model, scaler=model_registry.metadata(model_key))
+
+            prediction = await asyncio.wrap_future(micro_batcher.submit(request))
+            reply = f"Prediction for {stock_symbol}: {float(prediction):.2f}"
+        else:
+            reply = f"Prediction for {stock_symbol}: {prediction:.2f}"
 
     except ValueError as e:
         reply = f"Could not find a cached model for {stock_symbol}. Please wait for the next training cycle. Details: {e}"
@@ -300,9 +190,69 @@ def modelApi(request: Request):
 
     return {"Hello! A static message from RetainAI 🚀"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Hit/miss and Redis latency counters of this replica's in-process caches.
+    """
+    return {"predictions": prediction_cache.stats(), "models": model_registry.stats()}
+
+def resolve_whatsapp_prediction(market_symbol: str, stock_symbol: str) -> str:
+    """
+    Builds the WhatsApp reply for one symbol; runs on a prediction queue worker.
+    """
+    try:
+        prediction = prediction_cache.get_value(stock_symbol)
+        
+        if prediction is not None:
+            prediction = float(prediction)
+        elif not FALLBACK_INFERENCE:
+            return SNAPSHOT_MISSING.format(symbol=stock_symbol)
+        elif GLOBAL_MODEL:
+            prediction = predict_with_global_model(market_symbol, stock_symbol)
+            save_value(stock_symbol, prediction, model_version=model_registry.version(GLOBAL_MODEL_KEY))
+            invalidate_stock(stock_symbol)
+        else:
+            model_key = f"{market_symbol}_{stock_symbol}"
+            model = model_registry.get_model(model_key)
+            
+            # Coalesced with concurrent requests into a single inference call
+            request = PredictionRequest.from_store(price_store, market_symbol, stock_symbol, model,
+                                                   scaler=model_registry.metadata(model_key))
+            prediction = micro_batcher.predict(request)
+            
+            save_value(stock_symbol, prediction, model_version=model_registry.version(model_key))
+            invalidate_stock(stock_symbol)
+
+        return f"Prediction for {stock_symbol}: {prediction:.2f}"
+        
+    except ValueError:
+         return f"Error: Model for {stock_symbol} not found in cache. Please try again later."
+    except FileNotFoundError:
+        return f"Error: Training data for {stock_symbol} not found."
+    except Exception as e:
+        return f"Error processing {stock_symbol}: {str(e)}"
+
+whatsapp_jobs = PredictionJobQueue(resolve_whatsapp_prediction, client)
+
+@app.get("/whatsapp/stats")
+def whatsapp_stats():
+    """
+    Queue depth, deduplication, backpressure and reply latency of the WhatsApp job queue.
+    """
+    return whatsapp_jobs.stats()
+
+@app.get("/jobs/stats")
+def jobs_stats():
+    """
+    Per-job success/failure/skip counts and last run details, shared by all nodes.
+    """
+    from ..worker.jobRunner import job_runner, JOB_NAMES
+
+    return job_runner.stats(JOB_NAMES)
+
 @app.post("/whatsapp")
-async def whatsapp_repo(background_tasks: BackgroundTasks,
-                        body: str = Form(..., alias="Body"),
+async def whatsapp_repo(body: str = Form(..., alias="Body"),
                         from_number: str = Form(..., alias="From"),
                         to_number: str = Form(..., alias="To")):
     body = body.strip()
@@ -315,85 +265,222 @@ async def whatsapp_repo(background_tasks: BackgroundTasks,
 
     market_symbol, stock_symbol = match.group(1).upper(), match.group(2).upper()
 
-    def task():
-        try:
-            prediction = get_value(stock_symbol)
-            
-            if prediction is not None:
-                prediction = float(prediction)
-            else:
-                redis_handler = RedisModelHandler()
-
-                model_key = f"{market_symbol}_{stock_symbol}"
-                model = redis_handler.get_model(model_key)
-                
-                stock_data_path = training_data_path / f"dataPrice{stock_symbol}.csv"
-                
-                model_predictor = ModelPredictor(data_path=stock_data_path, model=model)
-                prediction = float(model_predictor._generate_prediction())
-                
-                save_value(stock_symbol, prediction)
-
-            result = f"Prediction for {stock_symbol}: {prediction:.2f}"
-            
-        except ValueError:
-             result = f"Error: Model for {stock_symbol} not found in cache. Please try again later."
-        except FileNotFoundError:
-            result = f"Error: Training data for {stock_symbol} not found."
-        except Exception as e:
-            result = f"Error processing {stock_symbol}: {str(e)}"
-
-        client.messages.create(
-            from_=to_number,
-            to=from_number,
-            body=result
-        )
-
-    background_tasks.add_task(task)
+    # Bounded queue: when it is full, answer right away instead of piling up work.
+    if not whatsapp_jobs.submit(market_symbol, stock_symbol, reply_to=from_number, reply_from=to_number):
+        busy = "We are receiving a lot of requests right now. Please try again in a minute."
+        xml = f"<Response><Message><Body>{escape(busy)}</Body></Message></Response>"
+        return Response(content=xml, media_type="application/xml")
 
     ack = f"Request received for {stock_symbol} ({market_symbol}). You will receive the prediction shortly."
     xml = f"<Response><Message><Body>{escape(ack)}</Body></Message></Response>"
     return Response(content=xml, media_type="application/xml")
 
 
-@app.get("/stocks/{symbol}")
-async def get_stock_data(symbol: str):
+class Bar(BaseModel):
+    Date: str
+    Open: Optional[float] = None
+    High: Optional[float] = None
+    Low: Optional[float] = None
+    Close: float
+    Volume: Optional[float] = None
+
+class BarBatch(BaseModel):
+    market: str
+    symbol: str
+    bars: List[Bar]
+
+# Serving-only replicas without fallback inference store bars but leave predicting to the
+# worker, unless the NumPy backend makes predicting possible without TensorFlow.
+bar_ingestor = BarIngestor(predict=predict_window if FALLBACK_INFERENCE or model_registry.backend == "numpy" else None)
+
+@app.post("/bars")
+async def ingest_bars(batches: List[BarBatch], x_ingest_token: Optional[str] = Header(None)):
     """
-    Fetches the last 30 days of stock data from the PostgreSQL database
-    and the latest prediction from Redis.
+    Appends new OHLCV bars per symbol to the price store and answers with each
+    symbol's refreshed prediction, computed from its in-memory rolling window with the
+    resident model. New predictions are cached in one round trip, which also tells
+    every replica to drop its cached copies.
     """
+    if INGEST_TOKEN and x_ingest_token != INGEST_TOKEN:
+        return JSONResponse(content={"error": "Invalid ingest token."}, status_code=401)
+    invalid = [batch.market for batch in batches if batch.market.upper() not in MARKETS]
+    if invalid:
+        return JSONResponse(content={"error": f"Unknown market(s) {invalid}; use NPS or NAS."}, status_code=422)
+
+    results = await asyncio.gather(*(
+        asyncio.to_thread(bar_ingestor.ingest, batch.market, batch.symbol,
+                          [bar.model_dump(exclude_none=True) for bar in batch.bars])
+        for batch in batches
+    ), return_exceptions=True)
+    # One symbol's failure is reported in its own result instead of failing the request.
+    results = [IngestResult(batch.market.upper(), batch.symbol.upper(), 0, error=str(result))
+               if isinstance(result, Exception) else result for batch, result in zip(batches, results)]
+
+    fresh = [result for result in results if result.prediction is not None]
+    if fresh:
+        await asyncio.to_thread(save_values, {r.symbol: r.prediction for r in fresh},
+                                model_versions={r.symbol: r.model_version for r in fresh if r.model_version is not None})
+
+    # Streaming clients on every replica get the new bars as chart points
+    new_points = {}
+    for batch, result in zip(batches, results):
+        if result.appended:
+            new_points.setdefault(result.symbol, []).extend(chart_points(batch.bars, result.appended))
     try:
-        postgres_handler = PostgresDB()
-        table_name = f"dataPrice{symbol.upper()}"
+        await publish_bars_async(new_points)
+    except Exception as e:
+        print(f"ERROR: Could not publish streamed bars: {e}")
+    return {"results": [asdict(result) for result in results]}
+
+@app.get("/bars/stats")
+def bar_stats():
+    return bar_ingestor.stats()
+
+
+@app.get("/stream")
+async def stream_updates(symbols: str):
+    """
+    Server-sent events for a comma-separated list of symbols: the current prediction of
+    each on connect, then `prediction` (new value and forecast), `bars` (new chart points)
+    and `chart` (history synced, refetch /stocks) events as they happen. All streams of a
+    replica share one broadcaster, so an update costs one Redis read however many
+    clients follow the symbol.
+    """
+    requested = sorted({symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()})
+    if not requested or len(requested) > update_broadcaster.max_symbols \
+            or not all(re.fullmatch(r"[A-Z0-9.\-]+", symbol) for symbol in requested):
+        return JSONResponse(
+            content={"error": f"Pass 1 to {update_broadcaster.max_symbols} comma-separated stock symbols."},
+            status_code=422
+        )
+    if update_broadcaster.full():
+        return JSONResponse(content={"error": "Too many open streams. Please poll /stocks instead."}, status_code=503)
+
+    return StreamingResponse(update_broadcaster.stream(requested), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/stream/stats")
+def stream_stats():
+    """
+    Open streams, followed symbols and fan-out counters of this replica.
+    """
+    return update_broadcaster.stats()
+
+
+STOCK_CHART_QUERY = (
+    f'SELECT date AS "Date", high AS "High", low AS "Low", close AS "Close", volume AS "Volume" '
+    f'FROM {PRICES_TABLE} WHERE market = :market AND symbol = :symbol ORDER BY date DESC LIMIT 30'
+)
+STOCK_MARKETS_QUERY = f"SELECT DISTINCT market FROM {PRICES_TABLE} WHERE symbol = :symbol"
+
+
+class AmbiguousSymbolError(ValueError):
+    """
+    The symbol is listed in several markets and the request did not pick one.
+    """
+    def __init__(self, symbol: str, markets: List[str]):
+        super().__init__(f"{symbol} is listed in several markets {markets}; pass ?market= to choose one.")
+        self.markets = markets
+
 
-        # This is the corrected line
-        query = f'SELECT * FROM "{table_name}" ORDER BY "Date" DESC LIMIT 30'
-        df = postgres_handler.fetch_data(query)
+def stock_cache_key(market: Optional[str], symbol: str) -> str:
+    return f"{market or '*'}:{symbol}"
 
-        # Also, make sure to sort the data for the chart
-        if not df.empty:
-            df = df.sort_values(by="Date", ascending=True).reset_index(drop=True)
+def invalidate_stock(symbol: str):
+    """
+    Drops the cached /stocks payloads of `symbol`, with or without a market given.
+    """
+    for market in (None,) + MARKETS:
+        stock_response_cache.invalidate(stock_cache_key(market, symbol))
+
+def build_chart_data(df: pd.DataFrame) -> list:
+    """
+    Converts the newest-first query result into ascending chart points with
+    column-wise conversions instead of iterating rows.
+    """
+    df = df.iloc[::-1]
+    chart = pd.DataFrame({
+        "timestamp": df["Date"].astype(str).to_numpy(),
+        "high": df["High"].astype(float).to_numpy(),
+        "low": df["Low"].astype(float).to_numpy(),
+        "close": df["Close"].astype(float).to_numpy(),
+        "volume": df["Volume"].fillna(0).astype("int64").to_numpy(),
+    })
+    return chart.to_dict(orient="records")
+
+def chart_points(bars: List[Bar], count: int) -> list:
+    """
+    Chart points, in build_chart_data's format, of the `count` newest dates in `bars`
+    (the last bar of a date wins, as when they are stored).
+    """
+    latest = {pd.Timestamp(bar.Date).strftime("%Y-%m-%d"): bar for bar in bars}
+    dates = sorted(latest)[-count:] if count > 0 else []
+    return [{"timestamp": date, "high": latest[date].High, "low": latest[date].Low,
+             "close": latest[date].Close, "volume": int(latest[date].Volume or 0)} for date in dates]
+
+async def load_stock_payload(symbol: str, market: Optional[str] = None):
+    """
+    Builds the /stocks/{symbol} payload, or returns None when the symbol has no history.
+    Without `market` the symbol's only market is used.
 
-        if df.empty:
+    Raises:
+        AmbiguousSymbolError: If no market is given and the symbol is listed in several.
+    """
+    # Shared pooled engine; the blocking queries run in a worker thread.
+    if market is None:
+        markets = await stock_db.fetch_data_async(STOCK_MARKETS_QUERY, {"symbol": symbol})
+        markets = [] if markets.empty else sorted(markets["market"])
+        if len(markets) > 1:
+            raise AmbiguousSymbolError(symbol, markets)
+        if not markets:
+            return None
+        market = markets[0]
+    df = await stock_db.fetch_data_async(STOCK_CHART_QUERY, {"market": market, "symbol": symbol})
+
+    if df.empty:
+        return None
+
+    chart_data = build_chart_data(df)
+
+    prediction = await prediction_cache.get_value_async(symbol)
+    # Only written when models run in forecasting mode (FORECAST_HORIZON > 1)
+    forecast = await get_forecast_async(symbol)
+
+    return {"symbol": symbol, "market": market, "chartData": chart_data, "prediction": prediction,
+            "forecast": None if forecast is None else forecast.prices}
+
+@app.get("/stocks/{symbol}")
+async def get_stock_data(symbol: str, request: Request, market: Optional[str] = None):
+    """
+    Fetches the last 30 days of stock data from the PostgreSQL database
+    and the latest prediction from Redis. `market` (NPS or NAS) is only required for a
+    symbol listed in both.
+    The serialized payload is cached per market and symbol until the next price sync or
+    prediction refresh; concurrent cold requests share one load, and clients revalidating
+    with If-None-Match get a 304.
+    """
+    symbol = symbol.upper()
+    market = market.upper() if market else None
+    if market is not None and market not in MARKETS:
+        return JSONResponse(content={"error": f"Unknown market {market}; use NPS or NAS."}, status_code=422)
+    try:
+        cached = await stock_response_cache.get_or_load(stock_cache_key(market, symbol),
+                                                        lambda: load_stock_payload(symbol, market))
+
+        if cached is None:
             return JSONResponse(
                 content={"error": f"No historical data found for {symbol} in the database."},
                 status_code=404
             )
 
-        chart_data = []
-        for _, row in df.iterrows():
-            chart_data.append({
-                "timestamp": row["Date"],
-                "high": float(row["High"]),
-                "low": float(row["Low"]),
-                "close": float(row["Close"]),
-                "volume": int(row["Volume"]),
-            })
-
-        prediction = get_value(symbol)
-        
-        return {"symbol": symbol, "chartData": chart_data, "prediction": prediction}
+        headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+        if etag_matches(cached.etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=cached.body, media_type="application/json", headers=headers)
 
+    except AmbiguousSymbolError as e:
+        return JSONResponse(content={"error": str(e), "markets": e.markets}, status_code=409)
     except Exception as e:
         print(f"ERROR: Could not fetch data for {symbol}. Reason: {e}")
-        return JSONResponse(content={"error": "An internal server error occurred."}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"error": "An internal server error occurred."}, status_code=500)
@@ -0,0 +1,60 @@
+"""
+Startup time and memory of the API in full vs. serving-only mode.
+
+    python -m src.services.predictAPI.startupBenchmark
+
+Each mode runs in a fresh interpreter: import the app, run its startup handlers and,
+in full mode, load the ML stack the way the first training/inference cycle does.
+Peak RSS is read from the child process itself.
+"""
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+CHILD = r"""
+import os, sys, json, time, asyncio, resource
+start = time.perf_counter()
+from src.services.predictAPI import predictAPI
+imported = time.perf_counter()
+
+async def lifecycle():
+    # One loop for startup and shutdown, as under uvicorn: background tasks are bound to it.
+    await predictAPI.app.router.startup()
+    started = time.perf_counter()
+    if not predictAPI.SERVING_ONLY:
+        import keras  # what the first scheduled cycle or fallback prediction loads
+    ready = time.perf_counter()
+    await predictAPI.app.router.shutdown()
+    return started, ready
+
+started, ready = asyncio.run(lifecycle())
+tf_loaded = "tensorflow" in sys.modules
+jobs_loaded = "src.services.worker.jobs" in sys.modules
+print(json.dumps({
+    "import_s": imported - start,
+    "startup_s": started - imported,
+    "ready_s": ready - start,
+    "tensorflow_loaded": tf_loaded,
+    "jobs_loaded": jobs_loaded,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def measure(serving_only: bool) -> dict:
+    env = dict(os.environ, SERVING_ONLY="1" if serving_only else "0", TF_CPP_MIN_LOG_LEVEL="3")
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    for label, serving_only in (("full", False), ("serving-only", True)):
+        result = measure(serving_only)
+        print(f"{label:>12}: import {result['import_s']:.2f}s, startup {result['startup_s']:.2f}s, "
+              f"ready {result['ready_s']:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB, "
+              f"TensorFlow loaded: {result['tensorflow_loaded']}, jobs loaded: {result['jobs_loaded']}")
@@ -0,0 +1,316 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies.
+    fcntl = None
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_ROOT = PROJECT_ROOT / "assets" / "priceStore"
+
+DATE_COLUMN = "Date"
+DATE_DTYPE = np.dtype("<i8")    # days since epoch
+VALUE_DTYPE = np.dtype("<f8")
+
+
+class PriceStore:
+    """
+    Append-only columnar price storage partitioned by market and symbol.
+
+    Each partition `{root}/{MARKET}/{SYMBOL}/` holds one raw little-endian file per
+    column (dates as int64 days since epoch, prices as float64) plus `meta.json` with
+    the schema and committed row count. Appends write the new rows to the end of the
+    column files and then atomically replace `meta.json`; readers memory-map only the
+    committed rows, so a tail read of N bars touches N rows instead of parsing a file.
+    """
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get("PRICE_STORE_PATH", DEFAULT_ROOT))
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, market: str, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault((market.upper(), symbol.upper()), threading.Lock())
+
+    @contextmanager
+    def _write_lock(self, market: str, symbol: str):
+        """
+        Serializes writers of one partition across threads and processes (API, worker and
+        scrapers share the store). The flock is held on `{MARKET}/.{SYMBOL}.lock`, next to
+        the partition, so it survives the partition being renamed or deleted.
+        """
+        with self._lock(market, symbol):
+            if fcntl is None:
+                yield
+                return
+            lock_path = self.root / market.upper() / f".{symbol.upper()}.lock"
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def partition(self, market: str, symbol: str) -> Path:
+        return self.root / market.upper() / symbol.upper()
+
+    @staticmethod
+    def _column_path(partition: Path, column: str) -> Path:
+        return partition / f"{column}.bin"
+
+    @staticmethod
+    def _read_meta(partition: Path) -> Optional[dict]:
+        try:
+            return json.loads((partition / "meta.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(partition: Path, meta: dict):
+        tmp_path = partition / "meta.json.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        tmp_path.replace(partition / "meta.json")
+
+    def meta(self, market: str, symbol: str) -> Optional[dict]:
+        return self._read_meta(self.partition(market, symbol))
+
+    def exists(self, market: str, symbol: str) -> bool:
+        meta = self.meta(market, symbol)
+        return meta is not None and meta["rows"] > 0
+
+    def markets(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def symbols(self, market: str) -> List[str]:
+        market_path = self.root / market.upper()
+        if not market_path.exists():
+            return []
+        return sorted(p.name for p in market_path.iterdir() if not p.name.endswith(".old") and (p / "meta.json").exists())
+
+    def last_date(self, market: str, symbol: str):
+        meta = self.meta(market, symbol)
+        if meta is None or meta["last_date"] is None:
+            return None
+        return pd.Timestamp(meta["last_date"]).date()
+
+    def fetch_from(self, market: str, symbol: str):
+        """
+        First date a scraper has to fetch: the day after the last stored bar, or the
+        first provisional (streamed) bar, which the official daily bar must replace.
+        None if nothing is stored.
+        """
+        meta = self.meta(market, symbol)
+        if meta is None or meta["last_date"] is None:
+            return None
+        if meta.get("provisional_from") is not None:
+            return pd.Timestamp(meta["provisional_from"]).date()
+        return (pd.Timestamp(meta["last_date"]) + pd.Timedelta(days=1)).date()
+
+    @staticmethod
+    def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+        frame = frame.copy()
+        if DATE_COLUMN not in frame.columns:
+            frame[DATE_COLUMN] = frame.index
+        frame[DATE_COLUMN] = pd.to_datetime(frame[DATE_COLUMN]).dt.normalize()
+        frame = frame.drop_duplicates(subset=[DATE_COLUMN], keep="last").sort_values(DATE_COLUMN)
+        return frame.reset_index(drop=True)
+
+    @staticmethod
+    def _encode_dates(dates: pd.Series) -> np.ndarray:
+        return dates.values.astype("datetime64[D]").astype(DATE_DTYPE)
+
+    def append(self, market: str, symbol: str, frame: pd.DataFrame, provisional: bool = False) -> int:
+        """
+        Appends the bars of `frame` that are newer than the last stored bar.
+
+        Bars appended with `provisional` (e.g. streamed intraday bars) are marked as
+        such in the partition's metadata; the next non-provisional append overwrites
+        the stored bars from the first provisional date on with the bars it carries
+        for those dates, so an official daily bar replaces the streamed one.
+        Returns the number of rows written.
+        """
+        frame = self._normalize(frame)
+        partition = self.partition(market, symbol)
+
+        with self._write_lock(market, symbol):
+            meta = self._read_meta(partition)
+            if meta is None:
+                partition.mkdir(parents=True, exist_ok=True)
+                columns = [col for col in frame.columns if col != DATE_COLUMN]
+                meta = {"columns": columns, "rows": 0, "last_date": None}
+            else:
+                # Drop anything past the committed row count left by an interrupted append.
+                self._truncate(partition, meta)
+                if not provisional and meta.get("provisional_from") is not None:
+                    frame = self._settle(market, symbol, partition, meta, frame)
+                elif meta["last_date"] is not None:
+                    frame = frame[frame[DATE_COLUMN] > pd.Timestamp(meta["last_date"])]
+
+            if frame.empty:
+                return 0
+
+            with open(self._column_path(partition, DATE_COLUMN), "ab") as f:
+                f.write(self._encode_dates(frame[DATE_COLUMN]).tobytes())
+            for column in meta["columns"]:
+                values = pd.to_numeric(frame[column], errors="coerce") if column in frame.columns else np.nan
+                values = np.broadcast_to(np.asarray(values, dtype=VALUE_DTYPE), (len(frame),))
+                with open(self._column_path(partition, column), "ab") as f:
+                    f.write(np.ascontiguousarray(values).tobytes())
+
+            meta["rows"] += len(frame)
+            meta["last_date"] = frame[DATE_COLUMN].iloc[-1].strftime("%Y-%m-%d")
+            if provisional and meta.get("provisional_from") is None:
+                meta["provisional_from"] = frame[DATE_COLUMN].iloc[0].strftime("%Y-%m-%d")
+            self._write_meta(partition, meta)
+            return len(frame)
+
+    def _truncate(self, partition: Path, meta: dict):
+        for column in [DATE_COLUMN] + meta["columns"]:
+            path = self._column_path(partition, column)
+            dtype = DATE_DTYPE if column == DATE_COLUMN else VALUE_DTYPE
+            if path.exists() and path.stat().st_size > meta["rows"] * dtype.itemsize:
+                os.truncate(path, meta["rows"] * dtype.itemsize)
+
+    def _settle(self, market: str, symbol: str, partition: Path, meta: dict, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cuts the provisional rows off the partition (committing the shorter `meta`) and
+        returns the rows to append in their place: `frame`'s bars from the first
+        provisional date on, then the provisional bars newer than all of them.
+        """
+        provisional_from = pd.Timestamp(meta["provisional_from"])
+        official = frame[frame[DATE_COLUMN] >= provisional_from]
+        if official.empty:
+            return official
+
+        _, arrays = self._columns(market, symbol, [DATE_COLUMN] + meta["columns"])
+        dates = pd.to_datetime(arrays[DATE_COLUMN].astype("datetime64[D]"))
+        keep = int(np.searchsorted(arrays[DATE_COLUMN], self._encode_dates(pd.Series([provisional_from]))[0]))
+        streamed = pd.DataFrame({column: arrays[column][keep:] for column in meta["columns"]})
+        streamed.insert(0, DATE_COLUMN, dates[keep:])
+        streamed = streamed[streamed[DATE_COLUMN] > official[DATE_COLUMN].iloc[-1]]
+
+        meta["rows"] = keep
+        meta["last_date"] = dates[keep - 1].strftime("%Y-%m-%d") if keep else None
+        meta["provisional_from"] = None
+        self._write_meta(partition, meta)
+        self._truncate(partition, meta)
+        if not streamed.empty:
+            # Streamed bars past the official ones stay, and stay provisional.
+            meta["provisional_from"] = streamed[DATE_COLUMN].iloc[0].strftime("%Y-%m-%d")
+        return pd.concat([official, streamed], ignore_index=True)
+
+    def replace(self, market: str, symbol: str, frame: pd.DataFrame) -> int:
+        """
+        Rewrites a partition with `frame`, e.g. after historical corrections.
+        """
+        partition = self.partition(market, symbol)
+        staging = PriceStore(self.root / ".staging")
+
+        # Staging is built under the partition lock too, so two replacers cannot mix rows.
+        with self._write_lock(market, symbol):
+            shutil.rmtree(staging.partition(market, symbol), ignore_errors=True)
+            rows = staging.append(market, symbol, frame)
+
+            backup = partition.with_name(partition.name + ".old")
+            shutil.rmtree(backup, ignore_errors=True)
+            partition.parent.mkdir(parents=True, exist_ok=True)
+            if partition.exists():
+                partition.rename(backup)
+            staging.partition(market, symbol).rename(partition)
+            shutil.rmtree(backup, ignore_errors=True)
+        return rows
+
+    def _columns(self, market: str, symbol: str, columns: Sequence[str], last_n: Optional[int] = None):
+        meta = self.meta(market, symbol)
+        if meta is None:
+            raise FileNotFoundError(f"No price data stored for {market}:{symbol}")
+
+        partition = self.partition(market, symbol)
+        rows = meta["rows"]
+        start = 0 if last_n is None else max(0, rows - last_n)
+        arrays = {}
+        for column in columns:
+            if column != DATE_COLUMN and column not in meta["columns"]:
+                raise KeyError(f"Column '{column}' is not stored for {market}:{symbol}")
+            dtype = DATE_DTYPE if column == DATE_COLUMN else VALUE_DTYPE
+            if rows == 0:
+                arrays[column] = np.empty(0, dtype=dtype)
+                continue
+            mapped = np.memmap(self._column_path(partition, column), dtype=dtype, mode="r", shape=(rows,))
+            arrays[column] = np.array(mapped[start:rows])
+            del mapped
+        return meta, arrays
+
+    def column(self, market: str, symbol: str, column: str = "Close", last_n: Optional[int] = None) -> np.ndarray:
+        """
+        Returns one column as float64 (or the last `last_n` rows of it).
+        """
+        return self._columns(market, symbol, [column], last_n)[1][column]
+
+    def tail(self, market: str, symbol: str, n: int, column: str = "Close") -> np.ndarray:
+        return self.column(market, symbol, column, last_n=n)
+
+    def read(self, market: str, symbol: str, columns: Optional[Sequence[str]] = None,
+             last_n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Returns Date (as YYYY-MM-DD strings, like the former CSVs) plus the requested columns.
+        """
+        meta = self.meta(market, symbol)
+        if meta is None:
+            raise FileNotFoundError(f"No price data stored for {market}:{symbol}")
+        columns = list(columns) if columns is not None else meta["columns"]
+        _, arrays = self._columns(market, symbol, [DATE_COLUMN] + columns, last_n)
+
+        frame = pd.DataFrame({column: arrays[column] for column in columns})
+        frame.insert(0, DATE_COLUMN, np.datetime_as_string(arrays[DATE_COLUMN].astype("datetime64[D]"), unit="D"))
+        return frame
+
+    def content_hash(self, market: str, symbol: str) -> str:
+        """
+        Hash of the committed rows of a partition, for change detection.
+        """
+        meta = self.meta(market, symbol)
+        if meta is None:
+            raise FileNotFoundError(f"No price data stored for {market}:{symbol}")
+        digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode("utf-8"))
+        _, arrays = self._columns(market, symbol, [DATE_COLUMN] + meta["columns"])
+        for column in [DATE_COLUMN] + meta["columns"]:
+            digest.update(arrays[column].tobytes())
+        return digest.hexdigest()
+
+    def delete(self, market: str, symbol: str):
+        with self._write_lock(market, symbol):
+            shutil.rmtree(self.partition(market, symbol), ignore_errors=True)
+
+    def clear(self):
+        for market in self.markets():
+            for symbol in self.symbols(market):
+                self.delete(market, symbol)
+
+    def import_csv(self, market: str, symbol: str, csv_path) -> int:
+        return self.replace(market, symbol, pd.read_csv(csv_path))
+
+
+price_store = PriceStore()
+
+if __name__ == "__main__":
+    # One-off migration of the legacy per-symbol CSVs; NASDAQ files carry an "Adj Close" column.
+    csv_dir = PROJECT_ROOT / "assets" / "dataPrice"
+    for csv_path in sorted(csv_dir.glob("dataPrice*.csv")):
+        symbol = csv_path.stem.replace("dataPrice", "")
+        market = "NAS" if "Adj Close" in pd.read_csv(csv_path, nrows=0).columns else "NPS"
+        rows = price_store.import_csv(market, symbol, csv_path)
+        print(f"Imported {rows} rows for {market}:{symbol}; last 3 closes {price_store.tail(market, symbol, 3)}")
@@ -0,0 +1,221 @@
+import time
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..priceStore.priceStore import PriceStore, DATE_COLUMN
+from ..usemodel.predictprice import (PredictionRequest, GlobalForecaster, micro_batcher, TIME_STEPS,
+                                     FORECAST_FEATURES, GLOBAL_MODEL, GLOBAL_MODEL_KEY)
+
+# Columns kept in each rolling window: whatever the configured models read.
+WINDOW_FEATURES = list(dict.fromkeys(("Close",) + FORECAST_FEATURES))
+
+
+class RollingWindow:
+    """
+    The last `size` bars of one symbol as a (rows, features) array, oldest first.
+    `stamp` identifies the stored partition state the window mirrors.
+    """
+    def __init__(self, size: int, features: Sequence[str], values: np.ndarray, stamp):
+        self.size = size
+        self.features = list(features)
+        self.values = values[-size:]
+        self.stamp = stamp
+
+    def push(self, rows: np.ndarray, stamp):
+        self.values = np.concatenate([self.values, rows])[-self.size:]
+        self.stamp = stamp
+
+
+@dataclass
+class IngestResult:
+    market: str
+    symbol: str
+    appended: int
+    prediction: Optional[float] = None
+    model_version: Optional[int] = None
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+
+
+def predict_window(market: str, symbol: str, window: np.ndarray, features: List[str]) -> Tuple[float, Optional[int]]:
+    """
+    Predicts the next close from an in-memory window with the resident model and its
+    saved scaler state. Models published without scaler state, or needing more bars or
+    columns than the window holds, are served from the price store instead.
+
+    Returns:
+        The predicted price and the version of the model that produced it.
+    """
+    from ..modelManager.modelRegistry import model_registry
+
+    if GLOBAL_MODEL:
+        model = model_registry.get_model(GLOBAL_MODEL_KEY)
+        forecaster = GlobalForecaster(model, model_registry.metadata(GLOBAL_MODEL_KEY))
+        columns = [features.index(column) for column in forecaster.features]
+        forecasts = forecaster.forecast({f"{market}_{symbol}": window[:, columns]})
+        if not forecasts:
+            raise ValueError(f"{market}_{symbol} is not covered by the global model")
+        return forecasts[f"{market}_{symbol}"][0], model_registry.version(GLOBAL_MODEL_KEY)
+
+    model_key = f"{market}_{symbol}"
+    model = model_registry.get_model(model_key)
+    scaler = model_registry.metadata(model_key)
+    look_back = None if scaler is None else scaler.get("look_back", TIME_STEPS)
+    model_features = None if scaler is None else scaler.get("features", ["Close"])
+    if scaler is not None and len(window) >= look_back and set(model_features) <= set(features):
+        columns = [features.index(column) for column in model_features]
+        request = PredictionRequest.from_window(symbol, window[-look_back:, columns], model, scaler)
+    else:
+        from ..priceStore.priceStore import price_store
+        request = PredictionRequest.from_store(price_store, market, symbol, model, scaler=scaler)
+    return micro_batcher.predict(request), model_registry.version(model_key)
+
+
+class BarIngestor:
+    """
+    Accepts streamed OHLCV bars and refreshes each symbol's prediction right away.
+
+    New bars are appended to the PriceStore and pushed into an in-memory rolling window
+    of the last `window_size` bars per symbol, which is handed to `predict` without
+    touching the store again. A window is (re)seeded from the store the first time a
+    symbol is seen, and whenever the store changed from elsewhere (e.g. a scrape added
+    bars or replaced provisional ones) since the window was last updated. Streamed
+    bars are stored as provisional, so the next scrape replaces them with the official
+    daily bars. Bars are ingested under a per-symbol lock;
+    predictions of concurrent symbols are coalesced by the micro-batcher.
+    """
+    def __init__(self, store: Optional[PriceStore] = None, predict: Optional[Callable] = predict_window,
+                 window_size: int = TIME_STEPS, features: Sequence[str] = WINDOW_FEATURES):
+        """
+        Args:
+            store (PriceStore): Destination of the bars (default: the shared price store).
+            predict (callable): predict(market, symbol, window, features) -> (price, model version),
+                or None to only store the bars.
+            window_size (int): Bars kept in memory per symbol.
+            features (sequence): Columns kept in the windows; must include Close.
+        """
+        if store is None:
+            from ..priceStore.priceStore import price_store as store
+        self.store = store
+        self.predict = predict
+        self.window_size = window_size
+        self.features = list(features)
+        self._windows: Dict[Tuple[str, str], RollingWindow] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.bars_ingested = 0
+        self.predictions = 0
+
+    def _lock(self, key) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _rows(self, frame: pd.DataFrame, stored_columns: List[str]) -> np.ndarray:
+        # Columns the partition does not store read back as NaN, so mirror that here.
+        return frame.reindex(columns=[c if c in stored_columns else None for c in self.features]).to_numpy(dtype=np.float64)
+
+    def _seed(self, market: str, symbol: str) -> RollingWindow:
+        meta = self.store.meta(market, symbol)
+        columns = [self.store.tail(market, symbol, self.window_size, column) if column in meta["columns"]
+                   else np.full(min(meta["rows"], self.window_size), np.nan) for column in self.features]
+        return RollingWindow(self.window_size, self.features, np.column_stack(columns), self._stamp(meta))
+
+    @staticmethod
+    def _stamp(meta: dict):
+        # Changes whenever the stored bars do, including when official bars replace provisional ones.
+        return meta["rows"], meta["last_date"], meta.get("provisional_from")
+
+    def window(self, market: str, symbol: str) -> Optional[np.ndarray]:
+        window = self._windows.get((market, symbol))
+        return None if window is None else window.values
+
+    def ingest(self, market: str, symbol: str, bars: List[dict]) -> IngestResult:
+        """
+        Appends `bars` (dicts with Date, Close and optionally Open/High/Low/Volume) and
+        predicts from the updated window. Bars not newer than the last stored bar are
+        ignored, and no prediction is made if none were new. Bars with unparseable dates,
+        and bars for a symbol without stored history (which a scrape has to backfill
+        first), are rejected; failures are reported in the result's `error`.
+        """
+        start = time.perf_counter()
+        market, symbol, key = market.upper(), symbol.upper(), (market.upper(), symbol.upper())
+        frame = pd.DataFrame(bars)
+        if frame.empty or DATE_COLUMN not in frame.columns or "Close" not in frame.columns:
+            return IngestResult(market, symbol, 0, error="bars need at least Date and Close")
+        dates = pd.to_datetime(frame[DATE_COLUMN], errors="coerce")
+        if dates.isna().any():
+            invalid = frame.loc[dates.isna(), DATE_COLUMN].tolist()
+            return IngestResult(market, symbol, 0, error=f"invalid Date values {invalid[:5]}")
+        frame = frame.assign(**{DATE_COLUMN: dates.dt.normalize()})
+
+        appended = 0
+        try:
+            with self._lock(key):
+                meta = self.store.meta(market, symbol)
+                if meta is None or meta["last_date"] is None:
+                    # A partition started from streamed bars would never be backfilled: the
+                    # scrapers only fetch dates after a partition's last bar.
+                    return IngestResult(market, symbol, 0, error=f"no stored history for {market}:{symbol}; "
+                                        "backfill it before streaming bars",
+                                        latency_ms=(time.perf_counter() - start) * 1000)
+                appended = self.store.append(market, symbol, frame, provisional=True)
+                if appended == 0:
+                    return IngestResult(market, symbol, 0, latency_ms=(time.perf_counter() - start) * 1000)
+
+                stored = self.store.meta(market, symbol)
+                window = self._windows.get(key)
+                # Reseed if the store changed since the window was built, or alongside this append.
+                if window is None or window.stamp != self._stamp(meta) or stored["rows"] != meta["rows"] + appended:
+                    window = self._seed(market, symbol)
+                else:
+                    frame = frame.drop_duplicates(subset=[DATE_COLUMN], keep="last").sort_values(DATE_COLUMN)
+                    frame = frame[frame[DATE_COLUMN] > pd.Timestamp(meta["last_date"])]
+                    window.push(self._rows(frame, stored["columns"]), self._stamp(stored))
+                self._windows[key] = window
+                values = window.values
+                self.bars_ingested += appended
+        except Exception as e:
+            return IngestResult(market, symbol, appended, error=str(e), latency_ms=(time.perf_counter() - start) * 1000)
+
+        if self.predict is None:
+            return IngestResult(market, symbol, appended, latency_ms=(time.perf_counter() - start) * 1000)
+        try:
+            prediction, version = self.predict(market, symbol, values, self.features)
+            self.predictions += 1
+        except Exception as e:
+            return IngestResult(market, symbol, appended, error=str(e), latency_ms=(time.perf_counter() - start) * 1000)
+        return IngestResult(market, symbol, appended, prediction, version, latency_ms=(time.perf_counter() - start) * 1000)
+
+    def stats(self) -> dict:
+        return {"symbols": len(self._windows), "bars_ingested": self.bars_ingested, "predictions": self.predictions}
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    def last_close(market, symbol, window, features):
+        # Stand-in for a model: echoes the newest close of the window.
+        return float(window[-1, features.index("Close")]), None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceStore(tmp)
+        dates = pd.bdate_range("2024-01-01", periods=300)
+        history = pd.DataFrame({"Date": dates[:-20], "Close": np.linspace(100, 150, 280), "Volume": 1e6})
+        store.append("NAS", "AAPL", history)
+
+        ingestor = BarIngestor(store, predict=last_close)
+        latencies = []
+        for date in dates[-20:]:
+            bar = {"Date": date.strftime("%Y-%m-%d"), "Close": 150 + np.random.rand(), "Volume": 1e6}
+            result = ingestor.ingest("NAS", "AAPL", [bar])
+            latencies.append(result.latency_ms)
+            assert result.prediction == bar["Close"]
+
+        stored = store.tail("NAS", "AAPL", TIME_STEPS)
+        assert np.allclose(ingestor.window("NAS", "AAPL")[:, 0], stored)
+        print(f"20 bars streamed, window matches the store, median ingest+predict "
+              f"{np.median(latencies):.2f} ms, {ingestor.stats()}")
@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..cacheManager.cacheManager import (BAR_CHANNEL, ForecastValue, PredictionValue, async_client,
+                                         get_entries_async, get_forecasts_async)
+
+HEARTBEAT = b": keep-alive\n\n"
+
+
+def sse_event(kind: str, payload: dict) -> bytes:
+    return f"event: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+# Sent to a client that fell too far behind; it should refetch /stocks and reconnect.
+RESYNC = sse_event("resync", {})
+
+
+async def fetch_predictions(symbols: List[str]) -> Dict[str, Tuple[Optional[PredictionValue], Optional[ForecastValue]]]:
+    """
+    Current prediction and forecast of every symbol, in two MGETs.
+    """
+    entries, forecasts = await asyncio.gather(get_entries_async(symbols), get_forecasts_async(symbols))
+    return {symbol: (entries[symbol], forecasts[symbol]) for symbol in symbols}
+
+
+class Subscriber:
+    """
+    One connected client: the symbols it follows and the events not yet written to it.
+
+    Pending prediction events are conflated per symbol, since only the newest matters;
+    bar events queue up. A client more than `max_pending` events behind is sent a
+    resync event and disconnected instead of being buffered without bound.
+    """
+    def __init__(self, symbols: Iterable[str], max_pending: int):
+        self.symbols = frozenset(symbols)
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.last_write = time.monotonic()
+        self._pending: Dict[tuple, bytes] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, key: tuple, event: bytes) -> bool:
+        """
+        Queues `event`, replacing a pending one with the same key.
+
+        Returns:
+            bool: True if a pending event was replaced.
+        """
+        if self.overflowed:
+            return False
+        conflated = key in self._pending
+        self._pending[key] = event
+        if len(self._pending) > self.max_pending:
+            self.overflowed = True
+            self._pending.clear()
+        self._ready.set()
+        return conflated
+
+    async def events(self) -> AsyncIterator[bytes]:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if self.overflowed:
+                yield RESYNC
+                return
+            pending, self._pending = self._pending, {}
+            self.last_write = time.monotonic()
+            yield b"".join(pending.values())
+
+
+class UpdateBroadcaster:
+    """
+    Pushes prediction and bar updates to every subscribed client of this replica.
+
+    Updates arrive once per replica, however many clients follow a symbol: prediction
+    updates from the prediction cache's PREDICTION_CHANNEL listener (`notify`), bars
+    from BAR_CHANNEL. Notifications are coalesced for `coalesce` seconds, the new
+    values of all touched symbols are read in one round trip, and each event is encoded
+    once and handed to the symbol's subscribers. A notification that leaves a symbol's
+    prediction unchanged means its price history was synced, and is sent as a `chart`
+    event so clients refetch /stocks. One timer task sends keep-alives to idle streams.
+    All state lives on the event loop; `notify` is the only method safe to call from
+    other threads.
+    """
+    def __init__(self, fetch: Callable[[List[str]], Awaitable[dict]] = fetch_predictions,
+                 max_subscribers: int = None, max_symbols: int = None, max_pending: int = None,
+                 heartbeat: float = None, coalesce: float = 0.05):
+        """
+        Args:
+            fetch (callable): async fetch(symbols) -> {symbol: (PredictionValue, ForecastValue)}.
+            max_subscribers (int): Open streams per replica (env STREAM_MAX_SUBSCRIBERS, default 10000).
+            max_symbols (int): Symbols per stream (env STREAM_MAX_SYMBOLS, default 50).
+            max_pending (int): Undelivered events per stream before it is resynced
+                (env STREAM_MAX_PENDING, default 256).
+            heartbeat (float): Seconds of silence before a keep-alive comment (env STREAM_HEARTBEAT, default 15).
+            coalesce (float): Seconds notifications are gathered before one fetch.
+        """
+        self.fetch = fetch
+        self.max_subscribers = max_subscribers or int(os.environ.get("STREAM_MAX_SUBSCRIBERS", 10000))
+        self.max_symbols = max_symbols or int(os.environ.get("STREAM_MAX_SYMBOLS", 50))
+        self.max_pending = max_pending or int(os.environ.get("STREAM_MAX_PENDING", 256))
+        self.heartbeat = heartbeat or float(os.environ.get("STREAM_HEARTBEAT", 15))
+        self.coalesce = coalesce
+
+        self._subscribers: Set[Subscriber] = set()
+        self._index: Dict[str, Set[Subscriber]] = {}
+        # Last prediction event per followed symbol, keyed by its as-of time.
+        self._latest: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._dirty: Set[str] = set()
+        self._priming: Dict[str, asyncio.Future] = {}
+        self._flush_task = None
+        self._bar_task = None
+        self._heartbeat_task = None
+        self._loop = None
+        self._sequence = 0
+
+        self.events = 0
+        self.deliveries = 0
+        self.conflated = 0
+        self.resyncs = 0
+        self.rejected = 0
+
+    def start(self, listen_bars: bool = True):
+        """
+        Binds the broadcaster to the running event loop and subscribes to BAR_CHANNEL.
+        """
+        self._loop = asyncio.get_running_loop()
+        if self._heartbeat_task is None:
+            self._heartbeat_task = self._loop.create_task(self._heartbeats())
+        if listen_bars and self._bar_task is None:
+            self._bar_task = self._loop.create_task(self._listen_bars())
+
+    async def stop(self):
+        for task in (self._bar_task, self._heartbeat_task, self._flush_task):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._bar_task = self._heartbeat_task = self._flush_task = None
+        self._loop = None
+
+    async def _heartbeats(self):
+        while True:
+            await asyncio.sleep(self.heartbeat / 2)
+            idle_since = time.monotonic() - self.heartbeat / 2
+            for subscriber in self._subscribers:
+                if subscriber.last_write < idle_since:
+                    subscriber.offer(("heartbeat",), HEARTBEAT)
+
+    async def _listen_bars(self):
+        while True:
+            pubsub = async_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(BAR_CHANNEL)
+                async for message in pubsub.listen():
+                    self.publish_bars(json.loads(message["data"]))
+            except Exception as e:
+                print(f"ERROR: Bar update subscription lost: {e}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(1.0)
+
+    def notify(self, symbols: Iterable[str]):
+        """
+        Thread-safe: schedules a prediction refresh of `symbols` for their subscribers.
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._mark, list(symbols))
+
+    def _mark(self, symbols: List[str]):
+        self._dirty.update(symbol.upper() for symbol in symbols if symbol.upper() in self._index)
+        if self._dirty and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def _flush(self):
+        while self._dirty:
+            await asyncio.sleep(self.coalesce)
+            symbols = [symbol for symbol in self._dirty if symbol in self._index]
+            self._dirty.clear()
+            if not symbols:
+                continue
+            try:
+                updates = await self.fetch(symbols)
+            except Exception as e:
+                print(f"ERROR: Could not fetch updated predictions for {len(symbols)} symbols: {e}")
+                continue
+            for symbol, (entry, forecast) in updates.items():
+                self._publish_prediction(symbol, entry, forecast)
+
+    def _remember(self, symbol: str, entry: PredictionValue, forecast: Optional[ForecastValue]) -> bytes:
+        event = sse_event("prediction", {
+            "symbol": symbol,
+            "prediction": entry.price,
+            "forecast": None if forecast is None else forecast.prices,
+            "model_version": entry.model_version,
+            "as_of": entry.as_of,
+        })
+        self._latest[symbol] = (entry.as_of, event)
+        return event
+
+    def _publish_prediction(self, symbol: str, entry: Optional[PredictionValue], forecast: Optional[ForecastValue]):
+        previous = self._latest.get(symbol)
+        if entry is None or (previous is not None and previous[0] == entry.as_of):
+            self._fan_out(symbol, ("chart", symbol), sse_event("chart", {"symbol": symbol}))
+        else:
+            self._fan_out(symbol, ("prediction", symbol), self._remember(symbol, entry, forecast))
+
+    def publish_bars(self, bars: Dict[str, List[dict]]):
+        """
+        Sends newly ingested bars ({symbol: [chart points]}) to the symbols' subscribers.
+        """
+        for symbol, points in bars.items():
+            self._sequence += 1
+            self._fan_out(symbol, ("bars", symbol, self._sequence), sse_event("bars", {"symbol": symbol, "bars": points}))
+
+    def _fan_out(self, symbol: str, key: tuple, event: bytes):
+        subscribers = self._index.get(symbol, ())
+        self.events += 1
+        self.deliveries += len(subscribers)
+        for subscriber in subscribers:
+            self.conflated += subscriber.offer(key, event)
+
+    async def subscribe(self, symbols: Iterable[str]) -> Optional[Subscriber]:
+        """
+        Registers a client for `symbols` and queues the current prediction of each.
+
+        Returns:
+            Subscriber, or None when the replica already serves `max_subscribers` streams.
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            self.rejected += 1
+            return None
+        subscriber = Subscriber({symbol.upper() for symbol in symbols}, self.max_pending)
+        self._subscribers.add(subscriber)
+        for symbol in subscriber.symbols:
+            self._index.setdefault(symbol, set()).add(subscriber)
+
+        # Symbols nobody followed yet are read once, also when many clients connect at
+        # the same time; later subscribers start from memory.
+        unknown = [symbol for symbol in subscriber.symbols if symbol not in self._latest]
+        missing = [symbol for symbol in unknown if symbol not in self._priming]
+        if missing:
+            task = asyncio.ensure_future(self._prime(missing))
+            for symbol in missing:
+                self._priming[symbol] = task
+        reads = {self._priming[symbol] for symbol in unknown if symbol in self._priming}
+        if reads:
+            await asyncio.gather(*reads)
+        for symbol in sorted(subscriber.symbols):
+            if symbol in self._latest:
+                subscriber.offer(("prediction", symbol), self._latest[symbol][1])
+        return subscriber
+
+    async def _prime(self, symbols: List[str]):
+        try:
+            for symbol, (entry, forecast) in (await self.fetch(symbols)).items():
+                if entry is not None and symbol not in self._latest:
+                    self._remember(symbol, entry, forecast)
+        except Exception as e:
+            print(f"ERROR: Could not fetch predictions for new streams: {e}")
+        finally:
+            for symbol in symbols:
+                self._priming.pop(symbol, None)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        for symbol in subscriber.symbols:
+            followers = self._index.get(symbol)
+            if followers is None:
+                continue
+            followers.discard(subscriber)
+            if not followers:
+                del self._index[symbol]
+                self._latest.pop(symbol, None)
+
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    async def stream(self, symbols: Iterable[str]) -> AsyncIterator[bytes]:
+        """
+        Server-sent event stream for `symbols`. The client is subscribed when the stream
+        starts and unsubscribed when it ends or the client goes away; a stream opened
+        while the replica is full ends right away.
+        """
+        subscriber = await self.subscribe(symbols)
+        if subscriber is None:
+            return
+        try:
+            yield b"retry: 3000\n" + sse_event("ready", {"symbols": sorted(subscriber.symbols)})
+            async for chunk in subscriber.events():
+                if chunk is RESYNC:
+                    self.resyncs += 1
+                yield chunk
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "symbols": len(self._index),
+            "events": self.events,
+            "deliveries": self.deliveries,
+            "conflated": self.conflated,
+            "resyncs": self.resyncs,
+            "rejected": self.rejected,
+        }
+
+
+update_broadcaster = UpdateBroadcaster()
+
+if __name__ == "__main__":
+    import argparse
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="In-process fan-out of prediction updates to simulated subscribers.")
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--updates", type=int, default=50)
+    args = parser.parse_args()
+
+    async def fake_fetch(symbols):
+        # Stand-in for Redis: every read returns a new value stamped with the current time.
+        now = time.time()
+        return {symbol: (PredictionValue(100.0, 1, now), None) for symbol in symbols}
+
+    async def main():
+        broadcaster = UpdateBroadcaster(fetch=fake_fetch, max_subscribers=args.subscribers, coalesce=0.01)
+        broadcaster.start(listen_bars=False)
+        rng = np.random.default_rng(0)
+        names = [f"S{i:03d}" for i in range(args.symbols)]
+        latencies = []
+
+        async def client(symbols):
+            async for chunk in broadcaster.stream(symbols):
+                received = time.time()
+                for line in chunk.split(b"\n"):
+                    if line.startswith(b"data: {\"symbol\"") and b"as_of" in line:
+                        latencies.append(received - json.loads(line[6:])["as_of"])
+
+        clients = [asyncio.create_task(client(rng.choice(names, 3, replace=False))) for _ in range(args.subscribers)]
+        await asyncio.sleep(0.5)
+        latencies.clear()
+
+        # Simulates the prediction cache subscriber thread announcing a training cycle's output.
+        start = time.perf_counter()
+        publisher = threading.Thread(target=lambda: [broadcaster.notify(rng.choice(names, 10).tolist())
+                                                     or time.sleep(0.02) for _ in range(args.updates)])
+        publisher.start()
+        while publisher.is_alive():
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - start
+
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+        await broadcaster.stop()
+
+        ms = np.array(latencies) * 1000
+        print(f"{args.subscribers} subscribers, {args.updates} notifications of 10 symbols: "
+              f"{len(ms)} events delivered in {elapsed:.2f}s, latency p50 {np.percentile(ms, 50):.1f} ms, "
+              f"p99 {np.percentile(ms, 99):.1f} ms")
+        print(f"Broadcaster: {broadcaster.stats()}")
+
+    asyncio.run(main())
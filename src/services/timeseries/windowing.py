@@ -0,0 +1,128 @@
+import math
+from pathlib import Path
+from typing import Iterator, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def feature_matrix(data_frame: pd.DataFrame, columns: Sequence[str] = ("Close",), dtype=np.float32) -> np.ndarray:
+    """
+    Returns the selected price columns as a contiguous (rows, features) array.
+    """
+    return np.ascontiguousarray(data_frame[list(columns)].to_numpy(dtype=dtype))
+
+
+def _as_2d(data) -> np.ndarray:
+    data = np.asarray(data)
+    return data.reshape(-1, 1) if data.ndim == 1 else data
+
+
+def sliding_windows(data, look_back: int, target_column: int = 0, horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds (X, y) for forecasting the next `horizon` steps as zero-copy strided views.
+
+    Args:
+        data: (rows,) or (rows, features) array.
+        look_back (int): Window length.
+        target_column (int): Feature whose following values are the target.
+        horizon (int): Number of future steps in each target vector.
+
+    Returns:
+        X with shape (n, look_back, features) and y with shape (n, horizon), where
+        n = rows - look_back - horizon + 1, both views over `data`.
+    """
+    data = _as_2d(data)
+    if len(data) < look_back + horizon:
+        return np.empty((0, look_back, data.shape[1]), dtype=data.dtype), np.empty((0, horizon), dtype=data.dtype)
+
+    # sliding_window_view appends the window axis last: (n, features, look_back) -> (n, look_back, features)
+    windows = sliding_window_view(data, look_back, axis=0).swapaxes(1, 2)
+    targets = sliding_window_view(data[look_back:, target_column], horizon)
+    return windows[:len(targets)], targets
+
+
+def last_window(data, look_back: int) -> np.ndarray:
+    """
+    Returns the most recent (look_back, features) window as a view.
+    """
+    data = _as_2d(data)
+    if len(data) < look_back:
+        raise ValueError(f"Insufficient data for prediction. Need at least {look_back} records, but found {len(data)}.")
+    return data[-look_back:]
+
+
+def memmap_windows(data, look_back: int, path, target_column: int = 0, horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spills `data` to a memory-mapped file and returns strided window views over it,
+    so histories larger than RAM can be windowed without loading them.
+    """
+    data = _as_2d(data)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mapped = np.memmap(path, dtype=data.dtype, mode="w+", shape=data.shape)
+    mapped[:] = data
+    mapped.flush()
+    return sliding_windows(np.memmap(path, dtype=data.dtype, mode="r", shape=data.shape), look_back, target_column, horizon)
+
+
+def array_batches(X: np.ndarray, y: np.ndarray, batch_size: int = 32, shuffle: bool = True) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Endless (X, y) batch generator for `model.fit(..., steps_per_epoch=steps(len(X), batch_size))`.
+    Only one batch is copied out of the (possibly strided or memory-mapped) views at a time.
+
+    Raises:
+        ValueError: If there are no windows; the generator would never yield and fit would hang.
+    """
+    if len(X) == 0:
+        raise ValueError("no training windows")
+    return _array_batches(X, y, batch_size, shuffle)
+
+
+def _array_batches(X: np.ndarray, y: np.ndarray, batch_size: int, shuffle: bool) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    count = len(X)
+    while True:
+        order = np.random.permutation(count) if shuffle else np.arange(count)
+        for start in range(0, count, batch_size):
+            idx = order[start:start + batch_size]
+            yield np.asarray(X[idx], dtype=np.float32), np.asarray(y[idx], dtype=np.float32)
+
+
+def window_batches(data, look_back: int, batch_size: int = 32, shuffle: bool = True,
+                   target_column: int = 0, horizon: int = 1) -> Tuple[Iterator[Tuple[np.ndarray, np.ndarray]], int]:
+    """
+    Streams windowed training batches without materializing the full X tensor.
+
+    Returns:
+        The batch generator and the number of steps per epoch.
+    """
+    X, y = sliding_windows(data, look_back, target_column, horizon)
+    return array_batches(X, y, batch_size, shuffle), steps(len(X), batch_size)
+
+
+def steps(count: int, batch_size: int) -> int:
+    return max(1, math.ceil(count / batch_size))
+
+
+if __name__ == "__main__":
+    import time
+
+    history = np.random.rand(200_000, 4).astype(np.float32)
+    look_back = 80
+
+    start = time.perf_counter()
+    X, y = [], []
+    for i in range(len(history) - look_back):
+        X.append(history[i:i + look_back])
+        y.append(history[i + look_back, :1])
+    X, y = np.array(X), np.array(y)
+    loop_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    X_view, y_view = sliding_windows(history, look_back)
+    view_ms = (time.perf_counter() - start) * 1000
+
+    assert np.array_equal(X, X_view) and np.array_equal(y, y_view)
+    print(f"python loop: {loop_ms:.1f} ms, {X.nbytes / 1e6:.1f} MB")
+    print(f"strided view: {view_ms:.3f} ms, shares memory with input: {np.shares_memory(X_view, history)}")
@@ -0,0 +1,108 @@
+"""
+Per-ticker models vs. one shared multi-symbol model on a synthetic universe.
+
+    python -m src.services.trainmodel.globalBenchmark --symbols 500 --bars 400 --sample 10
+
+Per-ticker training is measured on `--sample` symbols and extrapolated linearly to the
+whole universe (the cycle trains symbols independently, so its cost is linear);
+everything else is measured on all symbols. Artifact sizes are the serialized blobs
+stored in Redis.
+"""
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from ..modelManager import modelSerializer
+from ..usemodel.predictprice import PredictionRequest, BatchPredictor, GlobalForecaster
+from .model import ModelFineTuning
+from .globalModel import GlobalModelTrainer
+
+
+def synthetic_universe(n_symbols: int, bars: int, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    Geometric random walks with per-symbol price level, drift and volatility.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=bars).strftime("%Y-%m-%d")
+    frames = {}
+    for i in range(n_symbols):
+        close = rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(rng.normal(3e-4, 5e-4), rng.uniform(0.01, 0.03), bars)))
+        spread = close * rng.uniform(0.002, 0.02, bars)
+        frames[f"SYN_S{i:04d}"] = pd.DataFrame({
+            "Date": dates, "High": close + spread, "Low": close - spread, "Close": close,
+            "Volume": rng.integers(10_000, 1_000_000, bars).astype(np.float64),
+        })
+    return frames
+
+
+def median_ms(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def run(n_symbols: int, bars: int, sample: int, look_back: int, repeats: int):
+    frames = synthetic_universe(n_symbols, bars)
+    keys = sorted(frames)
+    closes = {key: frames[key]["Close"].to_numpy() for key in keys}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+
+        # Per-ticker: one ModelFineTuning run per symbol, as in the training cycle.
+        train_times, blobs = [], []
+        for key in keys[:sample]:
+            start = time.perf_counter()
+            tuner = ModelFineTuning(frames[key], str(tmp / f"{key}.h5"), look_back=look_back)
+            tuner.data_frame_training()
+            tuner.fine_tune()
+            train_times.append(time.perf_counter() - start)
+            blobs.append(modelSerializer.dumps(tuner.model))
+        per_ticker_train = float(np.mean(train_times)) * n_symbols
+        per_ticker_bytes = int(np.mean([len(b) for b in blobs]) * n_symbols)
+
+        # Shared: one model over every symbol.
+        start = time.perf_counter()
+        trainer = GlobalModelTrainer(frames, tmp / "GLOBAL.h5", look_back=look_back)
+        trainer.prepare()
+        trainer.fine_tune()
+        global_train = time.perf_counter() - start
+        global_bytes = len(modelSerializer.dumps(trainer.model))
+
+        # Inference for every symbol. Per-ticker models are copies of the sampled ones.
+        models = [modelSerializer.loads(blobs[i % len(blobs)]) for i in range(n_symbols)]
+        requests = [PredictionRequest.from_closes(key, closes[key], model, look_back) for key, model in zip(keys, models)]
+        one_by_one = median_ms(lambda: [r.inverse(r.model.predict_on_batch(r.window[None].astype(np.float32))[0])
+                                        for r in requests], repeats)
+        predictor = BatchPredictor(max_fused_models=1)
+        fused_first = median_ms(lambda: predictor.predict_batch(requests), 1)
+        fused = median_ms(lambda: predictor.predict_batch(requests), repeats)
+
+        forecaster = GlobalForecaster(trainer.model, trainer.metadata())
+        histories = {key: closes[key].reshape(-1, 1) for key in keys}
+        shared = median_ms(lambda: forecaster.forecast(histories), repeats)
+
+    print(f"Synthetic universe: {n_symbols} symbols x {bars} bars, look-back {look_back}")
+    print(f"  training wall-clock:  per-ticker ~{per_ticker_train:.1f}s (from {sample} symbols), shared {global_train:.1f}s")
+    print(f"  artifact size:        per-ticker ~{per_ticker_bytes / 1e6:.2f} MB in {n_symbols} keys, shared {global_bytes / 1e6:.2f} MB in 1 key")
+    print(f"  predict all symbols:  per-ticker {one_by_one:.1f} ms one by one, {fused:.1f} ms fused "
+          f"({fused_first:.1f} ms first call), shared {shared:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=400)
+    parser.add_argument("--sample", type=int, default=10, help="Per-ticker models actually trained.")
+    parser.add_argument("--look-back", type=int, default=15)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.symbols, args.bars, args.sample, args.look_back, args.repeats)
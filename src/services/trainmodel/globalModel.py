@@ -0,0 +1,151 @@
+import json
+from pathlib import Path
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+from tensorflow.keras.models import load_model, Model
+from tensorflow.keras.layers import Input, LSTM, Dense, Embedding, Flatten, RepeatVector, Concatenate
+from tensorflow.keras.optimizers import Adam
+
+from ..timeseries.windowing import sliding_windows, steps
+from .model import ModelFineTuning
+
+
+class GlobalModelTrainer:
+    """
+    Trains one LSTM over the price histories of many symbols.
+
+    Every symbol is min-max scaled with its own range, and a learned symbol embedding is
+    fed to the LSTM next to each bar, so one network can tell the tickers apart. The
+    vocabulary and the per-symbol scaler state are saved in the model's sidecar and
+    published with it; serving uses them through `usemodel.predictprice.GlobalForecaster`.
+    The existing model is fine-tuned when the vocabulary and layout are unchanged,
+    otherwise a new one is trained (the embedding table is sized to the vocabulary).
+    """
+    def __init__(self, frames: Dict[str, pd.DataFrame], model_path, look_back: int = 15,
+                 features: Sequence[str] = ("Close",), horizon: int = 1, embedding_dim: int = 8,
+                 units: int = 32, epochs: int = 5, batch_size: int = 256):
+        """
+        Args:
+            frames (dict): Price frame with a Date column per "{market}_{symbol}" key (e.g. from the PriceStore).
+            model_path (str or Path): Where the shared model is saved.
+            features (sequence): Price columns fed to the model; must include Close, the target.
+            horizon (int): Number of future closes predicted in one forward pass.
+        """
+        if "Close" not in features:
+            raise ValueError(f"Features {list(features)} must include Close.")
+        self.frames = frames
+        self.model_path = Path(model_path)
+        self.state_path = ModelFineTuning.state_path_for(model_path)
+        self.look_back = look_back
+        self.features = list(features)
+        self.target_column = self.features.index("Close")
+        self.horizon = horizon
+        self.embedding_dim = embedding_dim
+        self.units = units
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.symbols = sorted(frames)
+        self.windows = []
+        self.index = None
+        self.data_min = None
+        self.data_max = None
+        self.last_date = None
+        self.model = None
+
+    def prepare(self):
+        """
+        Scales each symbol's history and indexes its windows as (symbol id, window) pairs;
+        the windows themselves stay strided views over the scaled arrays.
+        """
+        mins, maxs, index, last_dates = [], [], [], []
+        for symbol_id, key in enumerate(self.symbols):
+            frame = self.frames[key].dropna(subset=self.features)
+            values = frame[self.features].to_numpy(dtype=np.float64)
+            data_min, data_max = values.min(axis=0), values.max(axis=0)
+            scale = np.where(data_max - data_min == 0, 1.0, data_max - data_min)
+            scaled = ((values - data_min) / scale).astype(np.float32)
+
+            x, y = sliding_windows(scaled, self.look_back, self.target_column, self.horizon)
+            self.windows.append((x, y))
+            index.append(np.column_stack([np.full(len(x), symbol_id), np.arange(len(x))]))
+            mins.append(data_min)
+            maxs.append(data_max)
+            last_dates.append(pd.to_datetime(frame["Date"]).max())
+
+        self.data_min, self.data_max = np.array(mins), np.array(maxs)
+        self.index = np.concatenate(index) if index else np.empty((0, 2), dtype=np.int64)
+        self.last_date = max(last_dates).isoformat() if last_dates else None
+
+    def metadata(self) -> dict:
+        return {
+            "symbols": self.symbols,
+            "features": self.features,
+            "horizon": self.horizon,
+            "look_back": self.look_back,
+            "data_min": self.data_min.tolist(),
+            "data_max": self.data_max.tolist(),
+            "last_date": self.last_date,
+        }
+
+    def build_model(self) -> Model:
+        window = Input(shape=(self.look_back, len(self.features)), name="window")
+        symbol = Input(shape=(1,), dtype="int32", name="symbol")
+        embedding = Flatten()(Embedding(len(self.symbols), self.embedding_dim)(symbol))
+        conditioned = Concatenate()([window, RepeatVector(self.look_back)(embedding)])
+        output = Dense(self.horizon)(LSTM(self.units)(conditioned))
+        return Model(inputs=[window, symbol], outputs=output)
+
+    def load_pre_trained_model(self):
+        """
+        Loads the existing shared model if it was trained on the same symbols and layout.
+        """
+        self.model = None
+        try:
+            state = json.loads(self.state_path.read_text())
+            if (state["symbols"], state["features"], state["horizon"], state["look_back"]) != \
+                    (self.symbols, self.features, self.horizon, self.look_back):
+                print("Global model vocabulary or layout changed; training a new model.")
+                return
+            self.model = load_model(self.model_path)
+        except (OSError, ValueError, KeyError):
+            self.model = None
+
+    def batches(self):
+        """
+        Endless ([windows, symbol ids], targets) batches drawn across all symbols.
+        """
+        while True:
+            order = np.random.permutation(len(self.index))
+            for start in range(0, len(order), self.batch_size):
+                rows = self.index[order[start:start + self.batch_size]]
+                x = np.stack([self.windows[s][0][i] for s, i in rows])
+                y = np.stack([self.windows[s][1][i] for s, i in rows])
+                yield (x, rows[:, :1].astype(np.int32)), y
+
+    def fine_tune(self, callbacks=None) -> bool:
+        """
+        Trains the shared model and saves it with its vocabulary and scaler state.
+
+        Returns:
+            bool: True once the model is trained and saved.
+
+        Raises:
+            ValueError: If no symbol has enough bars for a single window.
+        """
+        if self.index is None:
+            self.prepare()
+        if len(self.index) == 0:
+            raise ValueError(f"No symbol has the {self.look_back + self.horizon} bars one window of look-back "
+                             f"{self.look_back} and horizon {self.horizon} needs; cannot train the global model.")
+        if self.model is None:
+            self.model = self.build_model()
+        self.model.compile(optimizer=Adam(learning_rate=0.001), loss='mean_squared_error', metrics=['mae'])
+
+        self.model.fit(self.batches(), steps_per_epoch=steps(len(self.index), self.batch_size),
+                       epochs=self.epochs, verbose=2, callbacks=callbacks)
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        self.model.save(self.model_path)
+        self.state_path.write_text(json.dumps(self.metadata(), indent=2))
+        return True
@@ -1,49 +1,217 @@
+import json
+import math
+import time
+from pathlib import Path
+from typing import Sequence
+
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import load_model, Sequential
 from tensorflow.keras.layers import LSTM, Dense
 from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import Callback
+
+from ..timeseries.windowing import sliding_windows, array_batches, steps
+
+# Share of the history a full retrain fits on; the rest is held out.
+TRAIN_SPLIT = 0.7
+
+
+def min_history(look_back: int, horizon: int = 1) -> int:
+    """
+    Fewest bars whose training split still holds one window and its targets.
+    """
+    return math.ceil((look_back + horizon) / TRAIN_SPLIT)
+
+
+class TimeLimit(Callback):
+    """
+    Stops `model.fit` once a wall-clock budget is exhausted. Raising out of fit
+    keeps `ModelFineTuning.fine_tune` from saving a partially trained model.
+    """
+    def __init__(self, seconds: float):
+        super().__init__()
+        self.deadline = time.monotonic() + seconds
+
+    def on_train_batch_end(self, batch, logs=None):
+        if time.monotonic() > self.deadline:
+            raise TimeoutError("Training time limit exceeded.")
+
 
 class ModelFineTuning:
-    def __init__(self, training_data_path: str, pre_trained_model_path: str, look_back: int = 15):
+    def __init__(self, training_data_path, pre_trained_model_path: str, look_back: int = 15,
+                 incremental: bool = False, replay_size: int = 256, drift_threshold: float = 0.1,
+                 features: Sequence[str] = ("Close",), horizon: int = 1):
+        """
+        Args:
+            training_data_path (str or pd.DataFrame): Price CSV path, or a frame with a Date column (e.g. from the PriceStore).
+            features (sequence): Price columns fed to the model; must include Close, the target.
+            horizon (int): Number of future closes the model predicts in one forward pass.
+            incremental (bool): Train only on bars newer than the last checkpoint plus a replay buffer.
+            replay_size (int): Number of older windows sampled into each incremental run.
+            drift_threshold (float): Relative change of any feature's min/max range beyond which the
+                stored scaler is considered stale and a full retrain is done instead.
+        """
+        if "Close" not in features:
+            raise ValueError(f"Features {list(features)} must include Close.")
         self.training_data_path = training_data_path
         self.look_back = look_back
         self.pre_trained_model_path = pre_trained_model_path
+        self.state_path = self.state_path_for(pre_trained_model_path)
+        self.incremental = incremental
+        self.replay_size = replay_size
+        self.drift_threshold = drift_threshold
+        self.features = list(features)
+        self.target_column = self.features.index("Close")
+        self.horizon = horizon
         self.scaler = MinMaxScaler(feature_range=(0, 1))
         self.train_data = None
         self.test_data = None
+        self.incremental_data = None
+        self.last_date = None
         self.model = None
 
+    @staticmethod
+    def state_path_for(model_path) -> Path:
+        """
+        Sidecar holding the last-trained timestamp and scaler state of a model.
+        """
+        return Path(model_path).with_suffix(".meta.json")
+
+    def load_state(self):
+        if not self.state_path.exists() or not Path(self.pre_trained_model_path).exists():
+            return None
+        try:
+            return json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def save_state(self):
+        state = {
+            "last_date": self.last_date,
+            "data_min": self.scaler.data_min_.tolist(),
+            "data_max": self.scaler.data_max_.tolist(),
+            "look_back": self.look_back,
+            "features": self.features,
+            "horizon": self.horizon,
+        }
+        self.state_path.write_text(json.dumps(state, indent=2))
+
     def data_frame_training(self):
-        training_data_frame = pd.read_csv(self.training_data_path, index_col=0)
+        if isinstance(self.training_data_path, pd.DataFrame):
+            training_data_frame = self.training_data_path.set_index('Date')
+        else:
+            training_data_frame = pd.read_csv(self.training_data_path, index_col=0)
         training_data_frame['Date'] = pd.to_datetime(training_data_frame.index)
-        scaled_data = self.scaler.fit_transform(training_data_frame['Close'].values.reshape(-1, 1))
-        train_size = int(len(scaled_data) * 0.7)
+        training_data_frame = training_data_frame.dropna(subset=self.features)
+        values = training_data_frame[self.features].to_numpy(dtype=np.float64)
+        self.last_date = training_data_frame['Date'].max().isoformat()
+
+        state = self.load_state() if self.incremental else None
+        if state is not None and self._same_layout(state) and not self._scaler_drifted(state, values):
+            self._prepare_incremental(training_data_frame['Date'], values, state)
+            return
+
+        self.incremental_data = None
+        required = min_history(self.look_back, self.horizon)
+        if len(values) < required:
+            raise ValueError(f"{len(values)} bars of history are too few to train with look-back {self.look_back} "
+                             f"and horizon {self.horizon}; at least {required} are needed.")
+        scaled_data = self.scaler.fit_transform(values)
+        train_size = int(len(scaled_data) * TRAIN_SPLIT)
         self.train_data, self.test_data = scaled_data[:train_size], scaled_data[train_size:]
 
+    def _same_layout(self, state) -> bool:
+        # Sidecars written before forecasting mode carry neither key: Close only, one step.
+        same = (state.get("features", ["Close"]) == self.features and state.get("horizon", 1) == self.horizon
+                and state.get("look_back", self.look_back) == self.look_back)
+        if not same:
+            print("Model features, horizon or look-back changed; falling back to a full retrain.")
+        return same
+
+    def _scaler_drifted(self, state, values) -> bool:
+        old_min, old_max = np.atleast_1d(state["data_min"]), np.atleast_1d(state["data_max"])
+        old_range = np.where(old_max - old_min == 0, 1.0, old_max - old_min)
+        drift = float(np.max(np.maximum(np.abs(values.min(axis=0) - old_min), np.abs(values.max(axis=0) - old_max)) / old_range))
+        if drift > self.drift_threshold:
+            print(f"Scaler drift {drift:.2%} exceeds {self.drift_threshold:.2%}; falling back to a full retrain.")
+            return True
+        return False
+
+    def _prepare_incremental(self, dates, values, state):
+        """
+        Scales with the stored scaler and builds windows only for targets reaching bars
+        after the last checkpoint, plus up to `replay_size` randomly sampled older windows.
+        """
+        self.scaler.fit(np.array([np.atleast_1d(state["data_min"]), np.atleast_1d(state["data_max"])]))
+        new_rows = int((dates > pd.Timestamp(state["last_date"])).sum())
+        if new_rows == 0:
+            self.incremental_data = (np.empty((0, self.look_back, len(self.features))), np.empty((0, self.horizon)))
+            return
+
+        tail = values[-(new_rows + self.look_back + self.horizon - 1):]
+        x_new, y_new = self.generate_sequences(self.scaler.transform(tail), self.look_back)
+
+        # Windows whose targets lie before the new tail, as strided views over the raw values.
+        x_old, y_old = sliding_windows(values[:-new_rows], self.look_back, self.target_column, self.horizon)
+        if len(x_old) > 0 and self.replay_size > 0:
+            starts = np.random.choice(len(x_old), size=min(self.replay_size, len(x_old)), replace=False)
+            scale, offset = self.scaler.scale_, self.scaler.min_
+            target_scale, target_offset = scale[self.target_column], offset[self.target_column]
+            x_new = np.concatenate([x_old[starts] * scale + offset, x_new])
+            y_new = np.concatenate([y_old[starts] * target_scale + target_offset, y_new])
+
+        self.incremental_data = (x_new, y_new)
+
     def generate_sequences(self, dataset, look_back=15):
-        X, y = [], []
-        for i in range(len(dataset) - look_back):
-            X.append(dataset[i:i + look_back])
-            y.append(dataset[i + look_back])
-        return np.array(X), np.array(y)
+        """
+        Returns (X, y) as strided views over `dataset`; nothing is copied here.
+        y holds the next `horizon` target values of each window.
+        """
+        return sliding_windows(dataset, look_back, self.target_column, self.horizon)
 
     def load_pre_trained_model(self):
         try:
             self.model = load_model(self.pre_trained_model_path)
-        except:
+        except (OSError, ValueError):
+            # Missing or unreadable file (h5py raises OSError), or a config Keras cannot rebuild.
+            self.model = None
+            return
+        # A model trained with other features or horizon cannot be fine-tuned into this layout.
+        if self.model.input_shape[-1] != len(self.features) or self.model.output_shape[-1] != self.horizon:
+            print(f"Pre-trained model shape does not match features {self.features} and horizon {self.horizon}; training from scratch.")
             self.model = None
+            if self.incremental_data is not None:
+                self.incremental_data = None
+                self.train_data = None
 
-    def fine_tune(self):
-        if self.model is None:
+    def fine_tune(self, callbacks=None):
+        """
+        Trains the model and saves it with its scaler state.
+
+        Returns:
+            bool: False if an incremental run found no new bars and nothing was trained.
+        """
+        if self.incremental_data is not None and self.model is not None:
+            x_train, y_train = self.incremental_data
+            if len(x_train) == 0:
+                print(f"No new bars since {self.load_state()['last_date']}; nothing to train.")
+                return False
+            x_train = np.reshape(x_train, (x_train.shape[0], self.look_back, len(self.features)))
+            self.model.compile(optimizer=Adam(learning_rate=0.0001), loss='mean_squared_error', metrics=['mae'])
+        elif self.model is None:
+            if self.train_data is None:
+                # Incremental state without a usable model; rebuild from the full history.
+                self.incremental = False
+                self.data_frame_training()
             x_train, y_train = self.generate_sequences(self.train_data, self.look_back)
             x_test, y_test = self.generate_sequences(self.test_data, self.look_back)
-            x_train = np.reshape(x_train, (x_train.shape[0], self.look_back, 1))
-            x_test = np.reshape(x_test, (x_test.shape[0], self.look_back, 1))
+            x_train = np.reshape(x_train, (x_train.shape[0], self.look_back, len(self.features)))
+            x_test = np.reshape(x_test, (x_test.shape[0], self.look_back, len(self.features)))
             self.model = Sequential([
-                LSTM(20, input_shape=(self.look_back, 1)),
-                Dense(1)
+                LSTM(20, input_shape=(self.look_back, len(self.features))),
+                Dense(self.horizon)
             ])
             self.model.compile(optimizer=Adam(learning_rate=0.0001), loss='mean_squared_error', metrics=['mae'])
         else:
@@ -52,10 +220,15 @@ class ModelFineTuning:
 
             x_train, y_train = self.generate_sequences(self.train_data, self.look_back)
             x_test, y_test = self.generate_sequences(self.test_data, self.look_back)
-            x_train = np.reshape(x_train, (x_train.shape[0], self.look_back, 1))
-            x_test = np.reshape(x_test, (x_test.shape[0], self.look_back, 1))
-            
+            x_train = np.reshape(x_train, (x_train.shape[0], self.look_back, len(self.features)))
+            x_test = np.reshape(x_test, (x_test.shape[0], self.look_back, len(self.features)))
+
             self.model.compile(optimizer=Adam(learning_rate=0.0001), loss='mean_squared_error', metrics=['mae'])
 
-        self.model.fit(x_train, y_train, epochs=5, batch_size=32, verbose=2)
-        self.model.save(self.pre_trained_model_path)
\ No newline at end of file
+        # Batches are copied out of the window views one at a time instead of materializing X.
+        batch_size = 32
+        self.model.fit(array_batches(x_train, y_train, batch_size), steps_per_epoch=steps(len(x_train), batch_size),
+                       epochs=5, verbose=2, callbacks=callbacks)
+        self.model.save(self.pre_trained_model_path)
+        self.save_state()
+        return True
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import threading
+import multiprocessing
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from ..priceStore.priceStore import PriceStore
+
+
+@dataclass
+class TrainingJob:
+    market: str
+    symbol: str
+    model_path: str
+
+
+@dataclass
+class TrainingResult:
+    market: str
+    symbol: str
+    status: str  # "trained", "skipped", "failed" or "timeout"
+    duration: float = 0.0
+    error: Optional[str] = None
+    data_hash: Optional[str] = None
+
+
+def _init_worker(tf_threads: int):
+    """
+    Limits TensorFlow's thread pools before the runtime in the worker initializes,
+    so N workers do not each spawn one thread per core.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(tf_threads)
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(tf_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(tf_threads)
+
+
+def _train_worker(job: TrainingJob, store_root: str, timeout: float, data_hash: str, incremental: bool = False) -> TrainingResult:
+    from .model import ModelFineTuning, TimeLimit
+    from ..usemodel.predictprice import FORECASTING, FORECAST_FEATURES, FORECAST_HORIZON, TIME_STEPS
+
+    start = time.monotonic()
+    try:
+        prices = PriceStore(store_root).read(job.market, job.symbol)
+        # Forecasting models are trained on the same window length they are served with.
+        fine_tuning_model = ModelFineTuning(prices, job.model_path, incremental=incremental,
+                                            look_back=TIME_STEPS if FORECASTING else 15,
+                                            features=FORECAST_FEATURES, horizon=FORECAST_HORIZON)
+        fine_tuning_model.data_frame_training()
+        fine_tuning_model.load_pre_trained_model()
+        trained = fine_tuning_model.fine_tune(callbacks=[TimeLimit(timeout)])
+        status = "trained" if trained else "skipped"
+        return TrainingResult(job.market, job.symbol, status, time.monotonic() - start, data_hash=data_hash)
+    except TimeoutError as e:
+        return TrainingResult(job.market, job.symbol, "timeout", time.monotonic() - start, str(e))
+    except Exception as e:
+        return TrainingResult(job.market, job.symbol, "failed", time.monotonic() - start, str(e))
+
+
+def _train_global_worker(symbols: List[list], model_path: str, store_root: str, timeout: float, data_hash: str) -> TrainingResult:
+    from .globalModel import GlobalModelTrainer
+    from .model import TimeLimit
+    from ..usemodel.predictprice import FORECASTING, FORECAST_FEATURES, FORECAST_HORIZON, TIME_STEPS
+
+    start = time.monotonic()
+    try:
+        store = PriceStore(store_root)
+        frames = {f"{market}_{symbol}": store.read(market, symbol) for market, symbol in symbols}
+        trainer = GlobalModelTrainer(frames, model_path, look_back=TIME_STEPS if FORECASTING else 15,
+                                     features=FORECAST_FEATURES, horizon=FORECAST_HORIZON)
+        trainer.prepare()
+        trainer.load_pre_trained_model()
+        trained = trainer.fine_tune(callbacks=[TimeLimit(timeout)])
+        status = "trained" if trained else "skipped"
+        return TrainingResult("GLOBAL", "*", status, time.monotonic() - start, data_hash=data_hash)
+    except TimeoutError as e:
+        return TrainingResult("GLOBAL", "*", "timeout", time.monotonic() - start, str(e))
+    except Exception as e:
+        return TrainingResult("GLOBAL", "*", "failed", time.monotonic() - start, str(e))
+
+
+class TrainingExecutor:
+    """
+    Fans ModelFineTuning jobs out across a process pool.
+
+    Each worker runs with a bounded TensorFlow thread pool and reads its prices from
+    the PriceStore. Symbols whose stored data hash matches the one recorded at their
+    last successful train, and whose model is still published (or, without an
+    `is_published` check, whose model file still exists), are skipped. `train` submits a single job and can be called from
+    many threads at once (e.g. by the per-symbol pipeline); `run` trains a whole cycle,
+    and only one cycle can run at a time, overlapping calls return immediately with
+    every job reported as skipped.
+    """
+    def __init__(self, max_workers: Optional[int] = None, tf_threads: Optional[int] = None,
+                 timeout: Optional[float] = None, state_path=None, incremental: Optional[bool] = None,
+                 store: Optional[PriceStore] = None, is_published: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            max_workers (int): Pool size (env TRAIN_WORKERS, default min(4, cpu count)).
+            tf_threads (int): TensorFlow intra/inter-op threads per worker (env TRAIN_TF_THREADS, default 1).
+            timeout (float): Per-symbol training budget in seconds (env TRAIN_TIMEOUT, default 600).
+            state_path (Path): JSON file recording the data hash of each symbol's last successful train.
+            incremental (bool): Train only on new bars plus a replay buffer (env TRAIN_INCREMENTAL=1).
+            store (PriceStore): Source of the training prices.
+            is_published (callable): is_published("{market}_{symbol}") -> whether the symbol's
+                trained model is still served (e.g. present in Redis).
+        """
+        self.max_workers = max_workers or int(os.environ.get("TRAIN_WORKERS", min(4, os.cpu_count() or 1)))
+        self.tf_threads = tf_threads or int(os.environ.get("TRAIN_TF_THREADS", 1))
+        self.timeout = timeout or float(os.environ.get("TRAIN_TIMEOUT", 600))
+        self.state_path = Path(state_path) if state_path else None
+        self.incremental = incremental if incremental is not None else os.environ.get("TRAIN_INCREMENTAL", "0") == "1"
+        self.store = store or PriceStore()
+        self.is_published = is_published
+        self._cycle_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+
+    def _load_state(self) -> dict:
+        if self.state_path is None or not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict):
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2))
+        tmp_path.replace(self.state_path)
+
+    def _record(self, result: TrainingResult):
+        with self._state_lock:
+            state = self._load_state()
+            state[f"{result.market}_{result.symbol}"] = result.data_hash
+            self._save_state(state)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # "spawn" gives every worker a fresh TensorFlow runtime instead of a forked copy.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.tf_threads,),
+                )
+            return self._pool
+
+    def _kill_pool(self, pool: ProcessPoolExecutor):
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        # ProcessPoolExecutor cannot cancel running work; stop its workers directly.
+        for process in list(pool._processes.values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _still_available(self, job: TrainingJob) -> bool:
+        if self.is_published is not None:
+            return self.is_published(f"{job.market}_{job.symbol}")
+        return Path(job.model_path).exists()
+
+    def train(self, job: TrainingJob) -> TrainingResult:
+        """
+        Trains one symbol in the process pool, unless its data is unchanged since its
+        last successful train.
+        """
+        try:
+            data_hash = self.store.content_hash(job.market, job.symbol)
+        except OSError as e:
+            return TrainingResult(job.market, job.symbol, "failed", error=str(e))
+        with self._state_lock:
+            current = self._load_state().get(f"{job.market}_{job.symbol}")
+        if current == data_hash and self._still_available(job):
+            return TrainingResult(job.market, job.symbol, "skipped", data_hash=data_hash)
+
+        # At most one job per worker is in flight, so the deadline never includes queueing.
+        with self._slots:
+            result = self._train_in_pool(job, data_hash)
+
+        if result.status == "trained":
+            self._record(result)
+        print(f"Training {result.market}_{result.symbol}: {result.status} in {result.duration:.1f}s"
+              + (f" ({result.error})" if result.error else ""))
+        return result
+
+    def train_global(self, symbols: List[tuple], model_path: str, data_hash: Optional[str] = None) -> TrainingResult:
+        """
+        Trains the shared multi-symbol model on every (market, symbol) pair in a single
+        pool job. Change detection is left to the caller.
+        """
+        with self._slots:
+            result = self._run_in_pool("GLOBAL", "*", _train_global_worker, [list(s) for s in symbols],
+                                       model_path, str(self.store.root), self.timeout, data_hash)
+        print(f"Training global model over {len(symbols)} symbols: {result.status} in {result.duration:.1f}s"
+              + (f" ({result.error})" if result.error else ""))
+        return result
+
+    def _train_in_pool(self, job: TrainingJob, data_hash: str) -> TrainingResult:
+        return self._run_in_pool(job.market, job.symbol, _train_worker, job, str(self.store.root), self.timeout,
+                                 data_hash, self.incremental)
+
+    def _run_in_pool(self, market: str, symbol: str, worker, *args) -> TrainingResult:
+        pool = self._get_pool()
+        start = time.monotonic()
+        future = pool.submit(worker, *args)
+        try:
+            # TimeLimit normally stops training well before this.
+            return future.result(timeout=self.timeout + 60)
+        except FutureTimeout:
+            # Hard stop for a worker that never reaches a batch boundary (e.g. stuck while loading).
+            # Other jobs in the pool are lost with it and fail through BrokenProcessPool.
+            self._kill_pool(pool)
+            return TrainingResult(market, symbol, "timeout", time.monotonic() - start,
+                                  "worker did not finish before the deadline")
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._kill_pool(pool)
+            return TrainingResult(market, symbol, "failed", time.monotonic() - start, str(e))
+
+    def run(self, jobs: List[TrainingJob]) -> List[TrainingResult]:
+        if not self._cycle_lock.acquire(blocking=False):
+            print("WARNING: A training cycle is already running. Skipping this one.")
+            return [TrainingResult(job.market, job.symbol, "skipped", error="cycle already running") for job in jobs]
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(jobs)))) as threads:
+                return list(threads.map(self.train, jobs))
+        finally:
+            self._cycle_lock.release()
+
+
+if __name__ == "__main__":
+    PROJECT_ROOT = Path(__file__).resolve().parents[3]
+    executor = TrainingExecutor(state_path=PROJECT_ROOT / "assets" / "models" / "training_state.json")
+    job = TrainingJob("NPS", "NABIL", str(PROJECT_ROOT / "assets" / "models" / "NPS_NABIL.h5"))
+    print([asdict(result) for result in executor.run([job])])
+    executor.close()
@@ -0,0 +1,84 @@
+"""
+Parity with Keras and latency of the NumPy LSTM backend (usemodel.liteModel).
+
+    python -m src.services.usemodel.liteBenchmark --symbols 50
+
+Parity runs random-weight models on scaled [0, 1] inputs for float32, float16 and int8
+weights. Latency compares one window through one model, and one window for each of
+`--symbols` distinct models through BatchPredictor (fused Keras graph vs. stacked
+NumPy weights).
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+from .liteModel import LiteModel
+from .predictprice import PredictionRequest, BatchPredictor
+
+TOLERANCES = {None: 1e-5, "float16": 2e-3, "int8": 2e-2}
+
+
+def parity():
+    from keras.models import Sequential
+    from keras.layers import Input, LSTM, Dense
+
+    shapes = [((15, 1), [LSTM(20), Dense(1)]),
+              ((80, 4), [LSTM(20), Dense(5)]),
+              ((30, 2), [LSTM(16, return_sequences=True), LSTM(8), Dense(3, activation="relu")])]
+    ok = True
+    for window_shape, layers in shapes:
+        model = Sequential([Input(shape=window_shape)] + layers)
+        x = np.random.rand(64, *window_shape).astype(np.float32)
+        expected = np.asarray(model.predict_on_batch(x))
+        for quantize, tolerance in TOLERANCES.items():
+            error = float(np.abs(LiteModel.from_keras(model, quantize).predict_on_batch(x) - expected).max())
+            passed = error <= tolerance * max(1.0, float(np.abs(expected).max()))
+            ok = ok and passed
+            print(f"parity {window_shape} {[type(l).__name__ for l in layers]} {quantize or 'float32'}: "
+                  f"max abs error {error:.2e} {'ok' if passed else 'MISMATCH'}")
+    return ok
+
+
+def latency(symbols: int, repeats: int):
+    from keras.models import Sequential
+    from keras.layers import Input, LSTM, Dense
+
+    keras_models = [Sequential([Input(shape=(15, 1)), LSTM(20), Dense(1)]) for _ in range(symbols)]
+    closes = np.random.rand(200) * 100
+    backends = {
+        "keras": keras_models,
+        "numpy": [LiteModel.from_keras(m) for m in keras_models],
+        "numpy int8": [LiteModel.from_keras(m, "int8") for m in keras_models],
+    }
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats * 1000
+
+    for name, models in backends.items():
+        requests = [PredictionRequest.from_closes(f"S{i}", closes, m, 15) for i, m in enumerate(models)]
+        one = requests[0]
+        predictor = BatchPredictor(max_fused_models=1)
+        predictor.predict_batch(requests)  # builds and caches the fused Keras graph
+
+        single = timed(lambda: one.model.predict_on_batch(one.window[None].astype(np.float32)))
+        batched = timed(lambda: predictor.predict_batch(requests))
+        weight_bytes = sum(w.nbytes for w in models[0].get_weights())
+        print(f"{name:>11}: single window {single:.2f} ms, {symbols} symbols batched {batched:.2f} ms, "
+              f"{weight_bytes} weight bytes per model")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    if not parity():
+        raise SystemExit("NumPy backend does not match Keras.")
+    latency(args.symbols, args.repeats)
@@ -0,0 +1,201 @@
+import json
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class UnsupportedModelError(ValueError):
+    """
+    The model uses layers or options the NumPy backend does not implement.
+    """
+
+
+def _sigmoid(x):
+    # Same as 1 / (1 + exp(-x)) without overflow warnings for large |x|.
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+    None: lambda x: x,
+}
+
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise UnsupportedModelError(f"Activation '{name}' is not supported by the NumPy backend.")
+    return ACTIVATIONS[name]
+
+
+class QuantizedWeight:
+    """
+    One weight tensor stored as float32, float16, or int8 with a symmetric scale per
+    output column. `value()` returns the float32 tensor used for the math.
+    """
+    def __init__(self, weight: np.ndarray, quantize: Optional[str] = None):
+        weight = np.asarray(weight, dtype=np.float32)
+        self.shape = weight.shape
+        self.scale = None
+        if quantize is None:
+            self.data = weight
+        elif quantize == "float16":
+            self.data = weight.astype(np.float16)
+        elif quantize == "int8":
+            scale = np.abs(weight).max(axis=0, keepdims=weight.ndim > 1) / 127.0
+            self.scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+            self.data = np.round(weight / self.scale).astype(np.int8)
+        else:
+            raise ValueError(f"Unknown quantization '{quantize}'; use float16, int8 or none.")
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def value(self) -> np.ndarray:
+        if self.scale is not None:
+            return self.data.astype(np.float32) * self.scale
+        return self.data.astype(np.float32, copy=False)
+
+
+class LiteLSTM:
+    def __init__(self, config: dict, weights: Sequence[np.ndarray], quantize: Optional[str] = None):
+        if config.get("go_backwards") or config.get("stateful") or config.get("return_state"):
+            raise UnsupportedModelError("Only forward, stateless LSTM layers are supported.")
+        self.units = config["units"]
+        self.return_sequences = config.get("return_sequences", False)
+        self.activation = _activation(config.get("activation", "tanh"))
+        self.recurrent_activation = _activation(config.get("recurrent_activation", "sigmoid"))
+        kernel, recurrent = weights[0], weights[1]
+        bias = weights[2] if config.get("use_bias", True) else np.zeros(4 * self.units, dtype=np.float32)
+        self.weights = [QuantizedWeight(kernel, quantize), QuantizedWeight(recurrent, quantize),
+                        QuantizedWeight(bias)]
+
+    @staticmethod
+    def forward_many(layers: List["LiteLSTM"], x: np.ndarray) -> np.ndarray:
+        """
+        Runs M same-shaped LSTM layers at once on x of shape (M, batch, steps, features).
+        Gate order is Keras' (input, forget, cell, output).
+        """
+        first = layers[0]
+        kernel, recurrent, bias = (np.stack([layer.weights[i].value() for layer in layers]) for i in range(3))
+        m, batch, steps, features = x.shape
+        units = first.units
+
+        # Input projections for every step in one matmul; only h @ recurrent stays in the loop.
+        projected = np.matmul(x.reshape(m, batch * steps, features), kernel).reshape(m, batch, steps, 4 * units)
+        projected += bias[:, None, None, :]
+
+        h = np.zeros((m, batch, units), dtype=np.float32)
+        c = np.zeros((m, batch, units), dtype=np.float32)
+        outputs = []
+        for t in range(steps):
+            z = projected[:, :, t] + np.matmul(h, recurrent)
+            i = first.recurrent_activation(z[..., :units])
+            f = first.recurrent_activation(z[..., units:2 * units])
+            g = first.activation(z[..., 2 * units:3 * units])
+            o = first.recurrent_activation(z[..., 3 * units:])
+            c = f * c + i * g
+            h = o * first.activation(c)
+            if first.return_sequences:
+                outputs.append(h)
+        return np.stack(outputs, axis=2) if first.return_sequences else h
+
+
+class LiteDense:
+    def __init__(self, config: dict, weights: Sequence[np.ndarray], quantize: Optional[str] = None):
+        self.activation = _activation(config.get("activation", "linear"))
+        kernel = weights[0]
+        bias = weights[1] if config.get("use_bias", True) else np.zeros(kernel.shape[1], dtype=np.float32)
+        self.weights = [QuantizedWeight(kernel, quantize), QuantizedWeight(bias)]
+
+    @staticmethod
+    def forward_many(layers: List["LiteDense"], x: np.ndarray) -> np.ndarray:
+        kernel, bias = (np.stack([layer.weights[i].value() for layer in layers]) for i in range(2))
+        m, inner = x.shape[0], x.shape[-1]
+        out = np.matmul(x.reshape(m, -1, inner), kernel) + bias[:, None, :]
+        return layers[0].activation(out).reshape(x.shape[:-1] + (kernel.shape[-1],))
+
+
+# Layers that are identities at inference time.
+PASSTHROUGH = {"InputLayer", "Dropout"}
+LAYERS = {"LSTM": (LiteLSTM, lambda config: 3 if config.get("use_bias", True) else 2),
+          "Dense": (LiteDense, lambda config: 2 if config.get("use_bias", True) else 1)}
+
+
+class LiteModel:
+    """
+    Pure-NumPy forward pass for the Sequential LSTM/Dense models used here.
+
+    Built from a serialized model blob (or a Keras model) without TensorFlow. It has
+    the `predict_on_batch` / `layers` surface BatchPredictor uses, and `predict_many`
+    runs any number of same-architecture models (one per symbol) together by stacking
+    their weights, so a batch of symbols costs one set of batched matmuls per step.
+    Weights can be kept as float16 or int8 to cut resident memory.
+    """
+    def __init__(self, layers: list, input_shape: Optional[tuple] = None):
+        self.layers = layers
+        self.input_shape = input_shape
+
+    @classmethod
+    def from_parts(cls, architecture: dict, weights: List[np.ndarray], quantize: Optional[str] = None) -> "LiteModel":
+        """
+        Raises:
+            UnsupportedModelError: If the architecture is not a supported Sequential stack.
+        """
+        if architecture.get("class_name") != "Sequential":
+            raise UnsupportedModelError(f"{architecture.get('class_name')} models are not supported by the NumPy backend.")
+        config = architecture["config"]
+        layer_configs = config if isinstance(config, list) else config["layers"]
+
+        layers, offset, input_shape = [], 0, None
+        for layer in layer_configs:
+            name = layer["class_name"]
+            # Keras 3 declares the input on an InputLayer, legacy models on the first layer.
+            shape = layer["config"].get("batch_shape") or layer["config"].get("batch_input_shape")
+            if input_shape is None and shape is not None:
+                input_shape = tuple(shape)
+            if name in PASSTHROUGH:
+                continue
+            if name not in LAYERS:
+                raise UnsupportedModelError(f"Layer '{name}' is not supported by the NumPy backend.")
+            layer_class, weight_count = LAYERS[name]
+            count = weight_count(layer["config"])
+            layers.append(layer_class(layer["config"], weights[offset:offset + count], quantize))
+            offset += count
+        if offset != len(weights) or not layers:
+            raise UnsupportedModelError("Model weights do not match its layers.")
+        return cls(layers, input_shape)
+
+    @classmethod
+    def from_blob(cls, blob: bytes, quantize: Optional[str] = None) -> "LiteModel":
+        from ..modelManager import modelSerializer
+
+        if not modelSerializer.is_serialized_model(blob):
+            raise UnsupportedModelError("Legacy HDF5 model blobs need the Keras backend.")
+        architecture, weights = modelSerializer.read(blob)
+        return cls.from_parts(architecture, weights, quantize)
+
+    @classmethod
+    def from_keras(cls, model, quantize: Optional[str] = None) -> "LiteModel":
+        return cls.from_parts(json.loads(model.to_json()), model.get_weights(), quantize)
+
+    def get_weights(self) -> List[np.ndarray]:
+        return [weight.data for layer in self.layers for weight in layer.weights]
+
+    def predict_on_batch(self, x) -> np.ndarray:
+        return self.predict_many([self], [x])[0]
+
+    @staticmethod
+    def predict_many(models: List["LiteModel"], batches: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Predicts batches[i] with models[i]. All models must share the architecture and
+        all batches the same shape (BatchPredictor pads them).
+        """
+        x = np.stack([np.asarray(batch, dtype=np.float32) for batch in batches])
+        for depth, layer in enumerate(models[0].layers):
+            x = type(layer).forward_many([model.layers[depth] for model in models], x)
+        return list(x)
+
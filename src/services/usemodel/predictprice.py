@@ -1,28 +1,433 @@
 import os
+import time
+import queue
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+
+from ..timeseries.windowing import last_window
+from .liteModel import LiteModel
 
 
 # Suppress TensorFlow logging
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 
+TIME_STEPS = 80
+
+# Forecasting mode: models take these price columns as input features and emit the next
+# FORECAST_HORIZON closes in one forward pass. The defaults keep the Close-only,
+# next-step models; training and serving must run with the same settings.
+FORECAST_FEATURES = tuple(c.strip() for c in os.environ.get("FORECAST_FEATURES", "Close").split(",") if c.strip())
+FORECAST_HORIZON = int(os.environ.get("FORECAST_HORIZON", 1))
+FORECASTING = FORECAST_HORIZON > 1 or FORECAST_FEATURES != ("Close",)
+
+# With GLOBAL_MODEL=1 one shared model (trainmodel.globalModel) serves every symbol
+# instead of one model per ticker; it is published under GLOBAL_MODEL_KEY.
+GLOBAL_MODEL = os.environ.get("GLOBAL_MODEL", "0") == "1"
+GLOBAL_MODEL_KEY = "GLOBAL"
+
+
+def model_time_steps(model, default: int = TIME_STEPS) -> int:
+    """
+    Window length a model was built for (e.g. 15 for the shipped models), or `default`
+    if its input does not fix one.
+    """
+    input_shape = getattr(model, "input_shape", None)
+    if isinstance(input_shape, list):
+        input_shape = input_shape[0]
+    return (input_shape[1] if input_shape is not None and len(input_shape) == 3 else None) or default
+
+
+def load_price_frame(data_path_or_df) -> pd.DataFrame:
+    """
+    Returns the price DataFrame for a CSV path, or the DataFrame itself if one is given.
+    """
+    try:
+        if isinstance(data_path_or_df, pd.DataFrame):
+            data = data_path_or_df
+        else:
+            data = pd.read_csv(data_path_or_df, index_col=0)
+
+        if 'Date' not in data.columns and data.index.name != 'Date':
+             data['Date'] = pd.to_datetime(data.index)
+
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Data file not found at {data_path_or_df}")
+
+    return data
+
+
+@dataclass
+class PredictionRequest:
+    """
+    A single scaled input window together with the parameters needed to invert the prediction.
+    """
+    symbol: Optional[str]
+    model: Any
+    window: np.ndarray
+    data_min: float
+    data_scale: float
+
+    @classmethod
+    def from_features(cls, symbol, values, model, time_steps: Optional[int] = None, target_column: int = 0):
+        """
+        Min-max scales each column of a (rows, features) history (same semantics as
+        MinMaxScaler fitted on the whole history) and keeps the last `time_steps` rows
+        (default: the model's window length) as the model input. Predictions are
+        inverted with the `target_column` scale.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values.reshape(-1, 1) if values.ndim == 1 else values
+        window = last_window(values, time_steps or model_time_steps(model))
+
+        data_min = np.nanmin(values, axis=0)
+        data_scale = np.nanmax(values, axis=0) - data_min
+        data_scale[data_scale == 0.0] = 1.0
+
+        return cls(symbol, model, (window - data_min) / data_scale,
+                   float(data_min[target_column]), float(data_scale[target_column]))
+
+    @classmethod
+    def from_window(cls, symbol, window, model, scaler: dict):
+        """
+        Scales a raw (look_back, features) window, or a 1-D Close window, with the
+        scaler state saved at training time; nothing outside the window is read.
+
+        Args:
+            scaler (dict): Model metadata with per-feature `data_min`/`data_max` and
+                optionally `features` (see ModelFineTuning.save_state).
+        """
+        window = np.asarray(window, dtype=np.float64)
+        window = window.reshape(-1, 1) if window.ndim == 1 else window
+        target_column = list(scaler.get("features", ["Close"])).index("Close")
+
+        data_min = np.atleast_1d(np.asarray(scaler["data_min"], dtype=np.float64))
+        data_scale = np.atleast_1d(np.asarray(scaler["data_max"], dtype=np.float64)) - data_min
+        data_scale[data_scale == 0.0] = 1.0
+
+        return cls(symbol, model, (window - data_min) / data_scale,
+                   float(data_min[target_column]), float(data_scale[target_column]))
+
+    @classmethod
+    def from_closes(cls, symbol, closes, model, time_steps: Optional[int] = None):
+        return cls.from_features(symbol, np.asarray(closes).reshape(-1, 1), model, time_steps)
+
+    @classmethod
+    def from_data(cls, symbol, data_path_or_df, model, time_steps: Optional[int] = None,
+                  features: Sequence[str] = FORECAST_FEATURES):
+        data = load_price_frame(data_path_or_df)
+        return cls.from_features(symbol, data[list(features)].to_numpy(dtype=np.float64), model, time_steps,
+                                 list(features).index("Close"))
+
+    @classmethod
+    def from_store(cls, store, market: str, symbol: str, model, time_steps: Optional[int] = None,
+                   features: Sequence[str] = FORECAST_FEATURES, scaler: Optional[dict] = None):
+        """
+        Builds the request from the memory-mapped feature columns, without any CSV parsing.
+        With the model's saved `scaler` state only the last look-back rows are read;
+        without it (models published before scaler state was) the whole history is.
+
+        Raises:
+            FileNotFoundError: If the store holds no prices for the symbol.
+        """
+        if scaler is not None:
+            look_back = scaler.get("look_back", time_steps or model_time_steps(model))
+            window = np.column_stack([store.tail(market, symbol, look_back, column)
+                                      for column in scaler.get("features", ["Close"])])
+            return cls.from_window(symbol, last_window(window, look_back), model, scaler)
+
+        values = np.column_stack([store.column(market, symbol, column) for column in features])
+        return cls.from_features(symbol, values, model, time_steps, list(features).index("Close"))
+
+    def inverse(self, prediction_scaled) -> List[float]:
+        """
+        Unscales a model output row: one price per forecast step.
+        """
+        return (np.asarray(prediction_scaled, dtype=np.float64).reshape(-1) * self.data_scale + self.data_min).tolist()
+
+
+def architecture_signature(model) -> tuple:
+    """
+    Returns a hashable description of a model's layer types and weight shapes.
+    Models with equal signatures can be fused into a single forward pass.
+    """
+    return tuple(
+        (layer.__class__.__name__, tuple(tuple(w.shape) for w in layer.weights))
+        for layer in model.layers
+    )
+
+
+class BatchPredictor:
+    """
+    Runs many prediction requests with as few Keras calls as possible.
+
+    Requests are grouped by model architecture and window shape. Within a group, all
+    windows for the same model are stacked into one batch, and the distinct models of
+    the group are fused into a multi-input Keras model so the whole group runs in a
+    single `predict_on_batch` call. NumPy-backend models (LiteModel) of a group run
+    together through `LiteModel.predict_many` instead.
+    """
+    def __init__(self, max_fused_models: int = 8):
+        self.max_fused_models = max_fused_models
+        self._fused = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fused_model(self, models: list, window_shape: tuple):
+        key = (tuple(id(m) for m in models), window_shape)
+        with self._lock:
+            cached = self._fused.get(key)
+            if cached is not None:
+                self._fused.move_to_end(key)
+                return cached[0]
+
+        import keras
+
+        inputs = [keras.Input(shape=window_shape) for _ in models]
+        # Models rebuilt from the same kind of blob all share a default name ("sequential"),
+        # and a functional graph needs unique names; a named wrapper keeps the weights shared.
+        outputs = [keras.Sequential([model], name=f"fused_{i}")(inp) for i, (model, inp) in enumerate(zip(models, inputs))]
+        fused = keras.Model(inputs=inputs, outputs=outputs)
+
+        with self._lock:
+            # Keeping the source models referenced keeps their ids unique while cached.
+            self._fused[key] = (fused, models)
+            while len(self._fused) > self.max_fused_models:
+                self._fused.popitem(last=False)
+        return fused
+
+    def predict_batch(self, requests: List[PredictionRequest]) -> List[float]:
+        """
+        Predicts every request and returns the unscaled next-step prices in request order.
+        """
+        return [forecast[0] for forecast in self.forecast_batch(requests)]
+
+    def forecast_batch(self, requests: List[PredictionRequest]) -> List[List[float]]:
+        """
+        Predicts every request and returns each model's full unscaled output, i.e. the
+        forecast for every step of its horizon, in request order.
+        """
+        results = [None] * len(requests)
+
+        groups = defaultdict(list)
+        for idx, request in enumerate(requests):
+            groups[(architecture_signature(request.model), request.window.shape)].append(idx)
+
+        for (_, window_shape), indices in groups.items():
+            # Stack the windows of each distinct model in the group.
+            per_model = OrderedDict()
+            for idx in indices:
+                per_model.setdefault(id(requests[idx].model), []).append(idx)
+
+            models = [requests[idxs[0]].model for idxs in per_model.values()]
+            batches = [np.stack([requests[i].window for i in idxs]).astype(np.float32) for idxs in per_model.values()]
+
+            if len(models) == 1:
+                outputs = [np.asarray(models[0].predict_on_batch(batches[0]))]
+            else:
+                # Fused models need equal batch sizes; pad by repeating the last window.
+                size = max(len(b) for b in batches)
+                padded = [np.concatenate([b, np.repeat(b[-1:], size - len(b), axis=0)]) if len(b) < size else b for b in batches]
+                if all(isinstance(model, LiteModel) for model in models):
+                    outputs = LiteModel.predict_many(models, padded)
+                else:
+                    outputs = self._fused_model(models, window_shape).predict_on_batch(padded)
+                outputs = [np.asarray(out) for out in outputs]
+
+            for idxs, out in zip(per_model.values(), outputs):
+                for row, idx in enumerate(idxs):
+                    results[idx] = requests[idx].inverse(out[row])
+
+        return results
+
+
+class MicroBatcher:
+    """
+    Coalesces single prediction requests coming from concurrent API handlers.
+
+    Requests are queued and a background worker flushes them through the
+    BatchPredictor once `max_batch_size` requests are waiting or `max_wait`
+    seconds have passed since the first one arrived. Requests whose callers gave up
+    (cancelled futures) are dropped, and if a batch fails its requests are retried
+    one by one, so a bad request only fails its own caller.
+    """
+    def __init__(self, predictor: Optional[BatchPredictor] = None, max_batch_size: int = 32, max_wait: float = 0.01,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            timeout (float): Default seconds `predict`/`forecast` wait for a result
+                (env MICRO_BATCH_TIMEOUT, default 30).
+        """
+        self.predictor = predictor or BatchPredictor()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout if timeout is not None else float(os.environ.get("MICRO_BATCH_TIMEOUT", 30))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def submit(self, request: PredictionRequest, horizon: bool = False) -> Future:
+        """
+        Queues a request; the future resolves to the next-step price, or to the whole
+        forecast vector if `horizon` is set.
+        """
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((request, future, horizon))
+        return future
+
+    def predict(self, request: PredictionRequest, timeout: Optional[float] = None) -> float:
+        """
+        Raises:
+            concurrent.futures.TimeoutError: If no result arrives within `timeout` (default: self.timeout).
+        """
+        return self.submit(request).result(timeout=timeout or self.timeout)
+
+    def forecast(self, request: PredictionRequest, timeout: Optional[float] = None) -> List[float]:
+        return self.submit(request, horizon=True).result(timeout=timeout or self.timeout)
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Marks the futures running; those already cancelled (e.g. by asyncio.wrap_future) are dropped.
+        return [item for item in batch if item[1].set_running_or_notify_cancel()]
+
+    @staticmethod
+    def _resolve(item, forecast=None, error=None):
+        _, future, horizon = item
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(forecast if horizon else forecast[0])
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                forecasts = self.predictor.forecast_batch([request for request, _, _ in batch])
+            except Exception:
+                forecasts = None
+
+            for index, item in enumerate(batch):
+                try:
+                    if forecasts is None:
+                        # The batch failed; find out which requests did.
+                        self._resolve(item, self.predictor.forecast_batch([item[0]])[0])
+                    else:
+                        self._resolve(item, forecasts[index])
+                except Exception as e:
+                    self._resolve(item, error=e)
+
+
+batch_predictor = BatchPredictor()
+micro_batcher = MicroBatcher(batch_predictor)
+
+
+class GlobalForecaster:
+    """
+    Serves a shared multi-symbol model: the last window of every requested symbol is
+    scaled with that symbol's training min/max, and all of them go through the model
+    together with their symbol ids in a single `predict_on_batch` call.
+    """
+    def __init__(self, model, metadata: dict):
+        """
+        Args:
+            model (keras.Model): Model taking [windows, symbol ids] (see trainmodel.globalModel).
+            metadata (dict): Vocabulary and per-symbol scaler state saved with the model.
+        """
+        self.model = model
+        self.symbols = metadata["symbols"]
+        self.ids = {key: index for index, key in enumerate(self.symbols)}
+        self.features = metadata["features"]
+        self.target_column = self.features.index("Close")
+        self.look_back = metadata["look_back"]
+        self.data_min = np.asarray(metadata["data_min"], dtype=np.float64)
+        self.data_scale = np.asarray(metadata["data_max"], dtype=np.float64) - self.data_min
+        self.data_scale[self.data_scale == 0.0] = 1.0
+
+    def forecast(self, histories: Dict[str, np.ndarray]) -> Dict[str, List[float]]:
+        """
+        Args:
+            histories (dict): (rows, features) price history per "{market}_{symbol}" key;
+                only the last `look_back` rows are used.
+
+        Returns:
+            dict: Unscaled forecast per key. Keys the model was not trained on are left out.
+        """
+        keys = [key for key in histories if key in self.ids]
+        if not keys:
+            return {}
+        ids = np.array([self.ids[key] for key in keys], dtype=np.int32)
+        windows = np.stack([last_window(histories[key], self.look_back) for key in keys])
+        windows = (windows - self.data_min[ids][:, None, :]) / self.data_scale[ids][:, None, :]
+
+        out = np.asarray(self.model.predict_on_batch([windows.astype(np.float32), ids.reshape(-1, 1)]), dtype=np.float64)
+        out = out * self.data_scale[ids, self.target_column][:, None] + self.data_min[ids, self.target_column][:, None]
+        return {key: row.tolist() for key, row in zip(keys, out)}
+
+    def forecast_store(self, store, symbols: Iterable[Tuple[str, str]]) -> Dict[str, List[float]]:
+        """
+        Forecasts (market, symbol) pairs from the tails of their PriceStore columns.
+        """
+        histories = {}
+        for market, symbol in symbols:
+            columns = [store.tail(market, symbol, self.look_back, column) for column in self.features]
+            histories[f"{market}_{symbol}"] = np.column_stack(columns)
+        return self.forecast(histories)
+
+
 class ModelPredictor:
     """
     Handles price prediction using a pre-loaded Keras model.
     """
-    def __init__(self, data_path_or_df, model):
+    def __init__(self, data_path_or_df, model, scaler: Optional[dict] = None):
         """
         Initializes the predictor with a data path/DataFrame and a pre-loaded model object.
 
         Args:
-            data_path_or_df (pathlib.Path, str, or pd.DataFrame): The path to the CSV data file or a pre-loaded DataFrame.
+            data_path_or_df (pathlib.Path, str, pd.DataFrame or np.ndarray): The path to the CSV data file,
+                a pre-loaded DataFrame, or a raw (look_back, features) / Close window.
             model (keras.Model): The pre-loaded Keras model object passed from the main app.
+            scaler (dict): Scaler state saved with the model; required for a raw window,
+                which is then scaled as-is instead of refitting over a price history.
         """
+        if isinstance(data_path_or_df, np.ndarray) and scaler is None:
+            raise ValueError("A raw window needs the model's saved scaler state.")
         self.data_source = data_path_or_df
         self.model = model
-        
+        self.scaler = scaler
+
+    def _request(self) -> PredictionRequest:
+        if self.scaler is None:
+            return PredictionRequest.from_data(None, self.data_source, self.model)
+        look_back = self.scaler.get("look_back", model_time_steps(self.model))
+        window = self.data_source
+        if not isinstance(window, np.ndarray):
+            data = load_price_frame(window)
+            window = data[list(self.scaler.get("features", ["Close"]))].to_numpy(dtype=np.float64)
+        return PredictionRequest.from_window(None, last_window(window, look_back), self.model, self.scaler)
+
     def _generate_prediction(self):
         """
         Loads data, preprocesses it, and generates a price prediction.
@@ -30,30 +435,13 @@ class ModelPredictor:
         Returns:
             float: The predicted stock price.
         """
-        try:
-            if isinstance(self.data_source, pd.DataFrame):
-                data = self.data_source
-            else:
-                data = pd.read_csv(self.data_source, index_col=0)
-            
-            if 'Date' not in data.columns and data.index.name != 'Date':
-                 data['Date'] = pd.to_datetime(data.index)
-
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Data file not found at {self.data_source}")
-
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_data = scaler.fit_transform(data['Close'].values.reshape(-1, 1))
-        
-        time_steps = 80
-
-        if len(scaled_data) < time_steps:
-            raise ValueError(f"Insufficient data for prediction. Need at least {time_steps} records, but found {len(scaled_data)}.")
-
-        last_sequence = scaled_data[-time_steps:]
-        reshaped_data = np.reshape(last_sequence, (1, time_steps, 1))
-        
-        prediction_scaled = self.model.predict(reshaped_data)
-        predicted_value = scaler.inverse_transform(prediction_scaled)[0, 0]
-        
-        return predicted_value
\ No newline at end of file
+        return batch_predictor.predict_batch([self._request()])[0]
+
+    def _generate_forecast(self):
+        """
+        Predicts every step of the model's horizon in a single forward pass.
+
+        Returns:
+            list: The predicted closes for the next FORECAST_HORIZON bars.
+        """
+        return batch_predictor.forecast_batch([self._request()])[0]
@@ -1,12 +1,34 @@
+import asyncio
+import os
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ..priceStore.priceStore import PriceStore, price_store
+
+MARKET = "NAS"
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def normalize_prices(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns a single-ticker yfinance frame into Date + price columns, kept as float64.
+    """
+    data = data.copy()
+    data.index = pd.to_datetime(data.index).date
+
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+
+    available_columns = [col for col in PRICE_COLUMNS if col in data.columns]
+
+    data['Date'] = data.index
+    data = data[['Date'] + available_columns].copy()
+    data[available_columns] = data[available_columns].astype('float64').round(2)
+    return data.dropna(subset=['Close']) if 'Close' in available_columns else data
 
-script_path = Path(__file__).resolve()
-project_root = script_path.parent.parent.parent.parent
-output_dir = project_root / "assets" / "dataPrice"
-output_dir.mkdir(parents=True, exist_ok=True)
 
 class StockDataService:
     def __init__(self, symbol: str, period_months: int = 6):
@@ -17,28 +39,118 @@ class StockDataService:
 
     def fetch_data(self):
         data = yf.download(self.symbol, start=self.start_date, end=self.end_date, auto_adjust=False)
-        data.index = data.index.date
+        return normalize_prices(data)
 
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
+    def save(self, store: PriceStore = price_store):
+        data = self.fetch_data()
+        rows = store.replace(MARKET, self.symbol, data)
+        print(f"Saved {rows} rows for {MARKET}:{self.symbol}")
 
-        price_columns = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
-        available_columns = [col for col in price_columns if col in data.columns]
 
-        data['Date'] = data.index
-        data = data[['Date'] + available_columns]
+class BulkStockDataService:
+    """
+    Ingests many NASDAQ symbols with multi-ticker yfinance requests.
 
-        for col in available_columns:
-            data[col] = data[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "")
+    Each symbol only fetches the range after its last stored bar. Symbols that share
+    a start date are downloaded together, split into batches of `batch_size` tickers,
+    and at most `max_concurrency` batches are in flight at once.
+    """
+    def __init__(self, symbols: List[str], period_months: int = 6, batch_size: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, download: Callable = yf.download, store: PriceStore = price_store):
+        """
+        Args:
+            symbols (list): Tickers to ingest.
+            period_months (int): History kept per symbol.
+            batch_size (int): Tickers per request (env NAS_BATCH_SIZE, default 50).
+            max_concurrency (int): Concurrent requests (env NAS_MAX_CONCURRENCY, default 4).
+            download (callable): yfinance-compatible download function; replaceable with a local stub.
+            store (PriceStore): Destination price store.
+        """
+        self.symbols = symbols
+        self.period_months = period_months
+        self.batch_size = batch_size or int(os.environ.get("NAS_BATCH_SIZE", 50))
+        self.max_concurrency = max_concurrency or int(os.environ.get("NAS_MAX_CONCURRENCY", 4))
+        self.download = download
+        self.store = store
+        self.end_date = datetime.today().date()
+        self.start_date = self.end_date - timedelta(days=period_months * 30)
 
-        return data
+    def plan(self) -> Dict:
+        """
+        Groups symbols by the first date they are missing (or hold only a streamed,
+        provisional bar for).
+        """
+        groups = {}
+        for symbol in self.symbols:
+            fetch_from = self.store.fetch_from(MARKET, symbol)
+            start = self.start_date if fetch_from is None else max(fetch_from, self.start_date)
+            if start >= self.end_date:
+                continue
+            groups.setdefault(start, []).append(symbol)
+        return groups
+
+    def _download_batch(self, tickers: List[str], start) -> Dict[str, pd.DataFrame]:
+        data = self.download(tickers, start=start, end=self.end_date, auto_adjust=False,
+                             group_by="ticker", threads=False, progress=False)
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker in data.columns.get_level_values(0):
+                    frame = data[ticker]
+                elif ticker in data.columns.get_level_values(1):
+                    frame = data.xs(ticker, axis=1, level=1)
+                else:
+                    continue
+            elif len(tickers) == 1:
+                frame = data
+            else:
+                continue
+            frames[ticker] = normalize_prices(frame.dropna(how="all"))
+        return frames
+
+    def _append(self, symbol: str, new_rows: pd.DataFrame) -> int:
+        return self.store.append(MARKET, symbol, new_rows)
+
+    async def ingest_async(self) -> Dict[str, object]:
+        """
+        Downloads and appends the missing bars of every symbol.
+
+        Returns:
+            dict: Rows appended per symbol, or the exception raised for its batch.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = {symbol: 0 for symbol in self.symbols}
+
+        async def run_batch(tickers, start):
+            async with semaphore:
+                try:
+                    frames = await asyncio.to_thread(self._download_batch, tickers, start)
+                    for ticker, frame in frames.items():
+                        results[ticker] = self._append(ticker, frame)
+                except Exception as e:
+                    for ticker in tickers:
+                        results[ticker] = e
+
+        batches = [
+            run_batch(symbols[i:i + self.batch_size], start)
+            for start, symbols in self.plan().items()
+            for i in range(0, len(symbols), self.batch_size)
+        ]
+        await asyncio.gather(*batches)
+        return results
+
+    def save(self) -> Dict[str, object]:
+        results = asyncio.run(self.ingest_async())
+        for symbol, result in results.items():
+            if isinstance(result, Exception):
+                print(f"Error scraping data for NAS stock {symbol}: {result}")
+            else:
+                print(f"Appended {result} new rows for {MARKET}:{symbol}")
+        return results
 
-    def save_to_csv(self):
-        data = self.fetch_data()
-        file_path = output_dir / f"dataPrice{self.symbol}.csv"
-        data.to_csv(file_path, index=False)
-        print(f"Data saved to {file_path}")
 
 if __name__ == "__main__":
     stock_service = StockDataService('TSLA')
-    stock_service.save_to_csv()
\ No newline at end of file
+    stock_service.save()
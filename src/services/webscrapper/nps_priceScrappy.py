@@ -1,8 +1,12 @@
 from enum import Enum
-import time
+import os
+import queue
+import threading
 import pandas as pd
 import warnings
-from pathlib import Path
+from functools import lru_cache
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -14,18 +18,88 @@ from selenium.webdriver.common.keys import Keys
 from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime, timedelta
 
+from ..priceStore.priceStore import price_store
+
 warnings.filterwarnings("ignore")
 
-script_path = Path(__file__).resolve()
-project_root = script_path.parent.parent.parent.parent
-output_path = project_root / "assets" / "dataPrice" / "dataPrice"
+MARKET = "NPS"
+
+
+@lru_cache(maxsize=1)
+def chrome_driver_path() -> str:
+    """
+    Resolves the chromedriver binary once per process instead of once per browser.
+    """
+    return ChromeDriverManager().install()
+
+
+class _TableParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.headers, self.rows = [], []
+        self._row, self._cell, self._in_head = None, None, False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "thead":
+            self._in_head = True
+        elif tag == "tr":
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag == "thead":
+            self._in_head = False
+        elif tag in ("td", "th") and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._in_head and not self.headers:
+                self.headers = self._row
+            elif not self._in_head and self._row:
+                self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_table_html(html: str) -> pd.DataFrame:
+    """
+    Parses a rendered price table (thead headers + tbody rows) locally.
+    """
+    parser = _TableParser()
+    parser.feed(html)
+    rows = [row for row in parser.rows if len(row) == len(parser.headers)]
+    return pd.DataFrame(rows, columns=parser.headers)
+
+
+def convert_trading_frame(df_symbol: pd.DataFrame) -> pd.DataFrame:
+    df_symbol = df_symbol.copy()
+    df_symbol['Total Traded Shares'] = df_symbol['Total Traded Shares'].str.replace(',', '', regex=False).astype(float)
+    df_symbol['Close Price'] = df_symbol['Close Price'].str.replace(',', '', regex=False).astype(float)
+    df_symbol['Max Price'] = df_symbol['Max Price'].str.replace(',', '', regex=False).astype(float)
+    df_symbol['Min Price'] = df_symbol['Min Price'].str.replace(',', '', regex=False).astype(float)
+
+    converted_df = pd.DataFrame({
+        'Date': df_symbol['Date'],
+        'Close': df_symbol['Close Price'],
+        'High': df_symbol['Max Price'],
+        'Low': df_symbol['Min Price'],
+        'Volume': df_symbol['Total Traded Shares']
+    })
+
+    return converted_df.sort_values(by='Date')
+
 
 class NepseScraper:
     class Page(Enum):
         TODAY_PRICE = "today-price"
         STOCK_TRADING = "stock-trading"
 
-    def __init__(self):
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or os.environ.get("NEPSE_BASE_URL", "https://www.nepalstock.com")
         opts = Options()
         opts.add_argument('--headless=new')
         opts.add_argument("--window-size=1920,1080")
@@ -36,15 +110,14 @@ class NepseScraper:
         opts.add_experimental_option('excludeSwitches', ['enable-logging'])
         opts.add_argument("--log-level=3")
 
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opts)
+        self.driver = webdriver.Chrome(service=Service(chrome_driver_path()), options=opts)
         self.driver.set_window_position(800, 0)
         self.driver.set_window_size(700, 900)
 
     def open_page(self, page=Page.TODAY_PRICE):
-        self.driver.get(f"https://www.nepalstock.com/{page.value}")
+        self.driver.get(f"{self.base_url}/{page.value}")
 
     def close(self):
-        time.sleep(3)
         self.driver.quit()
 
     def get_data_for_symbol(self, symbol, from_date, to_date):
@@ -61,9 +134,7 @@ class NepseScraper:
         symbol_input = self.driver.find_element(By.XPATH, "//input[@placeholder='Stock Symbol or Company Name']")
         symbol_input.clear()
         symbol_input.click()
-        for ch in symbol:
-            symbol_input.send_keys(ch)
-        symbol_input.send_keys(Keys.ENTER)
+        symbol_input.send_keys(symbol, Keys.ENTER)
 
         Select(self.driver.find_element(By.TAG_NAME, "select")).select_by_value("500")
 
@@ -71,44 +142,94 @@ class NepseScraper:
             "//button[contains(@class, 'box__filter--search') and normalize-space(text())='Filter']"
         ).click()
 
+        # One round trip for the whole table; cells are parsed locally.
         table = wait.until(EC.visibility_of_element_located((By.CLASS_NAME, "table-responsive")))
-        headers = [th.text.strip() for th in table.find_element(By.CLASS_NAME, "thead-light").find_elements(By.TAG_NAME, "th")]
-
-        rows = table.find_elements(By.TAG_NAME, "tr")
-        data = [[td.text for td in row.find_elements(By.TAG_NAME, "td")] for row in rows if row.find_elements(By.TAG_NAME, "td")]
+        return parse_table_html(table.get_attribute("innerHTML"))
 
-        return pd.DataFrame(data, columns=headers)
 
-def scrape_and_save(symbol):
+def _date_range():
     today = datetime.today()
     end_date_str = today.strftime("%m/%d/%Y")
     start_date_str = (today - timedelta(days=178)).strftime("%m/%d/%Y")
+    return start_date_str, end_date_str
 
-    scraper = NepseScraper()
-    scraper.open_page(NepseScraper.Page.STOCK_TRADING)
 
-    try:
-        df_symbol = scraper.get_data_for_symbol(symbol, from_date=start_date_str, to_date=end_date_str)
+def _scrape_with(scraper: NepseScraper, symbol):
+    start_date_str, end_date_str = _date_range()
+    scraper.open_page(NepseScraper.Page.STOCK_TRADING)
+    df_symbol = scraper.get_data_for_symbol(symbol, from_date=start_date_str, to_date=end_date_str)
+    converted_df = convert_trading_frame(df_symbol)
 
-        df_symbol['Total Traded Shares'] = df_symbol['Total Traded Shares'].str.replace(',', '', regex=False).astype(float)
-        df_symbol['Close Price'] = df_symbol['Close Price'].astype(float)
-        df_symbol['Max Price'] = df_symbol['Max Price'].astype(float)
-        df_symbol['Min Price'] = df_symbol['Min Price'].astype(float)
+    # Only bars newer than the last stored one are appended.
+    price_store.append(MARKET, symbol, converted_df)
 
-        converted_df = pd.DataFrame({
-            'Date': df_symbol['Date'],
-            'Close': df_symbol['Close Price'],
-            'High': df_symbol['Max Price'],
-            'Low': df_symbol['Min Price'],
-            'Volume': df_symbol['Total Traded Shares']
-        })
 
-        converted_df = converted_df.sort_values(by='Date')
+def scrape_and_save(symbol, scraper: NepseScraper = None):
+    """
+    Scrapes one symbol, reusing `scraper` if given, otherwise with a throwaway browser.
+    """
+    if scraper is not None:
+        _scrape_with(scraper, symbol)
+        return
 
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        converted_df.to_csv(output_path.with_name(f"dataPrice{symbol}.csv"), index=False)
+    scraper = NepseScraper()
+    try:
+        _scrape_with(scraper, symbol)
     finally:
         scraper.close()
 
+
+class NepseScraperPool:
+    """
+    Keeps a small, bounded set of browser sessions alive and scrapes many symbols with them.
+    Each worker thread owns one browser and pulls symbols from a shared queue.
+    """
+    def __init__(self, workers: int = None, scraper_factory=NepseScraper):
+        """
+        Args:
+            workers (int): Number of concurrent browsers (env NPS_SCRAPER_WORKERS, default 2).
+            scraper_factory (callable): Builds a scraper session; replaceable for local fixtures.
+        """
+        self.workers = workers or int(os.environ.get("NPS_SCRAPER_WORKERS", 2))
+        self.scraper_factory = scraper_factory
+
+    def scrape_and_save(self, symbols) -> dict:
+        """
+        Returns:
+            dict: None per successfully scraped symbol, or the exception raised for it.
+        """
+        pending = queue.Queue()
+        for symbol in symbols:
+            pending.put(symbol)
+        results, lock = {}, threading.Lock()
+
+        def worker():
+            scraper = None
+            try:
+                while True:
+                    try:
+                        symbol = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        if scraper is None:
+                            scraper = self.scraper_factory()
+                        scrape_and_save(symbol, scraper)
+                        outcome = None
+                    except Exception as e:
+                        outcome = e
+                    with lock:
+                        results[symbol] = outcome
+            finally:
+                if scraper is not None:
+                    scraper.close()
+
+        workers = max(1, min(self.workers, len(symbols)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in range(workers):
+                executor.submit(worker)
+        return results
+
+
 if __name__ == "__main__":
-    scrape_and_save("NABIL")
\ No newline at end of file
+    scrape_and_save("NABIL")
@@ -0,0 +1,113 @@
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+MAX_CYCLES = 50
+
+
+def file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def combine(*hashes: Optional[str]) -> str:
+    return hashlib.sha256("|".join(h or "" for h in hashes).encode("utf-8")).hexdigest()
+
+
+class ContentManifest:
+    """
+    Content hashes of every symbol's inputs and artifacts, consulted by pipeline stages.
+
+    For each symbol and stage the manifest keeps the hash of the inputs the stage last
+    completed with, and how long that took. A stage whose inputs hash the same can be
+    skipped; the skipped run's previous duration (and, for uploads, payload size) is
+    counted as saved for the current cycle. The last cycles' totals are kept in the file.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = self._load()
+        self._cycle = None
+
+    def _load(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("symbols", {})
+        data.setdefault("cycles", [])
+        return data
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._data, indent=2))
+        tmp_path.replace(self.path)
+
+    def _symbol(self, key: str) -> dict:
+        return self._data["symbols"].setdefault(key, {"artifacts": {}, "stages": {}})
+
+    def artifact(self, key: str, name: str) -> Optional[str]:
+        with self._lock:
+            return self._symbol(key)["artifacts"].get(name)
+
+    def set_artifact(self, key: str, name: str, content_hash: str):
+        with self._lock:
+            self._symbol(key)["artifacts"][name] = content_hash
+            self._save()
+
+    def unchanged(self, key: str, stage: str, inputs: str) -> bool:
+        with self._lock:
+            entry = self._symbol(key)["stages"].get(stage)
+            return entry is not None and entry["inputs"] == inputs
+
+    def record(self, key: str, stage: str, inputs: str, duration: Optional[float] = None, nbytes: int = 0):
+        """
+        Records that `stage` completed for `key` with the given inputs hash. Without a
+        `duration` the previously recorded one is kept (e.g. when the work was a no-op).
+        """
+        with self._lock:
+            previous = self._symbol(key)["stages"].get(stage, {})
+            if duration is None:
+                duration = previous.get("duration", 0.0)
+            self._symbol(key)["stages"][stage] = {"inputs": inputs, "duration": duration, "bytes": nbytes,
+                                                  "at": time.time()}
+            if self._cycle is not None:
+                self._cycle["ran"][stage] = self._cycle["ran"].get(stage, 0) + 1
+            self._save()
+
+    def skipped(self, key: str, stage: str):
+        with self._lock:
+            entry = self._symbol(key)["stages"].get(stage, {})
+            if self._cycle is not None:
+                self._cycle["skipped"][stage] = self._cycle["skipped"].get(stage, 0) + 1
+                self._cycle["saved_seconds"] += entry.get("duration", 0.0)
+                self._cycle["saved_bytes"] += entry.get("bytes", 0)
+        print(f"{key}: {stage} skipped, inputs unchanged.")
+
+    def begin_cycle(self, cycle: str):
+        with self._lock:
+            self._cycle = {"cycle": cycle, "started": time.time(), "ran": {}, "skipped": {},
+                           "saved_seconds": 0.0, "saved_bytes": 0}
+
+    def end_cycle(self) -> Optional[dict]:
+        with self._lock:
+            cycle, self._cycle = self._cycle, None
+            if cycle is None:
+                return None
+            cycle["finished"] = time.time()
+            self._data["cycles"] = (self._data["cycles"] + [cycle])[-MAX_CYCLES:]
+            self._save()
+        print(f"Cycle {cycle['cycle']}: ran {cycle['ran']}, skipped {cycle['skipped']}, saved "
+              f"~{cycle['saved_seconds']:.1f}s and {cycle['saved_bytes'] / 1e6:.1f} MB of uploads.")
+        return cycle
+
+    def cycles(self) -> list:
+        with self._lock:
+            return list(self._data["cycles"])
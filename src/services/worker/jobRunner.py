@@ -0,0 +1,171 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+import redis
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """
+    Redis lock with an expiring lease that is renewed while held.
+
+    The lock is a `SET NX PX` key holding a random token, so only the holder can renew
+    or release it. If the holder dies, the lease expires after `ttl` seconds and another
+    node can take over.
+    """
+    def __init__(self, client, name: str, ttl: float):
+        self.client = client
+        self.name = name
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self.lost = False
+        self._stop = threading.Event()
+        self._renewer = None
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._renew = client.register_script(RENEW_SCRIPT)
+
+    def acquire(self) -> bool:
+        if not self.client.set(self.name, self.token, nx=True, px=int(self.ttl * 1000)):
+            return False
+        self._renewer = threading.Thread(target=self._keep_alive, name=f"lease-{self.name}", daemon=True)
+        self._renewer.start()
+        return True
+
+    def _keep_alive(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                renewed = self._renew(keys=[self.name], args=[self.token, int(self.ttl * 1000)])
+            except redis.RedisError as e:
+                print(f"WARNING: Could not renew lease '{self.name}': {e}")
+                continue
+            if not renewed:
+                self.lost = True
+                print(f"WARNING: Lease '{self.name}' was lost; another node may start the same job.")
+                return
+
+    def release(self):
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+        try:
+            self._release(keys=[self.name], args=[self.token])
+        except redis.RedisError as e:
+            print(f"WARNING: Could not release lease '{self.name}': {e}")
+
+
+class JobRunner:
+    """
+    Runs scheduled jobs at most once per cycle across every node that schedules them.
+
+    Each run takes the job's lease (`job_lock:{name}`); nodes that cannot get it skip
+    the run. The lease holder also skips if another node finished the job less than
+    `min_interval` seconds ago, so staggered schedulers do not repeat a cycle.
+    Outcomes are counted in the `job_metrics:{name}` hash shared by all nodes.
+    """
+    def __init__(self, client=None, lease_ttl: float = None):
+        """
+        Args:
+            client: Redis client (defaults to REDIS_URL).
+            lease_ttl (float): Lease expiry in seconds, renewed every third of it while the
+                job runs (env JOB_LEASE_TTL, default 60).
+        """
+        self.client = client or redis.from_url(os.environ.get("REDIS_URL", "redis://localhost:6379"))
+        self.lease_ttl = lease_ttl or float(os.environ.get("JOB_LEASE_TTL", 60))
+        self.node = f"{socket.gethostname()}:{os.getpid()}"
+
+    @staticmethod
+    def lock_key(name: str) -> str:
+        return f"job_lock:{name}"
+
+    @staticmethod
+    def metrics_key(name: str) -> str:
+        return f"job_metrics:{name}"
+
+    def _record(self, name: str, status: str, duration: Optional[float] = None, error: str = None):
+        now = time.time()
+        fields = {"last_status": status, "last_node": self.node, "last_finished": now, "last_error": error or ""}
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hincrby(self.metrics_key(name), status, 1)
+        if duration is not None:
+            fields["last_duration"] = duration
+            pipe.hincrbyfloat(self.metrics_key(name), "total_duration", duration)
+        if status == "succeeded":
+            fields["last_success"] = now
+        pipe.hset(self.metrics_key(name), mapping=fields)
+        pipe.execute()
+
+    def run(self, name: str, job: Callable[[], None], min_interval: float = 0) -> str:
+        """
+        Returns:
+            str: "succeeded", "failed" or "skipped".
+        """
+        try:
+            lease = RedisLease(self.client, self.lock_key(name), self.lease_ttl)
+            if not lease.acquire():
+                self._record(name, "skipped")
+                print(f"Job '{name}' is running on another node; skipping.")
+                return "skipped"
+        except redis.RedisError as e:
+            print(f"ERROR: Could not coordinate job '{name}', skipping: {e}")
+            return "skipped"
+
+        try:
+            last_success = self.client.hget(self.metrics_key(name), "last_success")
+            if last_success is not None and time.time() - float(last_success) < min_interval:
+                self._record(name, "skipped")
+                print(f"Job '{name}' already ran this cycle; skipping.")
+                return "skipped"
+
+            start = time.monotonic()
+            try:
+                job()
+            except Exception as e:
+                self._record(name, "failed", time.monotonic() - start, str(e))
+                print(f"ERROR: Job '{name}' failed: {e}")
+                return "failed"
+            self._record(name, "succeeded", time.monotonic() - start)
+            return "succeeded"
+        finally:
+            lease.release()
+
+    def wrap(self, name: str, job: Callable[[], None], min_interval: float = 0) -> Callable[[], str]:
+        def run_job():
+            return self.run(name, job, min_interval)
+        run_job.__name__ = f"{name}_locked"
+        return run_job
+
+    def stats(self, names: Iterable[str]) -> Dict[str, dict]:
+        pipe = self.client.pipeline(transaction=False)
+        names = list(names)
+        for name in names:
+            pipe.hgetall(self.metrics_key(name))
+        result = {}
+        for name, raw in zip(names, pipe.execute()):
+            metrics = {k.decode(): v.decode() for k, v in raw.items()}
+            for field in ("succeeded", "failed", "skipped"):
+                metrics[field] = int(metrics.get(field, 0))
+            result[name] = metrics
+        return result
+
+
+# The jobs scheduled by worker.jobs.schedule_jobs, as reported by /jobs/stats.
+JOB_NAMES = ["train_model_job", "scrape_all_stocks_job"]
+
+job_runner = JobRunner()
@@ -0,0 +1,345 @@
+import json
+import time
+import asyncio
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from ..usemodel.predictprice import (PredictionRequest, GlobalForecaster, micro_batcher, FORECAST_HORIZON,
+                                     GLOBAL_MODEL, GLOBAL_MODEL_KEY)
+from ..trainmodel.trainingExecutor import TrainingExecutor, TrainingJob
+from ..cacheManager.cacheManager import save_values, save_forecasts, get_entry, get_entries, publish_updates
+from ..modelManager.modelCache import RedisModelHandler, load_model
+from ..modelManager.modelRegistry import model_registry
+from ..database.postgresbase import PostgresDB
+from ..priceStore.priceStore import price_store
+from .jobRunner import job_runner
+from .pipeline import Stage, SymbolPipeline, summarize
+from .contentManifest import ContentManifest, file_hash, combine
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+pre_trained_model_path = PROJECT_ROOT / "assets" / "models"
+
+model_handler = RedisModelHandler()
+# Unchanged symbols are skipped as long as their model is still published in Redis.
+training_executor = TrainingExecutor(state_path=pre_trained_model_path / "training_state.json",
+                                     is_published=lambda key: model_handler.get_version(key) is not None)
+# Input/artifact hashes per symbol and stage; kept across cycles (cleanup does not touch it).
+manifest = ContentManifest(pre_trained_model_path / "content_manifest.json")
+
+NAS = ["NVDA","MSFT","AAPL","AMZN","TSLA"]
+NPS = ["GBIME","NABIL","CIT","EBL","HIDCL"]
+
+TRAIN_INTERVAL = 2 * 60
+SCRAPE_INTERVAL = 60
+
+@lru_cache(maxsize=1)
+def get_stock_db() -> PostgresDB:
+    """
+    Connects on first use rather than at import, so the DB_* settings are read after
+    the entry point has loaded .env (predictAPI imports this module before doing so).
+    """
+    return PostgresDB()
+
+def model_path(market: str, symbol: str) -> Path:
+    return pre_trained_model_path / f"{market}_{symbol}.h5"
+
+def train_symbol(market: str, symbol: str, state: dict):
+    """
+    Fine-tunes the symbol's model in the training process pool, unless it was already
+    trained on identical data and that model is still published.
+    """
+    key = f"{market}_{symbol}"
+    data_hash = price_store.content_hash(market, symbol)
+    state["data_hash"] = data_hash
+    if manifest.unchanged(key, "train", data_hash) and model_handler.get_version(key) is not None:
+        state["model_hash"] = manifest.artifact(key, "model")
+        manifest.skipped(key, "train")
+        return
+
+    result = training_executor.train(TrainingJob(market, symbol, str(model_path(market, symbol))))
+    if result.status in ("failed", "timeout"):
+        raise RuntimeError(f"training {result.status}: {result.error}")
+    state["data_hash"] = result.data_hash or data_hash
+    # A skipped symbol may have no local model file (e.g. on another worker); its published one is unchanged.
+    path = model_path(market, symbol)
+    state["model_hash"] = file_hash(path) if path.exists() else manifest.artifact(key, "model")
+    manifest.record(key, "train", state["data_hash"], result.duration if result.status == "trained" else None)
+
+def cache_model(market: str, symbol: str, state: dict):
+    """
+    Publishes the trained model and its scaler state to Redis under its registry key,
+    unless the published model already has the same content.
+    """
+    key = f"{market}_{symbol}"
+    model_hash = state["model_hash"]
+    # No hash means training was skipped without a local model file; the published one stands.
+    if (model_hash is None or manifest.unchanged(key, "cache_model", model_hash)) \
+            and model_handler.get_version(key) is not None:
+        manifest.skipped(key, "cache_model")
+        return
+
+    start = time.monotonic()
+    path = model_path(market, symbol)
+    # The scaler state ModelFineTuning saved next to the model is published with it.
+    scaler_path = path.with_suffix(".meta.json")
+    scaler = json.loads(scaler_path.read_text()) if scaler_path.exists() else None
+    model_handler.set_model(load_model(path), key, metadata=scaler)
+    manifest.record(key, "cache_model", model_hash, time.monotonic() - start, path.stat().st_size)
+    manifest.set_artifact(key, "model", model_hash)
+
+class PredictionBatch:
+    """
+    Collects the predictions of one pipeline cycle, so they reach Redis in a single
+    pipelined round trip (save_values / save_forecasts) instead of one per symbol.
+    A prediction only counts as done in the manifest once it has been written.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def add(self, symbol: str, prediction, model_version, model_key: str, inputs: str, duration: float):
+        with self._lock:
+            self._pending[symbol] = (prediction, model_version, model_key, inputs, duration)
+
+    def flush(self) -> int:
+        """
+        Writes every collected prediction and records it in the manifest.
+
+        Returns:
+            int: Number of symbols written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        versions = {symbol: version for symbol, (_, version, _, _, _) in pending.items()}
+        predictions = {symbol: prediction for symbol, (prediction, _, _, _, _) in pending.items()}
+        if FORECAST_HORIZON > 1:
+            save_forecasts(predictions, model_versions=versions)
+        else:
+            save_values(predictions, model_versions=versions)
+        for _, _, model_key, inputs, duration in pending.values():
+            manifest.record(model_key, "predict", inputs, duration)
+        return len(pending)
+
+prediction_batch = PredictionBatch()
+
+def cache_prediction(market: str, symbol: str, state: dict):
+    """
+    Predicts the next close (or the next FORECAST_HORIZON closes, in one forward pass)
+    with the published model and queues it for the cycle's batched Redis write, unless a
+    cached prediction from the same data and model is still there.
+    Concurrent symbols are coalesced into shared inference calls by the micro-batcher.
+    """
+    model_key = f"{market}_{symbol}"
+    inputs = combine(state["data_hash"], state["model_hash"])
+    if manifest.unchanged(model_key, "predict", inputs) and get_entry(symbol) is not None:
+        manifest.skipped(model_key, "predict")
+        return
+
+    start = time.monotonic()
+    model = model_registry.get_model(model_key)
+    # Scaled with the scaler state published alongside the model; only the last window is read.
+    request = PredictionRequest.from_store(price_store, market, symbol, model, scaler=model_registry.metadata(model_key))
+    prediction = micro_batcher.forecast(request) if FORECAST_HORIZON > 1 else micro_batcher.predict(request)
+    prediction_batch.add(symbol, prediction, model_registry.version(model_key), model_key, inputs,
+                         time.monotonic() - start)
+
+def cache_price_data(market: str, symbol: str, state: dict):
+    """
+    Upserts the symbol's new or changed bars into the normalized prices table, unless
+    this exact dataset was already synced.
+    """
+    key = f"{market}_{symbol}"
+    data_hash = price_store.content_hash(market, symbol)
+    if manifest.unchanged(key, "persist", data_hash):
+        manifest.skipped(key, "persist")
+        return
+
+    start = time.monotonic()
+    stock_db = get_stock_db()
+    if stock_db.engine is None:
+        raise RuntimeError("database is not configured")
+    if stock_db.sync_prices(market, symbol, price_store.read(market, symbol), raise_errors=True):
+        # API replicas drop their cached /stocks payloads for this symbol
+        publish_updates([symbol])
+    manifest.record(key, "persist", data_hash, time.monotonic() - start)
+
+def delete_symbol_files(market: str, symbol: str, state: dict):
+    """
+    Deletes the symbol's legacy CSV. Its price store partition is kept, so the next
+    scrape only fetches newer bars and predictions can always read the latest window;
+    the model and its checkpoint sidecar are kept so the next cycle fine-tunes from them
+    (incrementally with TRAIN_INCREMENTAL=1).
+    """
+    legacy_csv = PROJECT_ROOT / "assets" / "dataPrice" / f"dataPrice{symbol}.csv"
+    try:
+        legacy_csv.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"ERROR: Could not delete file {legacy_csv}: {e}")
+
+SYMBOL_STAGES = [
+    Stage("train", train_symbol, pool="train"),
+    Stage("cache_model", cache_model, ["train"]),
+    Stage("predict", cache_prediction, ["cache_model"]),
+    Stage("persist", cache_price_data),
+    Stage("cleanup", delete_symbol_files, ["predict", "persist"]),
+]
+
+# In global model mode training and prediction run once for all symbols (global_cycle);
+# only persisting and cleanup remain per symbol.
+GLOBAL_STAGES = [
+    Stage("persist", cache_price_data),
+    Stage("cleanup", delete_symbol_files, ["persist"]),
+]
+
+def global_model_path() -> Path:
+    return pre_trained_model_path / f"{GLOBAL_MODEL_KEY}.h5"
+
+def global_cycle(symbols: list):
+    """
+    Trains the shared model over all symbols, publishes it with its vocabulary and
+    scaler state, and predicts every symbol in one batched call. Each step is skipped
+    when its inputs are unchanged, like the per-symbol stages.
+    """
+    key = GLOBAL_MODEL_KEY
+    path = global_model_path()
+    data_hash = combine(*(price_store.content_hash(market, symbol) for market, symbol in symbols))
+
+    if manifest.unchanged(key, "train", data_hash) and model_handler.get_version(key) is not None:
+        model_hash = manifest.artifact(key, "model")
+        manifest.skipped(key, "train")
+    else:
+        result = training_executor.train_global(symbols, str(path), data_hash)
+        if result.status in ("failed", "timeout"):
+            raise RuntimeError(f"global training {result.status}: {result.error}")
+        model_hash = file_hash(path)
+        manifest.record(key, "train", data_hash, result.duration if result.status == "trained" else None)
+
+    if manifest.unchanged(key, "cache_model", model_hash) and model_handler.get_version(key) is not None:
+        manifest.skipped(key, "cache_model")
+    else:
+        start = time.monotonic()
+        metadata = json.loads(path.with_suffix(".meta.json").read_text())
+        model_handler.set_model(load_model(path), key, metadata=metadata)
+        manifest.record(key, "cache_model", model_hash, time.monotonic() - start, path.stat().st_size)
+        manifest.set_artifact(key, "model", model_hash)
+
+    inputs = combine(data_hash, model_hash)
+    names = {f"{market}_{symbol}": symbol for market, symbol in symbols}
+    if manifest.unchanged(key, "predict", inputs) and all(get_entries(names.values()).values()):
+        manifest.skipped(key, "predict")
+        return
+
+    start = time.monotonic()
+    forecaster = GlobalForecaster(model_registry.get_model(key), model_registry.metadata(key))
+    forecasts = {names[k]: forecast for k, forecast in forecaster.forecast_store(price_store, symbols).items()}
+    versions = {symbol: model_registry.version(key) for symbol in forecasts}
+    if FORECAST_HORIZON > 1:
+        save_forecasts(forecasts, model_versions=versions)
+    else:
+        save_values({symbol: forecast[0] for symbol, forecast in forecasts.items()}, model_versions=versions)
+    manifest.record(key, "predict", inputs, time.monotonic() - start)
+
+def data_fingerprint(market: str, symbol: str):
+    try:
+        return price_store.content_hash(market, symbol)
+    except FileNotFoundError:
+        return None
+
+pipeline = SymbolPipeline(
+    SYMBOL_STAGES,
+    pre_trained_model_path / "pipeline_state.json",
+    pool_limits={"train": training_executor.max_workers},
+    fingerprint=data_fingerprint,
+)
+
+global_pipeline = SymbolPipeline(
+    GLOBAL_STAGES,
+    pre_trained_model_path / "pipeline_state_global.json",
+    fingerprint=data_fingerprint,
+)
+
+def train_model_job():
+    """
+    Runs the train -> cache model -> predict and persist -> cleanup stages for every
+    stock with price data. Each symbol advances on its own as soon as its previous stage
+    finishes; an incomplete cycle is resumed by the next run. With GLOBAL_MODEL=1 the
+    shared model is trained and predicts for all symbols first, then each symbol is
+    persisted and cleaned up.
+    """
+    symbols = []
+    for market, stock_list in {"NAS": NAS, "NPS": NPS}.items():
+        for stock_symbol in stock_list:
+            # Check if price data exists before proceeding
+            if not price_store.exists(market, stock_symbol):
+                print(f"WARNING: Price data not found for {market}:{stock_symbol}. Skipping this cycle.")
+                continue
+            symbols.append((market, stock_symbol))
+
+    manifest.begin_cycle(time.strftime("%Y%m%dT%H%M%S"))
+    try:
+        if GLOBAL_MODEL:
+            global_cycle(symbols)
+            result = asyncio.run(global_pipeline.run(symbols))
+        else:
+            result = asyncio.run(pipeline.run(symbols))
+            # One round trip for every prediction of the cycle, including a failed cycle's.
+            prediction_batch.flush()
+    finally:
+        manifest.end_cycle()
+    print(summarize(result))
+    if not result.complete:
+        raise RuntimeError("pipeline cycle incomplete")
+
+def scrape_all_stocks_job():
+    """
+    Scrapes data for all stocks in NAS and NPS lists into the price store.
+    Only bars newer than each symbol's last stored bar are appended.
+    """
+    # Scraper stacks (yfinance, Selenium) are only loaded where scraping actually runs.
+    from ..webscrapper.nps_priceScrappy import NepseScraperPool
+    from ..webscrapper.nas_priceScrappy import BulkStockDataService
+
+    # All NAS symbols in bounded concurrent multi-ticker requests, only for missing dates
+    try:
+        BulkStockDataService(NAS).save()
+    except Exception as e:
+        print(f"Error scraping data for NAS stocks: {e}")
+
+    # NPS symbols share a small pool of long-lived browser sessions
+    for stock_symbol, error in NepseScraperPool().scrape_and_save(NPS).items():
+        if error is None:
+            print(f"Successfully scraped and saved data for {stock_symbol}")
+        else:
+            print(f"Error scraping data for NPS stock {stock_symbol}: {error}")
+
+def schedule_jobs(scheduler):
+    """
+    Registers the scraping and training jobs on `scheduler`. Every run goes through the
+    distributed job lease, so any number of API processes or workers can schedule them
+    and each cycle still runs on one node only.
+    """
+    scheduler.add_job(
+        job_runner.wrap("train_model_job", train_model_job, min_interval=TRAIN_INTERVAL * 0.9),
+        # CronTrigger(day_of_week='mon', hour=11, minute=0, second=0),
+        IntervalTrigger(seconds=TRAIN_INTERVAL),
+        id='monday_training',
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True
+    )
+
+    scheduler.add_job(
+        job_runner.wrap("scrape_all_stocks_job", scrape_all_stocks_job, min_interval=SCRAPE_INTERVAL * 0.9),
+        # CronTrigger(day_of_week='fri', hour=11, minute=0, second=0),
+        IntervalTrigger(seconds=SCRAPE_INTERVAL),
+        id='friday_scraping',
+        replace_existing=True
+    )
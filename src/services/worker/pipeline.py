@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DONE = "done"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+@dataclass
+class Stage:
+    """
+    One per-symbol step. `run(market, symbol, state)` is a blocking function executed in
+    a worker thread; `state` is the symbol's checkpoint dict, so values a stage stores
+    in it (e.g. the data hash it consumed) survive a resumed run.
+    """
+    name: str
+    run: Callable[[str, str, dict], None]
+    depends_on: Sequence[str] = ()
+    pool: str = "io"
+
+
+@dataclass
+class StageOutcome:
+    status: str
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class PipelineResult:
+    cycle: str
+    resumed: bool
+    outcomes: Dict[str, Dict[str, StageOutcome]] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return all(o.status == DONE for stages in self.outcomes.values() for o in stages.values())
+
+
+class SymbolPipeline:
+    """
+    Runs a dependency graph of stages independently for every symbol.
+
+    A stage starts as soon as the same symbol's dependencies are done, so one symbol can
+    be predicted while another is still training. Stages draw on named pools, each a
+    semaphore bounding how many run at once across all symbols. Finished stages are
+    checkpointed to `checkpoint_path` after each one completes; if a cycle ends with
+    failures, the next run resumes it and only repeats stages that did not finish, for
+    symbols whose input fingerprint is unchanged.
+    """
+    def __init__(self, stages: List[Stage], checkpoint_path, pool_limits: Dict[str, int] = None,
+                 fingerprint: Callable[[str, str], Optional[str]] = None):
+        """
+        Args:
+            stages (list): Stages in topological order; `depends_on` names earlier stages.
+            checkpoint_path (Path): JSON checkpoint of the current cycle.
+            pool_limits (dict): Concurrency per pool name; pools not listed default to
+                PIPELINE_CONCURRENCY (default 4).
+            fingerprint (callable): fingerprint(market, symbol) of a symbol's inputs. A resumed
+                symbol whose fingerprint changed starts over.
+        """
+        names = set()
+        for stage in stages:
+            missing = [dep for dep in stage.depends_on if dep not in names]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown or later stages {missing}")
+            names.add(stage.name)
+        self.stages = stages
+        self.checkpoint_path = Path(checkpoint_path)
+        self.pool_limits = pool_limits or {}
+        self.default_limit = int(os.environ.get("PIPELINE_CONCURRENCY", 4))
+        self.fingerprint = fingerprint
+
+    def _load_checkpoint(self) -> Optional[dict]:
+        try:
+            return json.loads(self.checkpoint_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _save_checkpoint(self, checkpoint: dict):
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(checkpoint, indent=2))
+        tmp_path.replace(self.checkpoint_path)
+
+    def _start_cycle(self, symbols: List[Tuple[str, str]]) -> Tuple[dict, bool]:
+        previous = self._load_checkpoint()
+        resumed = previous is not None and not previous.get("finished", False)
+        checkpoint = previous if resumed else {"cycle": time.strftime("%Y%m%dT%H%M%S"), "finished": False, "symbols": {}}
+
+        for market, symbol in symbols:
+            key = f"{market}_{symbol}"
+            fingerprint = self.fingerprint(market, symbol) if self.fingerprint else None
+            entry = checkpoint["symbols"].get(key)
+            if entry is None or entry.get("fingerprint") != fingerprint:
+                checkpoint["symbols"][key] = {"market": market, "symbol": symbol, "fingerprint": fingerprint,
+                                              "stages": {}, "state": {}}
+        return checkpoint, resumed
+
+    async def run(self, symbols: List[Tuple[str, str]]) -> PipelineResult:
+        """
+        Runs every stage for every (market, symbol) pair, plus any unfinished symbols of
+        an interrupted cycle.
+        """
+        checkpoint, resumed = self._start_cycle(symbols)
+        result = PipelineResult(checkpoint["cycle"], resumed)
+        semaphores = {}
+        tasks = {}
+
+        def semaphore(pool):
+            if pool not in semaphores:
+                semaphores[pool] = asyncio.Semaphore(self.pool_limits.get(pool, self.default_limit))
+            return semaphores[pool]
+
+        async def run_stage(key: str, entry: dict, stage: Stage) -> str:
+            outcomes = result.outcomes.setdefault(key, {})
+            statuses = [await tasks[(key, dep)] for dep in stage.depends_on]
+            if entry["stages"].get(stage.name) == DONE:
+                outcomes[stage.name] = StageOutcome(DONE)
+                return DONE
+            if any(status != DONE for status in statuses):
+                outcomes[stage.name] = StageOutcome(BLOCKED)
+                return BLOCKED
+
+            async with semaphore(stage.pool):
+                start = time.monotonic()
+                try:
+                    await asyncio.to_thread(stage.run, entry["market"], entry["symbol"], entry["state"])
+                    outcome = StageOutcome(DONE, time.monotonic() - start)
+                except Exception as e:
+                    outcome = StageOutcome(FAILED, time.monotonic() - start, str(e))
+                    print(f"ERROR: Stage '{stage.name}' failed for {key}: {e}")
+
+            outcomes[stage.name] = outcome
+            entry["stages"][stage.name] = outcome.status
+            self._save_checkpoint(checkpoint)
+            return outcome.status
+
+        for key, entry in checkpoint["symbols"].items():
+            for stage in self.stages:
+                tasks[(key, stage.name)] = asyncio.create_task(run_stage(key, entry, stage))
+        await asyncio.gather(*tasks.values())
+
+        checkpoint["finished"] = result.complete
+        self._save_checkpoint(checkpoint)
+        return result
+
+
+def summarize(result: PipelineResult) -> str:
+    lines = [f"Pipeline cycle {result.cycle}" + (" (resumed)" if result.resumed else "")
+             + (": complete" if result.complete else ": incomplete, will resume")]
+    for key, stages in result.outcomes.items():
+        parts = [f"{name}={o.status}" + (f" {o.duration:.1f}s" if o.duration else "") for name, o in stages.items()]
+        lines.append(f"  {key}: " + ", ".join(parts))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    def sleeper(seconds, fail_rate=0.0):
+        def run(market, symbol, state):
+            time.sleep(seconds)
+            if random.random() < fail_rate:
+                raise RuntimeError("transient failure")
+        return run
+
+    stages = [
+        Stage("train", sleeper(0.2, fail_rate=0.3), pool="train"),
+        Stage("upload", sleeper(0.05), ["train"]),
+        Stage("predict", sleeper(0.05), ["upload"]),
+        Stage("persist", sleeper(0.1)),
+        Stage("cleanup", sleeper(0.01), ["predict", "persist"]),
+    ]
+    symbols = [("NAS", s) for s in ["NVDA", "MSFT", "AAPL", "AMZN", "TSLA"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = SymbolPipeline(stages, Path(tmp) / "pipeline.json", pool_limits={"train": 2})
+        for _ in range(3):
+            start = time.perf_counter()
+            result = asyncio.run(pipeline.run(symbols))
+            print(summarize(result))
+            print(f"  took {time.perf_counter() - start:.2f}s")
+            if result.complete:
+                break
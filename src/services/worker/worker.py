@@ -0,0 +1,27 @@
+from dotenv import load_dotenv
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+# Before the job modules are imported: their Redis clients read the environment at import.
+load_dotenv()
+
+from .jobs import schedule_jobs
+from .jobRunner import job_runner, JOB_NAMES
+
+
+def main():
+    """
+    Runs the scraping and training jobs outside the web server. Start one or more of
+    these next to API replicas running with EMBEDDED_SCHEDULER=0 (or SERVING_ONLY=1);
+    the job lease makes sure each cycle runs on exactly one of them.
+    """
+    scheduler = BlockingScheduler()
+    schedule_jobs(scheduler)
+    print(f"Worker {job_runner.node} started; scheduling {', '.join(JOB_NAMES)}.")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        print("Worker stopped.")
+
+
+if __name__ == "__main__":
+    main()
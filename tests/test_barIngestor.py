@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.priceStore.priceStore import PriceStore
+from src.services.streaming.barIngestor import BarIngestor
+
+
+def last_close(market, symbol, window, features):
+    # Stand-in for a model: echoes the newest close of the window.
+    return float(window[-1, features.index("Close")]), 1
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(tmp_path)
+    dates = pd.bdate_range("2024-01-01", periods=40)
+    store.append("NAS", "AAPL", pd.DataFrame({"Date": dates, "Close": np.linspace(100, 140, 40)}))
+    return store
+
+
+def test_new_bars_are_appended_and_predicted(store):
+    ingestor = BarIngestor(store, predict=last_close, window_size=15)
+
+    result = ingestor.ingest("nas", "aapl", [{"Date": "2024-02-26", "Close": 141.0},
+                                             {"Date": "2024-02-27", "Close": 142.0}])
+
+    assert (result.appended, result.prediction, result.error) == (2, 142.0, None)
+    np.testing.assert_allclose(ingestor.window("NAS", "AAPL")[:, 0], store.tail("NAS", "AAPL", 15))
+
+
+def test_bars_without_stored_history_are_rejected(store):
+    ingestor = BarIngestor(store, predict=last_close)
+
+    result = ingestor.ingest("NAS", "MSFT", [{"Date": "2024-02-26", "Close": 410.0}])
+
+    assert result.appended == 0 and "no stored history" in result.error
+    assert not store.exists("NAS", "MSFT")
+    assert store.symbols("NAS") == ["AAPL"]
+
+
+def test_invalid_dates_are_rejected_before_storing(store):
+    ingestor = BarIngestor(store, predict=last_close)
+
+    result = ingestor.ingest("NAS", "AAPL", [{"Date": "2024-02-26", "Close": 141.0},
+                                             {"Date": "not a date", "Close": 142.0}])
+
+    assert result.appended == 0 and "not a date" in result.error
+    assert store.last_date("NAS", "AAPL") == pd.Timestamp("2024-02-23").date()
+
+
+def test_store_failures_are_reported_per_symbol(store, monkeypatch):
+    def broken_append(market, symbol, frame, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "append", broken_append)
+    result = BarIngestor(store, predict=last_close).ingest("NAS", "AAPL", [{"Date": "2024-02-26", "Close": 141.0}])
+
+    assert result.appended == 0 and result.error == "disk full"
+
+
+def test_window_follows_official_bars_replacing_streamed_ones(store):
+    ingestor = BarIngestor(store, predict=last_close, window_size=15)
+    ingestor.ingest("NAS", "AAPL", [{"Date": "2024-02-26", "Close": 141.0}])
+
+    # The scrape replaces the streamed bar with the official close.
+    store.append("NAS", "AAPL", pd.DataFrame({"Date": ["2024-02-26"], "Close": [140.5]}))
+    result = ingestor.ingest("NAS", "AAPL", [{"Date": "2024-02-27", "Close": 142.0}])
+
+    assert result.appended == 1
+    np.testing.assert_allclose(ingestor.window("NAS", "AAPL")[:, 0], store.tail("NAS", "AAPL", 15))
+    assert ingestor.window("NAS", "AAPL")[-2, 0] == 140.5
+    assert store.fetch_from("NAS", "AAPL") == pd.Timestamp("2024-02-27").date()
@@ -0,0 +1,30 @@
+import pytest
+
+from src.services.cacheManager.cacheManager import decode_forecast, decode_value, encode_forecast, encode_value
+
+FORECAST = encode_forecast([101.5, 102.25, 103.0], model_version=7, as_of=1_700_000_000.0)
+
+
+def test_forecast_round_trips():
+    decoded = decode_forecast(FORECAST)
+
+    assert decoded.prices == [101.5, 102.25, 103.0]
+    assert (decoded.model_version, decoded.as_of) == (7, 1_700_000_000.0)
+    assert decode_forecast(encode_forecast([])).prices == []
+
+
+@pytest.mark.parametrize("raw", [
+    None,
+    b"",
+    FORECAST[:5],                  # cut inside the header
+    FORECAST[:-3],                 # cut inside the last step
+    encode_value(101.5),           # a next-day value under the forecast key
+    b"\x09" + FORECAST[1:],        # unknown tag
+])
+def test_unreadable_forecasts_are_missing(raw):
+    assert decode_forecast(raw) is None
+
+
+def test_value_round_trips_and_reads_legacy_json():
+    assert decode_value(encode_value(101.5, model_version=3, as_of=5.0)) == (101.5, 3, 5.0)
+    assert decode_value(b"101.5") == (101.5, None, None)
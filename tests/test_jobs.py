@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tensorflow")
+pytest.importorskip("apscheduler")
+
+from src.services.priceStore.priceStore import PriceStore
+from src.services.trainmodel.model import ModelFineTuning
+from src.services.worker import jobs
+
+
+def prices(days: int) -> pd.DataFrame:
+    # Same seed, so a longer history extends a shorter one with new bars.
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.5, days))
+    return pd.DataFrame({"Date": pd.bdate_range("2024-01-01", periods=days), "Close": close})
+
+
+def train(store: PriceStore, path) -> ModelFineTuning:
+    # What the training worker runs for one symbol with TRAIN_INCREMENTAL=1.
+    tuner = ModelFineTuning(store.read("NAS", "TEST"), str(path), incremental=True)
+    tuner.data_frame_training()
+    tuner.load_pre_trained_model()
+    tuner.fine_tune()
+    return tuner
+
+
+def test_second_cycle_fine_tunes_incrementally(tmp_path, monkeypatch):
+    store = PriceStore(tmp_path / "prices")
+    monkeypatch.setattr(jobs, "price_store", store)
+    monkeypatch.setattr(jobs, "pre_trained_model_path", tmp_path / "models")
+    monkeypatch.setattr(jobs, "PROJECT_ROOT", tmp_path)
+    path = jobs.model_path("NAS", "TEST")
+    path.parent.mkdir()
+
+    store.append("NAS", "TEST", prices(200))
+    first = train(store, path)
+    assert first.incremental_data is None
+
+    jobs.delete_symbol_files("NAS", "TEST", {})
+    assert store.meta("NAS", "TEST")["rows"] == 200
+    assert path.exists() and path.with_suffix(".meta.json").exists()
+
+    # The next scrape appends 5 new bars to the kept history.
+    assert store.append("NAS", "TEST", prices(205)) == 5
+    second = train(store, path)
+    x_train, _ = second.incremental_data
+    assert len(x_train) == 5 + min(second.replay_size, 200 - second.look_back)
+
+
+def test_cycle_predictions_are_written_in_one_round_trip(tmp_path, monkeypatch):
+    writes = []
+    monkeypatch.setattr(jobs, "FORECAST_HORIZON", 1)
+    monkeypatch.setattr(jobs, "save_values", lambda prices, model_versions: writes.append((prices, model_versions)))
+    monkeypatch.setattr(jobs, "manifest", jobs.ContentManifest(tmp_path / "manifest.json"))
+    batch = jobs.PredictionBatch()
+
+    batch.add("NVDA", 120.5, 3, "NAS_NVDA", "inputs-nvda", 0.1)
+    batch.add("NABIL", 510.0, 7, "NPS_NABIL", "inputs-nabil", 0.2)
+    assert writes == [] and not jobs.manifest.unchanged("NAS_NVDA", "predict", "inputs-nvda")
+
+    assert batch.flush() == 2
+    assert writes == [({"NVDA": 120.5, "NABIL": 510.0}, {"NVDA": 3, "NABIL": 7})]
+    assert jobs.manifest.unchanged("NAS_NVDA", "predict", "inputs-nvda")
+    assert jobs.manifest.unchanged("NPS_NABIL", "predict", "inputs-nabil")
+    assert batch.flush() == 0 and len(writes) == 1
+
+
+def test_database_settings_are_read_on_first_use(tmp_path, monkeypatch):
+    # As if .env were loaded after the worker modules were imported.
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'prices.db'}")
+    jobs.get_stock_db.cache_clear()
+    try:
+        assert jobs.get_stock_db().engine is not None
+        assert jobs.get_stock_db() is jobs.get_stock_db()
+    finally:
+        jobs.get_stock_db.cache_clear()
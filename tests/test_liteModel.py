@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from src.services.modelManager import modelSerializer
+from src.services.modelManager.modelCache import load_model
+from src.services.usemodel.liteModel import LiteModel
+
+MODELS = Path(__file__).resolve().parents[1] / "assets" / "models"
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    import keras
+
+    keras.utils.set_random_seed(1)
+    return keras.Sequential([
+        keras.Input((15, 1)),
+        keras.layers.LSTM(16, return_sequences=True),
+        keras.layers.LSTM(8),
+        keras.layers.Dense(1),
+    ])
+
+
+def windows(count: int = 8, steps: int = 15) -> np.ndarray:
+    # Scaled closes, as PredictionRequest feeds them.
+    return np.random.default_rng(1).uniform(0, 1, (count, steps, 1)).astype(np.float32)
+
+
+@pytest.mark.parametrize("quantize, tolerance", [(None, 1e-7), ("float16", 1e-4), ("int8", 2e-3)])
+def test_matches_keras(keras_model, quantize, tolerance):
+    x = windows()
+    expected = keras_model.predict_on_batch(x)
+
+    lite = LiteModel.from_blob(modelSerializer.dumps(keras_model), quantize=quantize)
+
+    assert lite.input_shape == (None, 15, 1)
+    np.testing.assert_allclose(lite.predict_on_batch(x), expected, rtol=0, atol=tolerance)
+
+
+def test_predict_many_matches_each_model(keras_model):
+    import keras
+
+    other = keras.models.clone_model(keras_model)
+    other.set_weights([w * 0.5 for w in keras_model.get_weights()])
+    x, y = windows(4), windows(4)[::-1].copy()
+
+    first, second = LiteModel.predict_many([LiteModel.from_keras(keras_model), LiteModel.from_keras(other)], [x, y])
+
+    np.testing.assert_allclose(first, keras_model.predict_on_batch(x), atol=1e-6)
+    np.testing.assert_allclose(second, other.predict_on_batch(y), atol=1e-6)
+
+
+@pytest.mark.parametrize("name", ["NPS_NABIL", "NAS_AAPL"])
+def test_loads_shipped_model(name):
+    keras_model = load_model(MODELS / f"{name}.h5")
+    steps = keras_model.input_shape[1]
+    x = windows(steps=steps)
+
+    lite = LiteModel.from_blob(modelSerializer.dumps(keras_model))
+
+    assert lite.input_shape[1:] == keras_model.input_shape[1:]
+    np.testing.assert_allclose(lite.predict_on_batch(x), keras_model.predict_on_batch(x), atol=1e-5)
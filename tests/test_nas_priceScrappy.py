@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+
+from src.services.priceStore.priceStore import PriceStore
+from src.services.webscrapper.nas_priceScrappy import BulkStockDataService, MARKET
+
+
+class FakeDownload:
+    """
+    Stands in for yf.download(group_by="ticker"): one (ticker, field) column block per
+    ticker with a bar for every business day in [start, end).
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, start, end, **kwargs):
+        self.calls.append((list(tickers), start))
+        dates = pd.bdate_range(start, end - timedelta(days=1))
+        frames = {}
+        for ticker in tickers:
+            # Prices encode the ticker and the day, so misrouted rows are detectable.
+            base = 100.0 * (1 + sum(map(ord, ticker)) % 7) + np.arange(len(dates))
+            frames[ticker] = pd.DataFrame({
+                "Open": base, "High": base + 1, "Low": base - 1, "Close": base + 0.5,
+                "Adj Close": base + 0.5, "Volume": np.full(len(dates), 1000.0),
+            }, index=dates)
+        return pd.concat(frames, axis=1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(tmp_path)
+
+
+def service(symbols, store, download, **kwargs):
+    return BulkStockDataService(symbols, download=download, store=store, **kwargs)
+
+
+def test_plan_groups_symbols_by_first_missing_date(store):
+    bulk = service(["AAA", "BBB", "CCC"], store, FakeDownload())
+    last = bulk.end_date - timedelta(days=10)
+    for symbol in ("AAA", "CCC"):
+        store.append(MARKET, symbol, pd.DataFrame({"Date": [last], "Close": [1.0]}))
+
+    assert bulk.plan() == {last + timedelta(days=1): ["AAA", "CCC"], bulk.start_date: ["BBB"]}
+
+
+def test_ingest_splits_multi_ticker_batches(store):
+    download = FakeDownload()
+    symbols = ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    results = service(symbols, store, download, batch_size=2, max_concurrency=2).save()
+
+    assert sorted(len(tickers) for tickers, _ in download.calls) == [1, 2, 2]
+    assert sorted(t for tickers, _ in download.calls for t in tickers) == symbols
+    expected = FakeDownload()(["AAA", "BBB"], download.calls[0][1], service([], store, download).end_date)
+    for symbol in ("AAA", "BBB"):
+        stored = store.read(MARKET, symbol)
+        assert results[symbol] == len(stored) == len(expected)
+        assert stored["Close"].dtype == np.float64
+        np.testing.assert_allclose(stored["Close"].to_numpy(), expected[symbol]["Close"].to_numpy())
+
+
+def test_second_run_fetches_only_missing_dates(store):
+    service(["AAA", "BBB"], store, FakeDownload()).save()
+    first_rows = len(store.read(MARKET, "AAA"))
+    last_date = store.last_date(MARKET, "AAA")
+
+    download = FakeDownload()
+    later = service(["AAA", "BBB"], store, download)
+    later.end_date += timedelta(days=7)
+    results = later.save()
+
+    assert download.calls == [(["AAA", "BBB"], last_date + timedelta(days=1))]
+    new_days = len(pd.bdate_range(last_date + timedelta(days=1), later.end_date - timedelta(days=1)))
+    assert results == {"AAA": new_days, "BBB": new_days}
+    assert len(store.read(MARKET, "AAA")) == first_rows + new_days
+
+
+def test_scrape_after_a_cycle_is_incremental(store, tmp_path, monkeypatch):
+    pytest.importorskip("apscheduler")
+    import asyncio
+    from src.services.database.postgresbase import PostgresDB, dispose_engines
+    from src.services.worker import jobs
+    from src.services.worker.pipeline import SymbolPipeline
+
+    symbols = ["AAA", "BBB"]
+    service(symbols, store, FakeDownload()).save()
+
+    # One cycle's per-symbol stages (persist, cleanup) against this store and a SQLite stand-in.
+    monkeypatch.setattr(jobs, "price_store", store)
+    monkeypatch.setattr(jobs, "manifest", jobs.ContentManifest(tmp_path / "manifest.json"))
+    monkeypatch.setattr(jobs, "publish_updates", lambda symbols: None)
+    monkeypatch.setattr(jobs, "get_stock_db", lambda: PostgresDB(url=f"sqlite:///{tmp_path / 'prices.db'}"))
+    pipeline = SymbolPipeline(jobs.GLOBAL_STAGES, tmp_path / "pipeline.json")
+    try:
+        assert asyncio.run(pipeline.run([(MARKET, symbol) for symbol in symbols])).complete
+    finally:
+        dispose_engines()
+
+    last_date = store.last_date(MARKET, "AAA")
+    download = FakeDownload()
+    later = service(symbols, store, download)
+    later.end_date += timedelta(days=7)
+    later.save()
+
+    assert download.calls == [(symbols, last_date + timedelta(days=1))]
+
+
+def test_plan_refetches_streamed_bars(store):
+    bulk = service(["AAA"], store, FakeDownload())
+    last = bulk.end_date - timedelta(days=10)
+    store.append(MARKET, "AAA", pd.DataFrame({"Date": [last], "Close": [1.0]}))
+    store.append(MARKET, "AAA", pd.DataFrame({"Date": [last + timedelta(days=1)], "Close": [2.0]}), provisional=True)
+
+    assert bulk.plan() == {last + timedelta(days=1): ["AAA"]}
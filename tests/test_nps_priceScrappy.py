@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("webdriver_manager")
+
+from src.services.priceStore.priceStore import PriceStore
+from src.services.webscrapper import nps_priceScrappy
+from src.services.webscrapper.nps_priceScrappy import (
+    MARKET, NepseScraperPool, convert_trading_frame, parse_table_html,
+)
+
+# Trimmed markup of the stock-trading "table-responsive" block, plus the malformed
+# rows (colspan footer, empty and truncated rows) the parser has to skip.
+FIXTURE = Path(__file__).parent / "fixtures" / "nepse_stock_trading.html"
+
+HEADERS = [
+    "S.N.", "Date", "Total Transactions", "Total Traded Shares",
+    "Total Traded Amount", "Max Price", "Min Price", "Close Price",
+]
+
+
+def test_parse_table_html_keeps_headers_and_drops_malformed_rows():
+    df = parse_table_html(FIXTURE.read_text())
+
+    assert list(df.columns) == HEADERS
+    # The colspan footer, the empty row and the truncated row are dropped.
+    assert df["S.N."].tolist() == ["1", "2", "3"]
+    # Cell whitespace is collapsed.
+    assert df.loc[2, "Total Traded Shares"] == "1,204,310"
+
+
+def test_convert_trading_frame_types_and_orders_bars():
+    df = convert_trading_frame(parse_table_html(FIXTURE.read_text()))
+
+    assert list(df.columns) == ["Date", "Close", "High", "Low", "Volume"]
+    assert df["Date"].tolist() == ["2025-07-01", "2025-07-02", "2025-07-03"]
+    for column in ("Close", "High", "Low", "Volume"):
+        assert df[column].dtype == np.float64
+    assert df["Volume"].tolist() == [1204310.0, 18402.0, 21874.0]
+    assert df["High"].iloc[0] == 1002.0
+
+
+class FixtureScraper:
+    """
+    Serves the saved table for every symbol except those listed in `broken`.
+    """
+    def __init__(self, broken=()):
+        self.broken = broken
+        self.closed = False
+
+    def open_page(self, page=None):
+        pass
+
+    def get_data_for_symbol(self, symbol, from_date, to_date):
+        if symbol in self.broken:
+            raise TimeoutError(symbol)
+        return parse_table_html(FIXTURE.read_text())
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_stores_parsed_bars_and_reports_failures(tmp_path, monkeypatch):
+    store = PriceStore(tmp_path)
+    monkeypatch.setattr(nps_priceScrappy, "price_store", store)
+    scrapers = []
+
+    def factory():
+        scrapers.append(FixtureScraper(broken={"BAD"}))
+        return scrapers[-1]
+
+    results = NepseScraperPool(workers=2, scraper_factory=factory).scrape_and_save(["NABIL", "BAD", "NICA"])
+
+    assert results["NABIL"] is None and results["NICA"] is None
+    assert isinstance(results["BAD"], TimeoutError)
+    assert 1 <= len(scrapers) <= 2 and all(s.closed for s in scrapers)
+
+    stored = store.read(MARKET, "NABIL")
+    assert pd.to_datetime(stored["Date"]).tolist() == list(pd.to_datetime(["2025-07-01", "2025-07-02", "2025-07-03"]))
+    assert stored["Close"].tolist() == [519.9, 520.0, 521.5]
+    assert not store.exists(MARKET, "BAD")
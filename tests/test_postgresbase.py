@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from src.services.database.postgresbase import PRICES_TABLE, PostgresDB, dispose_engines
+
+
+def bars(days: int) -> pd.DataFrame:
+    close = 100 + np.arange(days, dtype=float)
+    return pd.DataFrame({
+        "Date": pd.date_range("2024-03-01", periods=days).strftime("%Y-%m-%d"),
+        "Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+        "Volume": np.full(days, 1000.0),
+    })
+
+
+@pytest.fixture
+def db(tmp_path):
+    # SQLite stand-in: same table and upsert semantics, executemany instead of COPY.
+    db = PostgresDB(url=f"sqlite:///{tmp_path / 'prices.db'}")
+    db.ensure_prices_table()
+    with db.engine.begin() as connection:
+        connection.execute(text("CREATE TABLE rewritten (date TEXT)"))
+        connection.execute(text(
+            f"CREATE TRIGGER log_rewrite AFTER UPDATE ON {PRICES_TABLE} "
+            "BEGIN INSERT INTO rewritten VALUES (NEW.date); END"
+        ))
+    yield db
+    dispose_engines()
+
+
+def stored(db: PostgresDB) -> pd.DataFrame:
+    return db.fetch_data(f"SELECT date, close FROM {PRICES_TABLE} WHERE symbol = 'TEST' ORDER BY date")
+
+
+def test_resync_sends_only_the_overlap_and_rewrites_changed_rows(db):
+    assert db.sync_prices("NAS", "TEST", bars(20), raise_errors=True) == 20
+
+    update = bars(21)
+    update.loc[17, "Close"] = 999.0     # a correction inside the 5-day overlap
+    update.loc[2, "Close"] = 555.0      # outside the overlap, so not resent
+
+    # 5 days before the last synced bar, the last bar itself, and the new one.
+    assert db.sync_prices("NAS", "TEST", update, raise_errors=True) == 7
+
+    rows = stored(db)
+    assert len(rows) == 21
+    assert rows["close"].iloc[17] == 999.0 and rows["close"].iloc[2] == 102.0
+    rewritten = db.fetch_data("SELECT date FROM rewritten")
+    assert rewritten["date"].tolist() == [update.loc[17, "Date"]]
+
+
+def test_unchanged_resync_writes_nothing(db):
+    db.sync_prices("NAS", "TEST", bars(20), raise_errors=True)
+
+    assert db.sync_prices("NAS", "TEST", bars(20), raise_errors=True) == 6
+    assert db.fetch_data("SELECT date FROM rewritten").empty
+    assert len(stored(db)) == 20
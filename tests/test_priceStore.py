@@ -0,0 +1,77 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from src.services.priceStore.priceStore import PriceStore
+
+DAYS = 60
+
+
+def bars(days: int) -> pd.DataFrame:
+    dates = pd.bdate_range("2024-01-01", periods=days)
+    return pd.DataFrame({"Date": dates, "Close": np.arange(days, dtype=float)})
+
+
+def append_one_by_one(root: str):
+    # Every process sees the same feed, like the API and a scraper landing the same bars.
+    store = PriceStore(root)
+    history = bars(DAYS)
+    for end in range(1, DAYS + 1):
+        store.append("NAS", "RACE", history.iloc[:end])
+
+
+def test_concurrent_processes_append_each_bar_once(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=append_one_by_one, args=(str(tmp_path),)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    store = PriceStore(tmp_path)
+    stored = store.read("NAS", "RACE")
+    assert store.meta("NAS", "RACE")["rows"] == DAYS
+    assert stored["Close"].tolist() == list(range(DAYS))
+    assert stored["Date"].is_monotonic_increasing and stored["Date"].is_unique
+    # Only the partition and its lock file live in the market directory.
+    assert store.symbols("NAS") == ["RACE"]
+
+
+def test_official_bars_replace_provisional_ones(tmp_path):
+    store = PriceStore(tmp_path)
+    store.append("NAS", "AAPL", bars(10))
+    last = pd.Timestamp(store.last_date("NAS", "AAPL"))
+    assert store.fetch_from("NAS", "AAPL") == (last + pd.Timedelta(days=1)).date()
+
+    # Intraday bars for the next two days arrive through the stream.
+    streamed = pd.DataFrame({"Date": pd.bdate_range(last + pd.Timedelta(days=1), periods=2), "Close": [50.0, 51.0]})
+    assert store.append("NAS", "AAPL", streamed, provisional=True) == 2
+    assert store.fetch_from("NAS", "AAPL") == streamed["Date"].iloc[0].date()
+
+    # The scrape brings the official bar for the first of them only.
+    official = pd.DataFrame({"Date": streamed["Date"].iloc[:1], "Close": [49.5]})
+    assert store.append("NAS", "AAPL", official) == 2
+
+    stored = store.read("NAS", "AAPL")
+    assert stored["Close"].tolist()[-3:] == [9.0, 49.5, 51.0]
+    assert len(stored) == 12
+    # The newer streamed bar is still waiting for its official replacement.
+    assert store.fetch_from("NAS", "AAPL") == streamed["Date"].iloc[1].date()
+
+    official = pd.DataFrame({"Date": streamed["Date"], "Close": [49.5, 52.5]})
+    store.append("NAS", "AAPL", official)
+    assert store.read("NAS", "AAPL")["Close"].tolist()[-2:] == [49.5, 52.5]
+    assert store.meta("NAS", "AAPL").get("provisional_from") is None
+
+
+def test_official_bars_before_the_provisional_ones_change_nothing(tmp_path):
+    store = PriceStore(tmp_path)
+    store.append("NAS", "AAPL", bars(10))
+    streamed = pd.DataFrame({"Date": [pd.Timestamp("2024-01-15")], "Close": [50.0]})
+    store.append("NAS", "AAPL", streamed, provisional=True)
+
+    assert store.append("NAS", "AAPL", bars(10)) == 0
+    assert len(store.read("NAS", "AAPL")) == 11
+    assert store.fetch_from("NAS", "AAPL") == pd.Timestamp("2024-01-15").date()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from src.services.cacheManager.responseCache import ResponseCache, etag_matches
+
+ETAG = ResponseCache.serialize({"symbol": "NABIL"}).etag
+ETAG_OF_PAYLOAD = ResponseCache.serialize({"symbol": "NABIL", "prediction": 510.0}).etag
+
+
+@pytest.mark.parametrize("header", [
+    ETAG,
+    f'"stale", {ETAG}',
+    f'W/{ETAG}',
+    f' "stale" ,W/{ETAG} ',
+    "*",
+])
+def test_etag_matches_listed_tags(header):
+    assert etag_matches(ETAG, header)
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    '"stale"',
+    ETAG[1:-1],                    # unquoted
+    f'"x{ETAG[1:-1]}"',            # the tag as a substring of another
+    f'"{ETAG[1:9]}"',              # a prefix of the tag
+    f'"stale", "{ETAG[1:-1]}x"',
+])
+def test_etag_does_not_match_other_tags(header):
+    assert not etag_matches(ETAG, header)
+
+
+def counting_loader(delay: float = 0.05):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"symbol": "NABIL", "prediction": 510.0}
+
+    return loader, calls
+
+
+def test_concurrent_misses_share_one_load():
+    async def main():
+        cache, (loader, calls) = ResponseCache(), counting_loader()
+        results = await asyncio.gather(*[cache.get_or_load("NABIL", loader) for _ in range(20)])
+        return results, calls
+
+    results, calls = asyncio.run(main())
+    assert len(calls) == 1 and all(result.etag == ETAG_OF_PAYLOAD for result in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def main():
+        cache, (loader, calls) = ResponseCache(), counting_loader()
+        leader = asyncio.create_task(cache.get_or_load("NABIL", loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_load("NABIL", loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return cache, result, calls
+
+    cache, result, calls = asyncio.run(main())
+    assert result is not None and result.etag == ETAG_OF_PAYLOAD
+    assert len(calls) == 1
+    assert cache.get("NABIL") is result
+
+
+def test_load_errors_reach_every_waiter():
+    async def main():
+        cache = ResponseCache()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("database down")
+
+        return await asyncio.gather(*[cache.get_or_load("NABIL", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(result) for result in results] == ["database down"] * 3
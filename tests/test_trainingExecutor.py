@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from src.services.priceStore.priceStore import PriceStore
+from src.services.trainmodel.model import min_history
+from src.services.trainmodel.trainingExecutor import TrainingJob, _train_global_worker, _train_worker
+from src.services.usemodel import predictprice
+
+
+@pytest.fixture
+def short_history(tmp_path, monkeypatch):
+    # Forecasting mode: 80-bar windows, 5 closes ahead, but only ~6 months of bars.
+    monkeypatch.setattr(predictprice, "FORECASTING", True)
+    monkeypatch.setattr(predictprice, "TIME_STEPS", 80)
+    monkeypatch.setattr(predictprice, "FORECAST_HORIZON", 5)
+    store = PriceStore(tmp_path / "prices")
+    for symbol, rows in [("TEST", 120), ("NEW", 60)]:
+        dates = pd.bdate_range("2024-01-01", periods=rows)
+        store.append("NAS", symbol, pd.DataFrame({"Date": dates, "Close": np.linspace(100, 130, rows)}))
+    return store
+
+
+def test_min_history_leaves_one_window_in_the_training_split():
+    for look_back, horizon in [(15, 1), (80, 1), (80, 5)]:
+        rows = min_history(look_back, horizon)
+        assert int(rows * 0.7) >= look_back + horizon
+
+
+def test_short_history_fails_fast(short_history, tmp_path):
+    job = TrainingJob("NAS", "TEST", str(tmp_path / "NAS_TEST.h5"))
+
+    result = _train_worker(job, str(short_history.root), timeout=600, data_hash="hash")
+
+    assert result.status == "failed"
+    assert "120 bars of history are too few" in result.error and str(min_history(80, 5)) in result.error
+    assert result.duration < 30
+    assert not (tmp_path / "NAS_TEST.h5").exists()
+
+
+def test_short_history_fails_the_global_model(short_history, tmp_path):
+    result = _train_global_worker([["NAS", "NEW"]], str(tmp_path / "GLOBAL.h5"), str(short_history.root),
+                                  timeout=600, data_hash="hash")
+
+    assert result.status == "failed" and "cannot train the global model" in result.error
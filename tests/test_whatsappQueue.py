@@ -0,0 +1,103 @@
+import threading
+import time
+
+from src.services.messaging.whatsappQueue import PredictionJobQueue
+
+SENDER = "whatsapp:+14155238886"
+
+
+class FakeMessages:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create(self, from_, to, body):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+            self.sent.append((from_, to, body))
+
+
+class FakeTwilioClient:
+    def __init__(self, delay: float = 0.0):
+        self.messages = FakeMessages(delay)
+
+
+class BlockingResolver:
+    """
+    resolve(market, symbol) that waits until released, recording each call.
+    """
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, market, symbol):
+        self.calls.append(symbol)
+        self.started.set()
+        self.release.wait(5)
+        return f"Prediction for {symbol}: 100.00"
+
+
+def recipient(i: int) -> str:
+    return f"whatsapp:+1{i:09d}"
+
+
+def test_burst_for_one_symbol_runs_one_prediction():
+    resolve, client = BlockingResolver(), FakeTwilioClient()
+    jobs = PredictionJobQueue(resolve, client, workers=2, max_pending=3)
+    jobs.start()
+
+    assert all(jobs.submit("NAS", "aapl", recipient(i), SENDER) for i in range(50))
+    resolve.release.set()
+    jobs.stop()
+
+    assert resolve.calls == ["AAPL"]
+    assert sorted(to for _, to, _ in client.messages.sent) == [recipient(i) for i in range(50)]
+    stats = jobs.stats()
+    assert (stats["accepted"], stats["deduplicated"], stats["completed"]) == (1, 49, 50)
+
+
+def test_full_queue_rejects_new_symbols():
+    resolve, client = BlockingResolver(), FakeTwilioClient()
+    jobs = PredictionJobQueue(resolve, client, workers=1, max_pending=2)
+    jobs.start()
+
+    assert jobs.submit("NAS", "AAPL", recipient(0), SENDER)
+    assert resolve.started.wait(5)     # AAPL is running; two more jobs fill the queue
+    assert jobs.submit("NAS", "MSFT", recipient(1), SENDER)
+    assert jobs.submit("NAS", "NVDA", recipient(2), SENDER)
+    assert not jobs.submit("NAS", "TSLA", recipient(3), SENDER)
+    # Joining a queued job needs no queue slot.
+    assert jobs.submit("NAS", "MSFT", recipient(4), SENDER)
+
+    resolve.release.set()
+    jobs.stop()
+
+    assert resolve.calls == ["AAPL", "MSFT", "NVDA"]
+    assert len(client.messages.sent) == 4
+    assert jobs.stats()["rejected"] == 1
+
+
+def test_replies_are_sent_in_concurrent_batches():
+    resolve, client = BlockingResolver(), FakeTwilioClient(delay=0.05)
+    jobs = PredictionJobQueue(resolve, client, workers=1, send_batch_size=8, send_concurrency=4)
+    jobs.start()
+
+    for i in range(16):
+        jobs.submit("NPS", "NABIL", recipient(i), SENDER)
+    resolve.release.set()
+    jobs.stop()
+
+    stats = jobs.stats()
+    assert len(client.messages.sent) == stats["completed"] == 16
+    assert stats["failed_sends"] == 0
+    # The 16 replies are queued at once, so they drain in far fewer batches than messages.
+    assert 2 <= stats["send_batches"] <= 4
+    assert 1 < client.messages.max_in_flight <= 4
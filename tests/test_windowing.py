@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from src.services.timeseries.windowing import array_batches, sliding_windows, steps, window_batches
+
+
+def test_batches_cover_every_window_each_epoch():
+    X, y = sliding_windows(np.arange(50, dtype=np.float32), look_back=5)
+    batches = array_batches(X, y, batch_size=8, shuffle=False)
+
+    epoch = [next(batches) for _ in range(steps(len(X), 8))]
+
+    assert np.array_equal(np.concatenate([bx for bx, _ in epoch]), X)
+    assert np.array_equal(next(batches)[0], X[:8])
+
+
+def test_empty_input_raises_instead_of_hanging():
+    X, y = sliding_windows(np.arange(10, dtype=np.float32), look_back=8, horizon=4)
+    assert len(X) == 0
+
+    with pytest.raises(ValueError, match="no training windows"):
+        array_batches(X, y)
+    with pytest.raises(ValueError, match="no training windows"):
+        window_batches(np.arange(10, dtype=np.float32), look_back=8, horizon=4)
@@ -0,0 +1,10 @@
+import os
+import logging
+
+logging.getLogger("absl").setLevel(logging.ERROR)
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+from src.services.worker.worker import main
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file